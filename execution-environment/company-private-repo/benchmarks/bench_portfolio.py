@@ -0,0 +1,154 @@
+"""
+bench_portfolio.py — Find where a process pool pays off for portfolio analytics.
+
+Builds many projects with tasks directly in a DataStore and times the
+in-process run. It then times the pieces a pooled run adds or moves, per task:
+
+    extract   parent builds the plain task rows   (serial pays this too)
+    tally     per-assignee totals over the rows   (moved to the workers)
+    dump      parent pickles the rows             (pool only)
+    load      worker unpickles the rows           (pool only, in parallel)
+
+plus the fixed cost of starting a pool. With ``w`` workers a pooled run saves
+``tally - dump - (load + tally) / w`` per task, so it only beats the serial
+run above ``startup / saving`` tasks. That crossover is what
+services.portfolio.PARALLEL_MIN_TASKS is set from. On a 1-CPU machine the
+pooled run below can only be slower; the crossover is what carries over.
+
+Run from the company-private-repo/ directory:
+    python benchmarks/bench_portfolio.py --projects 100 --tasks 2000
+"""
+
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import argparse
+import pickle
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+from models.core import Project, Status, Task, User
+from models.store import DataStore
+from services.portfolio import PARALLEL_MIN_TASKS, _tally, portfolio_analytics
+
+
+def build_store(n_projects: int, n_tasks: int, n_users: int) -> DataStore:
+    store = DataStore()
+    users = [
+        User(username=f"user{i}", email=f"user{i}@example.com", full_name=f"User {i}")
+        for i in range(n_users)
+    ]
+    for user in users:
+        store.add_user(user)
+
+    statuses = list(Status)
+    now = datetime.utcnow()
+    for p in range(n_projects):
+        project = Project(name=f"Project {p}", owner_id=users[0].id)
+        store.add_project(project)
+        for i in range(n_tasks):
+            task = Task(
+                title=f"Task {i}",
+                project_id=project.id,
+                creator_id=users[0].id,
+                status=random.choice(statuses),
+                assignee_ids=[random.choice(users).id],
+                estimated_hours=random.uniform(1, 20),
+                actual_hours=random.uniform(0, 30),
+                story_points=random.choice([1, 2, 3, 5, 8]),
+                due_date=now + timedelta(days=random.randint(-10, 30)),
+            )
+            store.add_task(task)
+    return store
+
+
+def best_of(fn: Callable[[], Any], repeats: int = 3) -> tuple[float, Any]:
+    best, result = float("inf"), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _noop() -> None:
+    return None
+
+
+def pool_startup(workers: int) -> float:
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for future in [pool.submit(_noop) for _ in range(workers)]:
+            future.result()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Find where a process pool pays off for portfolio analytics."
+    )
+    parser.add_argument("--projects", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=2_000, help="per project")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--max-workers", type=int, default=8)
+    args = parser.parse_args()
+    random.seed(42)
+
+    print(
+        f"Building store: {args.projects} projects x {args.tasks} tasks, "
+        f"{args.users} users..."
+    )
+    start = time.perf_counter()
+    store = build_store(args.projects, args.tasks, args.users)
+    print(f"  built in {time.perf_counter() - start:.1f}s\n")
+    n = args.projects * args.tasks
+    pids = [p.id for p in store.list_projects()]
+    now = datetime.utcnow()
+
+    serial, _ = best_of(lambda: portfolio_analytics(store))
+    extract, rows = best_of(lambda: {pid: store.project_rows(pid) for pid in pids})
+    tally, _ = best_of(lambda: _tally(rows, now))
+    dump, blob = best_of(lambda: pickle.dumps(rows))
+    load, _ = best_of(lambda: pickle.loads(blob))
+    print(f"  serial run {serial:8.3f}s  ({serial / n * 1e6:.2f} us/task)")
+    for name, seconds in (
+        ("extract", extract),
+        ("tally", tally),
+        ("dump", dump),
+        ("load", load),
+    ):
+        print(f"  {name:<10s} {seconds / n * 1e6:8.2f} us/task")
+    print(f"  rows pickle {len(blob) / n:7.1f} bytes/task\n")
+
+    workers = 2
+    while workers <= args.max_workers:
+        startup = min(pool_startup(workers) for _ in range(3))
+        saving = (tally - dump - (load + tally) / workers) / n
+        crossover = f"{startup / saving:12,.0f}" if saving > 0 else "       never"
+        print(
+            f"  workers={workers:<3d} startup {startup:6.3f}s   "
+            f"saves {saving * 1e6:5.2f} us/task   crossover {crossover} tasks"
+        )
+        workers *= 2
+    print(f"\n  PARALLEL_MIN_TASKS = {PARALLEL_MIN_TASKS:,}")
+
+    workers = min(args.max_workers, os.cpu_count() or 1, len(pids))
+    if workers > 1:
+        pooled, _ = best_of(
+            lambda: portfolio_analytics(store, workers=workers, min_parallel_tasks=0)
+        )
+        print(
+            f"  measured: workers={workers} {pooled:.3f}s vs serial {serial:.3f}s "
+            f"({serial / pooled:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
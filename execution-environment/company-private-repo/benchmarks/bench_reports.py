@@ -0,0 +1,128 @@
+"""
+bench_reports.py — Time the workload and team performance reports.
+
+Builds one project with many users and tasks directly in a DataStore, then
+compares the single-pass reports against the old per-user rescan. The old
+algorithm is O(users x tasks), so it is only timed for a sample of users and
+extrapolated linearly.
+
+Run from the company-private-repo/ directory:
+    python benchmarks/bench_reports.py --users 10000 --tasks 1000000
+"""
+
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from models.core import Project, Status, Task, User
+from models.store import DataStore
+from services.task_service import TaskService
+from utils.reporting import ReportGenerator
+
+
+def build_store(n_users: int, n_tasks: int) -> tuple[DataStore, str]:
+    store = DataStore()
+    users = [
+        User(username=f"user{i}", email=f"user{i}@example.com", full_name=f"User {i}")
+        for i in range(n_users)
+    ]
+    for user in users:
+        store.add_user(user)
+    project = Project(name="Benchmark", owner_id=users[0].id)
+    store.add_project(project)
+
+    statuses = list(Status)
+    now = datetime.utcnow()
+    for i in range(n_tasks):
+        task = Task(
+            title=f"Task {i}",
+            project_id=project.id,
+            creator_id=users[0].id,
+            status=random.choice(statuses),
+            assignee_ids=[random.choice(users).id],
+            estimated_hours=random.uniform(1, 20),
+            actual_hours=random.uniform(0, 30),
+            story_points=random.choice([1, 2, 3, 5, 8]),
+            due_date=now + timedelta(days=random.randint(-10, 30)),
+        )
+        store.add_task(task)
+    return store, project.id
+
+
+def naive_workload(store: DataStore, project_id: str, users: list[User]) -> int:
+    # The pre-grouping algorithm: one scan of the project's tasks per user.
+    tasks = store.list_tasks(project_id=project_id)
+    rows = 0
+    for user in users:
+        user_tasks = [t for t in tasks if user.id in t.assignee_ids]
+        open_tasks = [
+            t for t in user_tasks if t.status not in (Status.DONE, Status.CANCELLED)
+        ]
+        _ = sum(t.story_points or 0 for t in open_tasks)
+        rows += 1
+    return rows
+
+
+def timed(label: str, fn) -> float:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<40s} {elapsed:10.3f}s")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Time the workload and team performance reports."
+    )
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument(
+        "--baseline-users",
+        type=int,
+        default=20,
+        help="users to time the old per-user scan on before extrapolating",
+    )
+    args = parser.parse_args()
+    random.seed(42)
+
+    print(f"Building store: {args.users} users, {args.tasks} tasks...")
+    start = time.perf_counter()
+    store, project_id = build_store(args.users, args.tasks)
+    print(f"  built in {time.perf_counter() - start:.1f}s\n")
+
+    tasks = TaskService(store)
+    reports = ReportGenerator(store)
+    users = store.list_users(active_only=True)
+    sample = users[: args.baseline_users]
+
+    print("Single pass:")
+    workload = timed(
+        "get_workload_report", lambda: tasks.get_workload_report(project_id)
+    )
+    team = timed(
+        "team_performance_report",
+        lambda: reports.team_performance_report(project_id),
+    )
+
+    print(f"\nPer-user rescan ({len(sample)} users sampled):")
+    sampled = timed(
+        "naive workload (sample)", lambda: naive_workload(store, project_id, sample)
+    )
+    projected = sampled / max(1, len(sample)) * len(users)
+    print(f"  {'naive workload (projected, all users)':<40s} {projected:10.1f}s")
+
+    print(f"\nSpeedup (workload): {projected / workload:,.0f}x")
+    print(f"Team performance single pass: {team:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,19 @@
 
 from __future__ import annotations
 
-from typing import Any
+import copy
+import os
+from datetime import datetime, timedelta
+from typing import Any, Callable, Hashable
 
 from models.core import Status
-from models.store import DataStore
-from services.notification_service import NotificationService, TaskEventEmitter
+from models.store import DataStore, task_sort_key
+from services.notification_service import (
+    EventType,
+    NotificationService,
+    TaskEventEmitter,
+)
+from services.portfolio import portfolio_analytics
 from services.project_service import (
     ProjectService,
     SprintService,
@@ -14,19 +22,45 @@ from services.project_service import (
     UserService,
 )
 from services.task_service import TaskService
-from utils.helpers import paginate
+from utils.cache import ResultCache, make_cache_key
+from utils.helpers import decode_cursor, encode_cursor, paginate_iter
 from utils.reporting import ReportGenerator
 
 
+def notifications_path(path: str) -> str:
+    """Where the notification journal lives next to a store file."""
+    return os.path.splitext(path)[0] + ".notifications.jsonl"
+
+
 class TaskFlowAPI:
-    def __init__(self, persist_path: str | None = None) -> None:
+    def __init__(
+        self,
+        persist_path: str | None = None,
+        cache_entries: int = 1024,
+        cache_max_bytes: int = 32 * 1024 * 1024,
+        cache_ttl: float | None = None,
+        notification_workers: int = 0,
+        event_log_capacity: int = 10_000,
+        event_log_dir: str | None = None,
+        notification_coalesce: dict[EventType, timedelta] | None = None,
+    ) -> None:
         self._store = DataStore(persist_path=persist_path)
+        self._persist_path = persist_path
+        self._cache = ResultCache(
+            max_entries=cache_entries, max_bytes=cache_max_bytes, ttl=cache_ttl
+        )
         self.users = UserService(self._store)
         self.projects = ProjectService(self._store)
         self.tasks = TaskService(self._store)
         self.tags = TagService(self._store)
         self.sprints = SprintService(self._store)
-        self.notifications = NotificationService()
+        self.notifications = NotificationService(
+            async_workers=notification_workers,
+            event_log_capacity=event_log_capacity,
+            event_log_dir=event_log_dir,
+            coalesce=notification_coalesce,
+            journal_path=notifications_path(persist_path) if persist_path else None,
+        )
         self._emitter = TaskEventEmitter(self.notifications, self._store)
         self._reporter = ReportGenerator(self._store)
 
@@ -44,22 +78,77 @@ class TaskFlowAPI:
         )
         return task.to_dict()
 
+    def delete_task(self, task_id: str, actor_id: str) -> list[str]:
+        project_id = self.tasks.get_task(task_id).project_id
+        deleted = self.tasks.delete_task(task_id)
+        self._emitter.on_tasks_deleted(deleted, project_id, actor_id)
+        return deleted
+
     def add_comment(self, task_id: str, author_id: str, content: str) -> dict[str, Any]:
         comment = self.tasks.add_comment(task_id, author_id, content)
         for uid in comment.mentions:
             self._emitter.on_comment_mention(task_id, uid, author_id)
         return comment.to_dict()
 
+    def search_comments(self, query: str = "", **kwargs: Any) -> list[dict[str, str]]:
+        hits = self.tasks.search_comments(query, **kwargs)
+        return [{"task_id": tid, "comment_id": cid} for tid, cid in hits]
+
     def search_tasks(
         self, page: int = 1, per_page: int = 20, **kwargs: Any
     ) -> dict[str, Any]:
-        results = self.tasks.search_tasks(**kwargs)
-        items, meta = paginate(results, page=page, per_page=per_page)
+        def compute() -> dict[str, Any]:
+            results = self.tasks.search_tasks_iter(**kwargs)
+            items, meta = paginate_iter(results, page=page, per_page=per_page)
+            return {
+                "items": [t.to_dict() for t in items],
+                "pagination": meta,
+            }
+
+        if kwargs.get("overdue_only"):
+            # Matches change as due dates pass, which no store write reports.
+            return compute()
+        key = make_cache_key("search_tasks", page=page, per_page=per_page, **kwargs)
+        token = self._store.cache_token(kwargs.get("project_id"))
+        return self._cached(key, token, compute)
+
+    def query_tasks(
+        self, expression: str, page: int = 1, per_page: int = 20
+    ) -> dict[str, Any]:
+        results = self.tasks.query_tasks_iter(expression)
+        items, meta = paginate_iter(results, page=page, per_page=per_page)
         return {
             "items": [t.to_dict() for t in items],
             "pagination": meta,
         }
 
+    def search_tasks_ranked(
+        self, query: str, limit: int = 20, **kwargs: Any
+    ) -> dict[str, Any]:
+        ranked = self.tasks.search_tasks_ranked(query, limit=limit, **kwargs)
+        return {
+            "items": [
+                {**t.to_dict(), "score": round(score, 4)} for score, t in ranked
+            ],
+        }
+
+    def search_tasks_cursor(
+        self, cursor: str | None = None, per_page: int = 20, **kwargs: Any
+    ) -> dict[str, Any]:
+        after = decode_cursor(cursor) if cursor else None
+        items, has_next = self.tasks.search_tasks_page(per_page, after=after, **kwargs)
+        next_cursor = (
+            encode_cursor(task_sort_key(items[-1])) if has_next and items else None
+        )
+        return {
+            "items": [t.to_dict() for t in items],
+            "pagination": {
+                "per_page": per_page,
+                "next_cursor": next_cursor,
+                "has_next": has_next,
+            },
+        }
+
     def project_report(self, project_id: str) -> str:
         return self._reporter.project_summary_text(project_id)
 
@@ -69,23 +158,88 @@ class TaskFlowAPI:
     def export_tasks(self, project_id: str) -> str:
         return self._reporter.export_tasks_csv(project_id)
 
-    def project_stats(self, project_id: str) -> dict[str, Any]:
-        return self.tasks.compute_project_stats(project_id)
+    def project_stats(
+        self,
+        project_id: str,
+        approximate: bool = False,
+        sample_size: int | None = None,
+    ) -> dict[str, Any]:
+        if approximate:
+            return self.tasks.compute_project_stats_approx(project_id, sample_size)
+        stats = self._cached(
+            make_cache_key("project_stats", project_id=project_id),
+            self._store.cache_token(project_id),
+            lambda: self.tasks.compute_project_stats(project_id),
+        )
+        # The overdue count depends on the clock, so it is read fresh.
+        now = datetime.utcnow()
+        stats["overdue_count"] = self._store.overdue_count(project_id, now)
+        stats["computed_at"] = now.isoformat()
+        return stats
 
     def workload_report(self, project_id: str) -> list[dict[str, Any]]:
-        return self.tasks.get_workload_report(project_id)
+        return self._cached(
+            make_cache_key("workload_report", project_id=project_id),
+            self._store.cache_token(project_id),
+            lambda: self.tasks.get_workload_report(project_id),
+        )
 
     def velocity_trend(self, project_id: str, last_n: int = 5) -> list[dict[str, Any]]:
         return self.tasks.get_velocity_trend(project_id, last_n_sprints=last_n)
 
+    def completion_trend(self, project_id: str, days: int = 90) -> list[dict[str, Any]]:
+        return self.tasks.get_completion_trend(project_id, days=days)
+
     def burndown_data(self, sprint_id: str) -> list[dict[str, Any]]:
         return self._reporter.get_burndown_data(sprint_id)
 
-    def team_performance(self, project_id: str) -> dict[str, Any]:
+    def burndown_batch(self, sprint_ids: list[str]) -> dict[str, list[dict[str, Any]]]:
+        return self._reporter.get_burndown_batch(sprint_ids)
+
+    def cumulative_flow(self, sprint_id: str) -> list[dict[str, Any]]:
+        return self._reporter.get_cumulative_flow(sprint_id)
+
+    def team_performance(
+        self,
+        project_id: str,
+        approximate: bool = False,
+        sample_size: int | None = None,
+    ) -> dict[str, Any]:
+        if approximate:
+            return self._reporter.team_performance_approx(project_id, sample_size)
         return self._reporter.team_performance_report(project_id)
 
+    def portfolio_analytics(
+        self, project_ids: list[str] | None = None, workers: int = 1
+    ) -> dict[str, Any]:
+        """Stats, workload and team performance for many projects. Computed
+        in-process unless ``workers`` > 1 and the portfolio is large enough
+        for a process pool to pay off."""
+        return portfolio_analytics(self._store, project_ids, workers=workers)
+
+    def cache_stats(self) -> dict[str, Any]:
+        return self._cache.stats()
+
+    def _cached(
+        self, key: Hashable, token: Hashable, compute: Callable[[], Any]
+    ) -> Any:
+        # Callers get their own copy so they cannot alter later cache hits.
+        return copy.deepcopy(self._cache.get_or_compute(key, token, compute))
+
+    def close(self) -> None:
+        """Deliver queued notifications, stop the dispatch workers and close
+        the event log's open segment."""
+        self.notifications.close()
+
     def save(self, path: str | None = None) -> None:
+        """Save the store and, beside it, the event log and inboxes."""
         self._store.save(path)
+        target = path or self._persist_path
+        if target:
+            self.notifications.save(notifications_path(target))
 
     def load(self, path: str) -> None:
         self._store.load(path)
+        journal = notifications_path(path)
+        if os.path.exists(journal):
+            self.notifications.load(journal)
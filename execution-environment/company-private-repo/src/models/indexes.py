@@ -0,0 +1,946 @@
+"""Secondary indexes maintained alongside the DataStore."""
+
+from __future__ import annotations
+
+import bisect
+import re
+from dataclasses import dataclass, replace
+from datetime import date, datetime, timezone
+from typing import Any, Hashable, TypeVar
+
+from models.core import Comment, Priority, Status, Task
+
+CommentRef = tuple[str, str]
+
+
+def tokenize(text: str) -> list[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def naive_utc(dt: datetime) -> datetime:
+    """Drop tzinfo after converting to UTC so aware and naive values compare."""
+    if dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def utc_seconds(dt: datetime) -> float:
+    """Seconds since the epoch, with naive values taken to be UTC already."""
+    return (naive_utc(dt) - _EPOCH).total_seconds()
+
+
+# ---------------------------------------------------------------------------
+# Task aggregates
+# ---------------------------------------------------------------------------
+
+_CLOSED = (Status.DONE, Status.CANCELLED)
+
+
+# The task fields the per-assignee reports read, as a plain tuple that is
+# cheap to pickle: (status value, assignee ids, story points, estimated
+# hours, actual hours, due date in ``utc_seconds``).
+TaskRow = tuple[str, tuple[str, ...], int | None, float | None, float, float | None]
+
+
+@dataclass(frozen=True)
+class TaskSnapshot:
+    """The fields of a task that aggregates depend on, captured at index time
+    so the old contribution can be retracted after the task is mutated in
+    place."""
+
+    project_id: str
+    sprint_id: str | None
+    status: Status
+    priority: Priority
+    estimated_hours: float | None
+    actual_hours: float
+    story_points: int | None
+    assignee_ids: tuple[str, ...]
+    due_date: datetime | None
+
+    @classmethod
+    def of(cls, task: Task) -> TaskSnapshot:
+        return cls(
+            project_id=task.project_id,
+            sprint_id=task.sprint_id,
+            status=Status(task.status.value),
+            priority=Priority(task.priority.value),
+            estimated_hours=task.estimated_hours,
+            actual_hours=task.actual_hours,
+            story_points=task.story_points,
+            assignee_ids=tuple(task.assignee_ids),
+            due_date=naive_utc(task.due_date) if task.due_date else None,
+        )
+
+    def row(self) -> TaskRow:
+        return (
+            self.status.value,
+            self.assignee_ids,
+            self.story_points,
+            self.estimated_hours,
+            self.actual_hours,
+            utc_seconds(self.due_date) if self.due_date else None,
+        )
+
+
+class TaskAggregate:
+    """Running totals over a group of tasks, updated by applying deltas."""
+
+    def __init__(self) -> None:
+        self.total = 0
+        self.status_counts: dict[str, int] = {}
+        self.priority_counts: dict[str, int] = {}
+        self.estimated_hours = 0.0
+        self.actual_hours = 0.0
+        self.story_points = 0
+        self.completed_points = 0
+        self.assignee_load: dict[str, int] = {}
+        self._open_due: list[tuple[datetime, str]] = []
+        self._open_due_days: dict[date, int] = {}
+
+    def add(self, task_id: str, snap: TaskSnapshot) -> None:
+        self._apply(snap, 1)
+        if snap.due_date is not None and snap.status not in _CLOSED:
+            bisect.insort(self._open_due, (snap.due_date, task_id))
+            _count(self._open_due_days, snap.due_date.date(), 1)
+
+    def remove(self, task_id: str, snap: TaskSnapshot) -> None:
+        self._apply(snap, -1)
+        if snap.due_date is not None and snap.status not in _CLOSED:
+            entry = (snap.due_date, task_id)
+            i = bisect.bisect_left(self._open_due, entry)
+            if i < len(self._open_due) and self._open_due[i] == entry:
+                del self._open_due[i]
+                _count(self._open_due_days, snap.due_date.date(), -1)
+
+    def overdue_count(self, now: datetime) -> int:
+        return bisect.bisect_left(self._open_due, naive_utc(now), key=_due_time)
+
+    def due_by_day(self, day: date) -> tuple[int, tuple[tuple[date, int], ...]]:
+        """Open tasks due on or before ``day``, and a running total of those
+        due on each later day. The work grows with distinct due days only."""
+        through = 0
+        later: list[tuple[date, int]] = []
+        running = 0
+        for due, n in sorted(self._open_due_days.items()):
+            if due <= day:
+                through += n
+            else:
+                running += n
+                later.append((due, running))
+        return through, tuple(later)
+
+    def _apply(self, snap: TaskSnapshot, sign: int) -> None:
+        self.total += sign
+        _count(self.status_counts, snap.status.value, sign)
+        _count(self.priority_counts, snap.priority.name, sign)
+        if snap.estimated_hours is not None:
+            self.estimated_hours = _settle(
+                self.estimated_hours + sign * snap.estimated_hours
+            )
+        self.actual_hours = _settle(self.actual_hours + sign * snap.actual_hours)
+        if snap.story_points is not None:
+            self.story_points += sign * snap.story_points
+            if snap.status == Status.DONE:
+                self.completed_points += sign * snap.story_points
+        for uid in snap.assignee_ids:
+            _count(self.assignee_load, uid, sign)
+
+
+_K = TypeVar("_K", bound=Hashable)
+
+
+def _count(counts: dict[_K, int], key: _K, sign: int) -> None:
+    value = counts.get(key, 0) + sign
+    if value:
+        counts[key] = value
+    else:
+        counts.pop(key, None)
+
+
+def _settle(value: float) -> float:
+    # Repeated add/subtract of floats leaves residue like 1e-15 behind.
+    return 0.0 if abs(value) < 1e-9 else value
+
+
+def _due_time(entry: tuple[datetime, str]) -> datetime:
+    return entry[0]
+
+
+# ---------------------------------------------------------------------------
+# Daily rollups
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class DailyRollup:
+    """End-of-day metrics for one project. The row for the current day is
+    overwritten on every change with constant-size counters; ``overdue`` is
+    the count at that write.
+
+    The first change on a later day seals the row: ``overdue`` becomes the
+    count of open tasks due on or before ``day`` and ``due_after`` holds
+    running totals of open tasks by later due day, so ``overdue_on`` can
+    derive the count for any day the row is carried forward to.
+    """
+
+    day: date
+    total: int
+    status_counts: dict[str, int]
+    story_points: int
+    completed_points: int
+    estimated_hours: float
+    actual_hours: float
+    overdue: int
+    due_after: tuple[tuple[date, int], ...] | None = None
+
+    @classmethod
+    def of(cls, day: date, agg: TaskAggregate, now: datetime) -> DailyRollup:
+        return cls(
+            day=day,
+            total=agg.total,
+            status_counts=dict(agg.status_counts),
+            story_points=agg.story_points,
+            completed_points=agg.completed_points,
+            estimated_hours=round(agg.estimated_hours, 2),
+            actual_hours=round(agg.actual_hours, 2),
+            overdue=agg.overdue_count(now),
+        )
+
+    @property
+    def sealed(self) -> bool:
+        return self.due_after is not None
+
+    def seal(self, agg: TaskAggregate) -> DailyRollup:
+        """This row with the due-date distribution of ``agg``, which must be
+        unchanged since the row was written."""
+        overdue, due_after = agg.due_by_day(self.day)
+        return replace(self, overdue=overdue, due_after=due_after)
+
+    def overdue_on(self, day: date) -> int:
+        """Open tasks overdue at the end of ``day``, given no changes since
+        this row was written. Unsealed rows only know their stored count."""
+        if self.due_after is None:
+            return self.overdue
+        i = bisect.bisect_right(self.due_after, day, key=_due_day)
+        return self.overdue + (self.due_after[i - 1][1] if i else 0)
+
+    def to_dict(self) -> dict[str, Any]:
+        data: dict[str, Any] = {
+            "day": self.day.isoformat(),
+            "total": self.total,
+            "status_counts": dict(self.status_counts),
+            "story_points": self.story_points,
+            "completed_points": self.completed_points,
+            "estimated_hours": self.estimated_hours,
+            "actual_hours": self.actual_hours,
+            "overdue": self.overdue,
+        }
+        if self.due_after is not None:
+            data["due_after"] = [[d.isoformat(), n] for d, n in self.due_after]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> DailyRollup:
+        return cls(
+            day=date.fromisoformat(str(data["day"])),
+            total=int(data.get("total", 0)),
+            status_counts={
+                str(k): int(v) for k, v in data.get("status_counts", {}).items()
+            },
+            story_points=int(data.get("story_points", 0)),
+            completed_points=int(data.get("completed_points", 0)),
+            estimated_hours=float(data.get("estimated_hours", 0.0)),
+            actual_hours=float(data.get("actual_hours", 0.0)),
+            overdue=int(data.get("overdue", 0)),
+            due_after=tuple(
+                (date.fromisoformat(str(d)), int(n)) for d, n in data["due_after"]
+            )
+            if "due_after" in data
+            else None,
+        )
+
+
+def rollup_day(row: DailyRollup) -> date:
+    return row.day
+
+
+def _due_day(entry: tuple[date, int]) -> date:
+    return entry[0]
+
+
+# ---------------------------------------------------------------------------
+# Sprint timelines
+# ---------------------------------------------------------------------------
+
+_STATUSES = tuple(Status)
+# Flow counts are keyed by status value: a Status imported under another
+# module path (``src.models.core``) is a distinct enum with the same values.
+_STATUS_SLOTS = {s.value: n for n, s in enumerate(_STATUSES)}
+
+
+@dataclass(frozen=True)
+class StatusTransition:
+    """A task moving between statuses inside one sprint. ``from_status`` is
+    ``None`` when the task enters the sprint and ``to_status`` is ``None``
+    when it leaves; a story point change is recorded as a leave and an
+    enter."""
+
+    at: datetime
+    task_id: str
+    from_status: Status | None
+    to_status: Status | None
+    story_points: int
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "at": self.at.isoformat(),
+            "task_id": self.task_id,
+            "from": self.from_status.value if self.from_status else None,
+            "to": self.to_status.value if self.to_status else None,
+            "points": self.story_points,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> StatusTransition:
+        return cls(
+            at=datetime.fromisoformat(str(data["at"])),
+            task_id=str(data["task_id"]),
+            from_status=Status(data["from"]) if data.get("from") else None,
+            to_status=Status(data["to"]) if data.get("to") else None,
+            story_points=int(data.get("points", 0)),
+        )
+
+
+def transitions_between(
+    task_id: str,
+    old: TaskSnapshot | None,
+    new: TaskSnapshot | None,
+    at: datetime,
+) -> list[tuple[str, StatusTransition]]:
+    """Timeline events, keyed by sprint id, that turn ``old`` into ``new``."""
+    old_sprint = old.sprint_id if old else None
+    new_sprint = new.sprint_id if new else None
+    old_points = (old.story_points or 0) if old else 0
+    new_points = (new.story_points or 0) if new else 0
+    if old and new and old_sprint == new_sprint and old_points == new_points:
+        if old_sprint is None or old.status == new.status:
+            return []
+        event = StatusTransition(at, task_id, old.status, new.status, new_points)
+        return [(old_sprint, event)]
+    events: list[tuple[str, StatusTransition]] = []
+    if old and old_sprint is not None:
+        events.append(
+            (old_sprint, StatusTransition(at, task_id, old.status, None, old_points))
+        )
+    if new and new_sprint is not None:
+        events.append(
+            (new_sprint, StatusTransition(at, task_id, None, new.status, new_points))
+        )
+    return events
+
+
+class SprintTimeline:
+    """Append-only status transitions for one sprint, with the open story
+    points and per-status task counts after every event kept as prefix sums,
+    so the state at any moment is one bisect."""
+
+    def __init__(self) -> None:
+        self.events: list[StatusTransition] = []
+        self._remaining: list[int] = []
+        self._flow: list[tuple[int, ...]] = []
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def append(self, event: StatusTransition) -> None:
+        if self.events and event.at < self.events[-1].at:
+            # Out-of-order timestamps only come from clock changes or
+            # replayed data; the totals after the insertion point are redone.
+            i = bisect.bisect_right(self.events, event.at, key=_event_time)
+            self.events.insert(i, event)
+            del self._remaining[i:], self._flow[i:]
+            for later in self.events[i:]:
+                self._accumulate(later)
+        else:
+            self.events.append(event)
+            self._accumulate(event)
+
+    def state_before(self, at: datetime) -> tuple[int, dict[str, int]]:
+        """Open story points and task count per status from events strictly
+        before ``at``."""
+        i = bisect.bisect_left(self.events, naive_utc(at), key=_event_time)
+        if i == 0:
+            return 0, {s.value: 0 for s in _STATUSES}
+        flow = self._flow[i - 1]
+        return self._remaining[i - 1], {
+            s.value: flow[n] for n, s in enumerate(_STATUSES)
+        }
+
+    def _accumulate(self, event: StatusTransition) -> None:
+        remaining = self._remaining[-1] if self._remaining else 0
+        flow = list(self._flow[-1]) if self._flow else [0] * len(_STATUSES)
+        if event.from_status is not None:
+            flow[_STATUS_SLOTS[event.from_status.value]] -= 1
+            if event.from_status.value != Status.DONE.value:
+                remaining -= event.story_points
+        if event.to_status is not None:
+            flow[_STATUS_SLOTS[event.to_status.value]] += 1
+            if event.to_status.value != Status.DONE.value:
+                remaining += event.story_points
+        self._remaining.append(remaining)
+        self._flow.append(tuple(flow))
+
+
+def _event_time(event: StatusTransition) -> datetime:
+    return event.at
+
+
+# ---------------------------------------------------------------------------
+# Task hierarchy
+# ---------------------------------------------------------------------------
+
+@dataclass
+class SubtreeTotals:
+    tasks: int = 0
+    done: int = 0
+    story_points: int = 0
+    completed_points: int = 0
+    estimated_hours: float = 0.0
+    actual_hours: float = 0.0
+
+    def apply(self, snap: TaskSnapshot, sign: int) -> None:
+        done = snap.status == Status.DONE
+        points = snap.story_points or 0
+        self.tasks += sign
+        self.done += sign * done
+        self.story_points += sign * points
+        self.completed_points += sign * points * done
+        self.estimated_hours = _settle(
+            self.estimated_hours + sign * (snap.estimated_hours or 0.0)
+        )
+        self.actual_hours = _settle(self.actual_hours + sign * snap.actual_hours)
+
+
+class HierarchyIndex:
+    """Parent links for the parent/child relations between tasks.
+
+    Each task keeps its parent, its depth and its children in id order, so
+    adding a task is independent of how deep it sits, a subtree is a walk
+    down from its root in time linear in its size, and memory is linear in
+    the number of tasks. Subtree totals are summed over that walk when read
+    rather than pushed up every ancestor on each write.
+    """
+
+    def __init__(self) -> None:
+        self._parent: dict[str, str | None] = {}
+        self._depth: dict[str, int] = {}
+        self._children: dict[str, list[str]] = {}
+
+    def add(self, task_id: str, parent_id: str | None) -> None:
+        parent = parent_id if parent_id in self._parent else None
+        self._parent[task_id] = parent
+        self._depth[task_id] = 0 if parent is None else self._depth[parent] + 1
+        if parent is not None:
+            bisect.insort(self._children.setdefault(parent, []), task_id)
+
+    def remove(self, task_id: str) -> None:
+        if task_id not in self._parent:
+            return
+        parent = self._parent.pop(task_id)
+        del self._depth[task_id]
+        if parent is not None:
+            siblings = self._children[parent]
+            del siblings[bisect.bisect_left(siblings, task_id)]
+            if not siblings:
+                del self._children[parent]
+        # Children of a task removed on its own move up to its parent.
+        for child in self._children.pop(task_id, []):
+            self._parent[child] = parent
+            if parent is not None:
+                bisect.insort(self._children.setdefault(parent, []), child)
+            for node in self.subtree(child):
+                self._depth[node] -= 1
+
+    def rebuild(self, parents: dict[str, str | None]) -> None:
+        """Recompute every link from ``task_id -> parent_id``. Links to
+        missing tasks and cycles are cut, making that task a root."""
+        self.clear()
+        for task_id in parents:
+            chain: list[str] = []
+            current: str | None = task_id
+            seen: set[str] = set()
+            while (
+                current is not None
+                and current in parents
+                and current not in self._parent
+                and current not in seen
+            ):
+                seen.add(current)
+                chain.append(current)
+                current = parents[current]
+            parent = current if current in self._parent else None
+            for node in reversed(chain):
+                self.add(node, parent)
+                parent = node
+
+    def depth(self, task_id: str) -> int:
+        return self._depth[task_id]
+
+    def subtree(self, task_id: str) -> list[str]:
+        """Ids of ``task_id`` and all of its descendants, parents before
+        children."""
+        if task_id not in self._parent:
+            raise KeyError(task_id)
+        ids: list[str] = []
+        stack = [task_id]
+        while stack:
+            node = stack.pop()
+            ids.append(node)
+            stack.extend(reversed(self._children.get(node, ())))
+        return ids
+
+    def totals(
+        self, task_id: str, snapshots: dict[str, TaskSnapshot]
+    ) -> SubtreeTotals:
+        totals = SubtreeTotals()
+        for node in self.subtree(task_id):
+            snap = snapshots.get(node)
+            if snap is not None:
+                totals.apply(snap, 1)
+        return totals
+
+    def clear(self) -> None:
+        self._parent.clear()
+        self._depth.clear()
+        self._children.clear()
+
+
+# ---------------------------------------------------------------------------
+# Blocked task candidates
+# ---------------------------------------------------------------------------
+
+OVER_ESTIMATE_FACTOR = 3
+
+
+class BlockedTaskIndex:
+    """In-progress tasks per project ordered by ``updated_at``, plus the set
+    of in-progress tasks whose actual hours exceed ``OVER_ESTIMATE_FACTOR``
+    times the estimate. Stale tasks are a prefix of the ordered list."""
+
+    def __init__(self) -> None:
+        self._by_update: dict[str, list[tuple[datetime, str]]] = {}
+        self._over_estimate: dict[str, set[str]] = {}
+        self._entry: dict[str, tuple[str, tuple[datetime, str]]] = {}
+
+    def update(self, task: Task) -> None:
+        self.remove(task.id)
+        if task.status != Status.IN_PROGRESS:
+            return
+        entry = (naive_utc(task.updated_at), task.id)
+        bisect.insort(self._by_update.setdefault(task.project_id, []), entry)
+        self._entry[task.id] = (task.project_id, entry)
+        if (
+            task.estimated_hours is not None
+            and task.actual_hours > task.estimated_hours * OVER_ESTIMATE_FACTOR
+        ):
+            self._over_estimate.setdefault(task.project_id, set()).add(task.id)
+
+    def remove(self, task_id: str) -> None:
+        found = self._entry.pop(task_id, None)
+        if found is None:
+            return
+        project_id, entry = found
+        entries = self._by_update[project_id]
+        del entries[bisect.bisect_left(entries, entry)]
+        self._over_estimate.get(project_id, set()).discard(task_id)
+
+    def clear(self) -> None:
+        self._by_update.clear()
+        self._over_estimate.clear()
+        self._entry.clear()
+
+    def stale(self, project_id: str, updated_before: datetime) -> list[str]:
+        """In-progress task ids not updated since ``updated_before``, oldest
+        first."""
+        entries = self._by_update.get(project_id, [])
+        stop = bisect.bisect_left(entries, (naive_utc(updated_before),))
+        return [task_id for _, task_id in entries[:stop]]
+
+    def over_estimate(self, project_id: str) -> set[str]:
+        return set(self._over_estimate.get(project_id, ()))
+
+
+# ---------------------------------------------------------------------------
+# Comments
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class _CommentDoc:
+    project_id: str
+    author_id: str
+    mentions: tuple[str, ...]
+    created_at: datetime
+    tokens: frozenset[str]
+
+
+class CommentIndex:
+    """Inverted index over comment text plus author, mention and time lookups.
+
+    Hits are ``(task_id, comment_id)`` pairs. Not thread-safe on its own;
+    the owning store serializes access.
+    """
+
+    def __init__(self) -> None:
+        self._docs: dict[CommentRef, _CommentDoc] = {}
+        self._postings: dict[str, set[CommentRef]] = {}
+        self._by_author: dict[str, set[CommentRef]] = {}
+        self._by_mention: dict[str, set[CommentRef]] = {}
+        self._by_task: dict[str, set[str]] = {}
+        self._timeline: list[tuple[datetime, CommentRef]] = []
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, task_id: str, project_id: str, comment: Comment) -> None:
+        ref = (task_id, comment.id)
+        if ref in self._docs:
+            self.remove(task_id, comment.id)
+        doc = _CommentDoc(
+            project_id=project_id,
+            author_id=comment.author_id,
+            mentions=tuple(comment.mentions),
+            created_at=comment.created_at,
+            tokens=frozenset(tokenize(comment.content)),
+        )
+        self._docs[ref] = doc
+        for token in doc.tokens:
+            self._postings.setdefault(token, set()).add(ref)
+        self._by_author.setdefault(doc.author_id, set()).add(ref)
+        for uid in doc.mentions:
+            self._by_mention.setdefault(uid, set()).add(ref)
+        self._by_task.setdefault(task_id, set()).add(comment.id)
+        bisect.insort(self._timeline, (doc.created_at, ref))
+
+    def remove(self, task_id: str, comment_id: str) -> None:
+        ref = (task_id, comment_id)
+        doc = self._docs.pop(ref, None)
+        if doc is None:
+            return
+        for token in doc.tokens:
+            _discard(self._postings, token, ref)
+        _discard(self._by_author, doc.author_id, ref)
+        for uid in doc.mentions:
+            _discard(self._by_mention, uid, ref)
+        comment_ids = self._by_task.get(task_id)
+        if comment_ids is not None:
+            comment_ids.discard(comment_id)
+            if not comment_ids:
+                del self._by_task[task_id]
+        i = bisect.bisect_left(self._timeline, (doc.created_at, ref))
+        if i < len(self._timeline) and self._timeline[i][1] == ref:
+            del self._timeline[i]
+
+    def remove_task(self, task_id: str) -> None:
+        for comment_id in list(self._by_task.get(task_id, ())):
+            self.remove(task_id, comment_id)
+
+    def clear(self) -> None:
+        self._docs.clear()
+        self._postings.clear()
+        self._by_author.clear()
+        self._by_mention.clear()
+        self._by_task.clear()
+        self._timeline.clear()
+
+    def search(
+        self,
+        query: str = "",
+        project_id: str | None = None,
+        author_id: str | None = None,
+        mention_id: str | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        limit: int | None = None,
+    ) -> list[CommentRef]:
+        """Newest-first hits containing every query term and matching all
+        given filters."""
+        candidate_sets: list[set[CommentRef]] = [
+            self._postings.get(token, set()) for token in tokenize(query)
+        ]
+        if author_id is not None:
+            candidate_sets.append(self._by_author.get(author_id, set()))
+        if mention_id is not None:
+            candidate_sets.append(self._by_mention.get(mention_id, set()))
+
+        if not candidate_sets:
+            lo, hi = 0, len(self._timeline)
+            if since is not None:
+                lo = bisect.bisect_left(self._timeline, since, key=_entry_time)
+            if until is not None:
+                hi = bisect.bisect_right(self._timeline, until, key=_entry_time)
+            hits: list[CommentRef] = []
+            for i in range(hi - 1, lo - 1, -1):
+                ref = self._timeline[i][1]
+                if project_id is None or self._docs[ref].project_id == project_id:
+                    hits.append(ref)
+                    if limit is not None and len(hits) >= limit:
+                        break
+            return hits
+
+        candidate_sets.sort(key=len)
+        candidates = set(candidate_sets[0])
+        for other in candidate_sets[1:]:
+            candidates &= other
+            if not candidates:
+                return []
+        docs = self._docs
+        matched = [
+            ref
+            for ref in candidates
+            if (project_id is None or docs[ref].project_id == project_id)
+            and (since is None or docs[ref].created_at >= since)
+            and (until is None or docs[ref].created_at <= until)
+        ]
+        matched.sort(key=lambda ref: (docs[ref].created_at, ref), reverse=True)
+        return matched if limit is None else matched[:limit]
+
+
+def _entry_time(entry: tuple[datetime, CommentRef]) -> datetime:
+    return entry[0]
+
+
+def _discard(index: dict[str, set[CommentRef]], key: str, ref: CommentRef) -> None:
+    refs = index.get(key)
+    if refs is not None:
+        refs.discard(ref)
+        if not refs:
+            del index[key]
+
+
+# ---------------------------------------------------------------------------
+# Custom fields
+# ---------------------------------------------------------------------------
+
+_UNSET: Any = object()
+_RANGE_OPS = ("gt", "gte", "lt", "lte")
+
+
+@dataclass(frozen=True)
+class FieldCondition:
+    """A predicate on one ``Task.custom_fields`` entry.
+
+    Built from a spec value by ``parse_field_conditions``: a plain value
+    means equality, a dict uses the operators ``eq``, ``in``, ``gt``,
+    ``gte``, ``lt`` and ``lte``. Tasks without the field never match.
+    """
+
+    field: str
+    eq: Any = _UNSET
+    one_of: tuple[Any, ...] | None = None
+    gt: Any = _UNSET
+    gte: Any = _UNSET
+    lt: Any = _UNSET
+    lte: Any = _UNSET
+
+    @property
+    def is_range(self) -> bool:
+        return any(getattr(self, op) is not _UNSET for op in _RANGE_OPS)
+
+    def matches(self, fields: dict[str, Any]) -> bool:
+        if self.field not in fields:
+            return False
+        value = fields[self.field]
+        if self.eq is not _UNSET and value != self.eq:
+            return False
+        if self.one_of is not None and value not in self.one_of:
+            return False
+        try:
+            if self.gt is not _UNSET and not value > self.gt:
+                return False
+            if self.gte is not _UNSET and not value >= self.gte:
+                return False
+            if self.lt is not _UNSET and not value < self.lt:
+                return False
+            if self.lte is not _UNSET and not value <= self.lte:
+                return False
+        except TypeError:
+            return False
+        return True
+
+
+def parse_field_conditions(spec: dict[str, Any]) -> list[FieldCondition]:
+    conditions: list[FieldCondition] = []
+    for name, raw in spec.items():
+        if not isinstance(raw, dict):
+            conditions.append(FieldCondition(name, eq=raw))
+            continue
+        kwargs: dict[str, Any] = {}
+        for op, operand in raw.items():
+            if op == "eq":
+                kwargs["eq"] = operand
+            elif op == "in":
+                kwargs["one_of"] = tuple(operand)
+            elif op in _RANGE_OPS:
+                kwargs[op] = operand
+            else:
+                raise ValueError(f"Unknown operator '{op}' for custom field '{name}'")
+        conditions.append(FieldCondition(name, **kwargs))
+    return conditions
+
+
+class HashFieldIndex:
+    """Exact-value index over one custom field; serves ``eq`` and ``in``."""
+
+    kind = "hash"
+
+    def __init__(self, field: str) -> None:
+        self.field = field
+        self._buckets: dict[Hashable, set[str]] = {}
+        self._values: dict[str, Hashable] = {}
+
+    def update(self, task_id: str, fields: dict[str, Any]) -> None:
+        self.remove(task_id)
+        if self.field not in fields:
+            return
+        value = fields[self.field]
+        if not isinstance(value, Hashable):
+            return
+        self._values[task_id] = value
+        self._buckets.setdefault(value, set()).add(task_id)
+
+    def remove(self, task_id: str) -> None:
+        if task_id not in self._values:
+            return
+        value = self._values.pop(task_id)
+        bucket = self._buckets[value]
+        bucket.discard(task_id)
+        if not bucket:
+            del self._buckets[value]
+
+    def lookup(self, cond: FieldCondition) -> set[str] | None:
+        if cond.is_range:
+            return None
+        keys: list[Any] = []
+        if cond.eq is not _UNSET:
+            keys.append(cond.eq)
+        elif cond.one_of is not None:
+            keys.extend(cond.one_of)
+        else:
+            return None
+        if not all(isinstance(k, Hashable) for k in keys):
+            return None
+        hits: set[str] = set()
+        for key in keys:
+            hits |= self._buckets.get(key, set())
+        return hits
+
+
+def _sort_key(value: Any) -> tuple[int, Any] | None:
+    if isinstance(value, (int, float)):
+        return (0, value)
+    if isinstance(value, str):
+        return (1, value)
+    if isinstance(value, datetime):
+        # Naive and aware datetimes never compare, so they get separate key
+        # spaces; aware ones are ordered by their UTC instant.
+        if value.tzinfo is None:
+            return (2, value)
+        return (3, naive_utc(value))
+    return None
+
+
+class SortedFieldIndex:
+    """Ordered index over one custom field; serves ``eq``, ``in`` and ranges.
+
+    Only numbers, strings, naive datetimes and aware datetimes are indexed,
+    each in its own key space, mirroring the fact that mixed-type
+    comparisons never match.
+    """
+
+    kind = "sorted"
+
+    def __init__(self, field: str) -> None:
+        self.field = field
+        self._entries: list[tuple[tuple[int, Any], str]] = []
+        self._keys: dict[str, tuple[int, Any]] = {}
+
+    def update(self, task_id: str, fields: dict[str, Any]) -> None:
+        self.remove(task_id)
+        if self.field not in fields:
+            return
+        key = _sort_key(fields[self.field])
+        if key is None:
+            return
+        self._keys[task_id] = key
+        bisect.insort(self._entries, (key, task_id))
+
+    def remove(self, task_id: str) -> None:
+        key = self._keys.pop(task_id, None)
+        if key is None:
+            return
+        i = bisect.bisect_left(self._entries, (key, task_id))
+        if i < len(self._entries) and self._entries[i] == (key, task_id):
+            del self._entries[i]
+
+    def lookup(self, cond: FieldCondition) -> set[str] | None:
+        if cond.eq is not _UNSET or cond.one_of is not None:
+            points = [cond.eq] if cond.eq is not _UNSET else list(cond.one_of or ())
+            hits: set[str] = set()
+            for point in points:
+                key = _sort_key(point)
+                if key is None:
+                    return None
+                hits |= self._slice(
+                    bisect.bisect_left(self._entries, key, key=_entry_key),
+                    bisect.bisect_right(self._entries, key, key=_entry_key),
+                )
+            return hits
+        return self._range(cond)
+
+    def _range(self, cond: FieldCondition) -> set[str] | None:
+        lower = (cond.gte, True) if cond.gte is not _UNSET else (cond.gt, False)
+        upper = (cond.lte, True) if cond.lte is not _UNSET else (cond.lt, False)
+        lo_key = None if lower[0] is _UNSET else _sort_key(lower[0])
+        hi_key = None if upper[0] is _UNSET else _sort_key(upper[0])
+        if (lower[0] is not _UNSET and lo_key is None) or (
+            upper[0] is not _UNSET and hi_key is None
+        ):
+            return None
+        if lo_key is None and hi_key is None:
+            return None
+        if lo_key is not None and hi_key is not None and lo_key[0] != hi_key[0]:
+            return set()
+        rank = (lo_key or hi_key or (0,))[0]
+        entries = self._entries
+        if lo_key is None:
+            lo = bisect.bisect_left(entries, (rank,), key=_entry_key)
+        elif lower[1]:
+            lo = bisect.bisect_left(entries, lo_key, key=_entry_key)
+        else:
+            lo = bisect.bisect_right(entries, lo_key, key=_entry_key)
+        if hi_key is None:
+            hi = bisect.bisect_left(entries, (rank + 1,), key=_entry_key)
+        elif upper[1]:
+            hi = bisect.bisect_right(entries, hi_key, key=_entry_key)
+        else:
+            hi = bisect.bisect_left(entries, hi_key, key=_entry_key)
+        return self._slice(lo, hi)
+
+    def _slice(self, lo: int, hi: int) -> set[str]:
+        return {task_id for _, task_id in self._entries[lo:hi]}
+
+
+def _entry_key(entry: tuple[tuple[int, Any], str]) -> tuple[int, Any]:
+    return entry[0]
+
+
+FieldIndex = HashFieldIndex | SortedFieldIndex
+FIELD_INDEX_KINDS: dict[str, type[HashFieldIndex] | type[SortedFieldIndex]] = {
+    "hash": HashFieldIndex,
+    "sorted": SortedFieldIndex,
+}
@@ -2,13 +2,33 @@
 
 from __future__ import annotations
 
+import bisect
 import json
 import os
 import threading
-from datetime import datetime
-from typing import Any
-
-from models.core import Project, Sprint, Tag, Task, User
+from datetime import date, datetime, time, timedelta
+from typing import Any, Iterator
+
+from models.core import Comment, Project, Sprint, Status, Tag, Task, User
+from models.indexes import (
+    FIELD_INDEX_KINDS,
+    BlockedTaskIndex,
+    CommentIndex,
+    CommentRef,
+    DailyRollup,
+    FieldCondition,
+    FieldIndex,
+    HierarchyIndex,
+    SprintTimeline,
+    StatusTransition,
+    TaskAggregate,
+    TaskRow,
+    TaskSnapshot,
+    naive_utc,
+    rollup_day,
+    transitions_between,
+)
+from utils.sketches import HyperLogLog, ReservoirSample
 
 
 class StorageError(Exception):
@@ -19,6 +39,15 @@ class NotFoundError(StorageError):
     pass
 
 
+TaskKey = tuple[datetime, str]
+SprintKey = tuple[datetime, str]
+
+
+def task_sort_key(task: Task) -> TaskKey:
+    """Stable ordering key for tasks: creation time, then id as a tie-breaker."""
+    return (task.created_at, task.id)
+
+
 class DataStore:
     """Thread-safe in-memory store with optional JSON persistence."""
 
@@ -29,6 +58,26 @@ class DataStore:
         self._tasks: dict[str, Task] = {}
         self._tags: dict[str, Tag] = {}
         self._sprints: dict[str, Sprint] = {}
+        self._task_keys: list[TaskKey] = []
+        self._project_task_keys: dict[str, list[TaskKey]] = {}
+        self._comment_index = CommentIndex()
+        self._blocked_index = BlockedTaskIndex()
+        self._hierarchy = HierarchyIndex()
+        self._field_indexes: dict[str, dict[str, FieldIndex]] = {}
+        self._snapshots: dict[str, TaskSnapshot] = {}
+        self._project_aggregates: dict[str, TaskAggregate] = {}
+        self._sprint_aggregates: dict[str, TaskAggregate] = {}
+        self._sprint_members: dict[str, set[str]] = {}
+        self._sprint_end_keys: dict[str, list[SprintKey]] = {}
+        self._sprint_end_of: dict[str, tuple[str, SprintKey]] = {}
+        self._timelines: dict[str, SprintTimeline] = {}
+        self._rollups: dict[str, list[DailyRollup]] = {}
+        self._samples: dict[str, ReservoirSample[str]] = {}
+        self._assignee_sketches: dict[str, HyperLogLog] = {}
+        self._epoch = 0
+        self._global_version = 0
+        self._users_version = 0
+        self._project_versions: dict[str, int] = {}
         self._persist_path = persist_path
 
         if persist_path and os.path.exists(persist_path):
@@ -46,6 +95,7 @@ class DataStore:
                 if u.username == user.username:
                     raise StorageError(f"Username '{user.username}' is already taken")
             self._users[user.id] = user
+            self._bump_users()
             return user
 
     def get_user(self, user_id: str) -> User:
@@ -73,6 +123,7 @@ class DataStore:
             if user.id not in self._users:
                 raise NotFoundError(f"User {user.id} not found")
             self._users[user.id] = user
+            self._bump_users()
             return user
 
     def delete_user(self, user_id: str) -> None:
@@ -80,6 +131,7 @@ class DataStore:
             if user_id not in self._users:
                 raise NotFoundError(f"User {user_id} not found")
             del self._users[user_id]
+            self._bump_users()
 
     # ------------------------------------------------------------------
     # Projects
@@ -90,6 +142,7 @@ class DataStore:
             if project.id in self._projects:
                 raise StorageError(f"Project {project.id} already exists")
             self._projects[project.id] = project
+            self._bump(project.id)
             return project
 
     def get_project(self, project_id: str) -> Project:
@@ -123,6 +176,7 @@ class DataStore:
                 raise NotFoundError(f"Project {project.id} not found")
             project.updated_at = datetime.utcnow()
             self._projects[project.id] = project
+            self._bump(project.id)
             return project
 
     def delete_project(self, project_id: str) -> None:
@@ -130,6 +184,7 @@ class DataStore:
             if project_id not in self._projects:
                 raise NotFoundError(f"Project {project_id} not found")
             del self._projects[project_id]
+            self._bump(project_id)
 
     # ------------------------------------------------------------------
     # Tasks
@@ -140,6 +195,8 @@ class DataStore:
             if task.id in self._tasks:
                 raise StorageError(f"Task {task.id} already exists")
             self._tasks[task.id] = task
+            self._index_task(task)
+            self._bump(task.project_id)
             return task
 
     def get_task(self, task_id: str) -> Task:
@@ -155,13 +212,41 @@ class DataStore:
             tasks = [t for t in tasks if t.project_id == project_id]
         return tasks
 
+    def iter_tasks(
+        self,
+        project_id: str | None = None,
+        after: TaskKey | None = None,
+        chunk_size: int = 256,
+    ) -> Iterator[Task]:
+        """Yield tasks in ``task_sort_key`` order, starting after ``after``.
+
+        The lock is only held while a chunk of keys is resolved, so callers
+        can stop early without paying for the rest of the store.
+        """
+        while True:
+            with self._lock:
+                keys = (
+                    self._task_keys
+                    if project_id is None
+                    else self._project_task_keys.get(project_id, [])
+                )
+                start = 0 if after is None else bisect.bisect_right(keys, after)
+                chunk = [self._tasks[k[1]] for k in keys[start : start + chunk_size]]
+            yield from chunk
+            if len(chunk) < chunk_size:
+                return
+            after = task_sort_key(chunk[-1])
+
     def list_tasks_for_user(self, user_id: str) -> list[Task]:
         with self._lock:
             return [t for t in self._tasks.values() if user_id in t.assignee_ids]
 
     def list_tasks_in_sprint(self, sprint_id: str) -> list[Task]:
         with self._lock:
-            return [t for t in self._tasks.values() if t.sprint_id == sprint_id]
+            members = self._sprint_members.get(sprint_id, ())
+            tasks = [self._tasks[tid] for tid in members]
+        tasks.sort(key=task_sort_key)
+        return tasks
 
     def update_task(self, task: Task) -> Task:
         with self._lock:
@@ -169,13 +254,391 @@ class DataStore:
                 raise NotFoundError(f"Task {task.id} not found")
             task.updated_at = datetime.utcnow()
             self._tasks[task.id] = task
+            # The caller has already mutated the task, so cached results are
+            # stale even if re-indexing fails.
+            try:
+                for index in self._field_indexes.get(task.project_id, {}).values():
+                    index.update(task.id, task.custom_fields)
+                self._blocked_index.update(task)
+                self._refresh_snapshot(task)
+            finally:
+                self._bump(task.project_id)
             return task
 
     def delete_task(self, task_id: str) -> None:
         with self._lock:
             if task_id not in self._tasks:
                 raise NotFoundError(f"Task {task_id} not found")
-            del self._tasks[task_id]
+            task = self._tasks.pop(task_id)
+            self._unindex_task(task)
+            self._bump(task.project_id)
+
+    def delete_task_tree(self, task_id: str) -> list[str]:
+        """Delete a task and all of its descendants under one lock, detaching
+        it from its parent first. Returns the deleted ids, parents first."""
+        with self._lock:
+            if task_id not in self._tasks:
+                raise NotFoundError(f"Task {task_id} not found")
+            root = self._tasks[task_id]
+            parent = (
+                self._tasks.get(root.parent_task_id) if root.parent_task_id else None
+            )
+            if parent is not None and task_id in parent.subtask_ids:
+                parent.subtask_ids.remove(task_id)
+                self.update_task(parent)
+            ids = self._hierarchy.subtree(task_id)
+            projects: set[str] = set()
+            for tid in reversed(ids):
+                task = self._tasks.pop(tid)
+                self._unindex_task(task)
+                projects.add(task.project_id)
+            for project_id in projects:
+                self._bump(project_id)
+            return ids
+
+    def _index_task(self, task: Task) -> None:
+        self._seal_rollup(task.project_id)
+        key = task_sort_key(task)
+        bisect.insort(self._task_keys, key)
+        bisect.insort(self._project_task_keys.setdefault(task.project_id, []), key)
+        for comment in task.comments:
+            self._comment_index.add(task.id, task.project_id, comment)
+        for index in self._field_indexes.get(task.project_id, {}).values():
+            index.update(task.id, task.custom_fields)
+        self._blocked_index.update(task)
+        self._sample(task.project_id).add(task.id)
+        self._hierarchy.add(task.id, task.parent_task_id)
+        snap = TaskSnapshot.of(task)
+        self._add_snapshot(task.id, snap)
+        self._refreeze_velocity(snap.sprint_id)
+        self._record_transitions(task.id, None, snap, task.updated_at)
+
+    def _refresh_snapshot(self, task: Task) -> None:
+        old = self._snapshots[task.id]
+        new = TaskSnapshot.of(task)
+        if new != old:
+            self._seal_rollup(old.project_id)
+            self._seal_rollup(new.project_id)
+            self._remove_snapshot(task.id, old)
+            self._add_snapshot(task.id, new)
+            self._refreeze_velocity(old.sprint_id)
+            if new.sprint_id != old.sprint_id:
+                self._refreeze_velocity(new.sprint_id)
+            self._record_transitions(task.id, old, new, task.updated_at)
+
+    def _record_transitions(
+        self,
+        task_id: str,
+        old: TaskSnapshot | None,
+        new: TaskSnapshot | None,
+        at: datetime,
+    ) -> None:
+        for sprint_id, event in transitions_between(task_id, old, new, naive_utc(at)):
+            self._timeline(sprint_id).append(event)
+
+    def _timeline(self, sprint_id: str) -> SprintTimeline:
+        timeline = self._timelines.get(sprint_id)
+        if timeline is None:
+            timeline = self._timelines[sprint_id] = SprintTimeline()
+        return timeline
+
+    def _synthesize_timelines(self) -> None:
+        # Data saved before timelines existed only has the current state:
+        # each task enters its sprint when created and, if done, is taken to
+        # have finished at its last update.
+        self._timelines = {}
+        for task in sorted(self._tasks.values(), key=task_sort_key):
+            if task.sprint_id is None:
+                continue
+            points = task.story_points or 0
+            created = naive_utc(task.created_at)
+            if task.status != Status.DONE:
+                event = StatusTransition(created, task.id, None, task.status, points)
+                self._timeline(task.sprint_id).append(event)
+                continue
+            timeline = self._timeline(task.sprint_id)
+            timeline.append(
+                StatusTransition(created, task.id, None, Status.TODO, points)
+            )
+            done_at = naive_utc(task.updated_at)
+            timeline.append(
+                StatusTransition(done_at, task.id, Status.TODO, Status.DONE, points)
+            )
+
+    def _refreeze_velocity(self, sprint_id: str | None) -> None:
+        # A completed sprint keeps its velocity in ``Sprint.velocity``; a
+        # later edit to one of its tasks recomputes it from the aggregate.
+        sprint = self._sprints.get(sprint_id) if sprint_id is not None else None
+        if sprint is None or sprint.velocity is None:
+            return
+        agg = self._sprint_aggregates.get(sprint.id)
+        sprint.velocity = float(agg.completed_points) if agg is not None else 0.0
+
+    def _add_snapshot(self, task_id: str, snap: TaskSnapshot) -> None:
+        self._snapshots[task_id] = snap
+        if snap.assignee_ids:
+            sketch = self._assignee_sketches.get(snap.project_id)
+            if sketch is None:
+                sketch = self._assignee_sketches[snap.project_id] = HyperLogLog()
+            for uid in snap.assignee_ids:
+                sketch.add(uid)
+        _group(self._project_aggregates, snap.project_id).add(task_id, snap)
+        if snap.sprint_id is not None:
+            _group(self._sprint_aggregates, snap.sprint_id).add(task_id, snap)
+            self._sprint_members.setdefault(snap.sprint_id, set()).add(task_id)
+
+    def _remove_snapshot(self, task_id: str, snap: TaskSnapshot) -> None:
+        del self._snapshots[task_id]
+        self._project_aggregates[snap.project_id].remove(task_id, snap)
+        if snap.sprint_id is not None:
+            self._sprint_aggregates[snap.sprint_id].remove(task_id, snap)
+            self._sprint_members[snap.sprint_id].discard(task_id)
+
+    def _reindex_tasks(self) -> None:
+        self._task_keys = sorted(task_sort_key(t) for t in self._tasks.values())
+        self._project_task_keys = {}
+        for key in self._task_keys:
+            pid = self._tasks[key[1]].project_id
+            self._project_task_keys.setdefault(pid, []).append(key)
+        self._comment_index.clear()
+        self._blocked_index.clear()
+        self._samples = {}
+        self._assignee_sketches = {}
+        self._hierarchy.rebuild(
+            {tid: t.parent_task_id for tid, t in self._tasks.items()}
+        )
+        self._snapshots = {}
+        self._project_aggregates = {}
+        self._sprint_aggregates = {}
+        self._sprint_members = {}
+        for task in self._tasks.values():
+            for comment in task.comments:
+                self._comment_index.add(task.id, task.project_id, comment)
+            self._blocked_index.update(task)
+            self._sample(task.project_id).add(task.id)
+            self._add_snapshot(task.id, TaskSnapshot.of(task))
+        for project_id, indexes in self._field_indexes.items():
+            for field_name, index in list(indexes.items()):
+                indexes[field_name] = self._build_field_index(
+                    project_id, field_name, index.kind
+                )
+
+    def _unindex_task(self, task: Task) -> None:
+        self._seal_rollup(task.project_id)
+        key = task_sort_key(task)
+        for keys in (self._task_keys, self._project_task_keys.get(task.project_id, [])):
+            i = bisect.bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                del keys[i]
+        self._comment_index.remove_task(task.id)
+        self._blocked_index.remove(task.id)
+        if task.project_id in self._samples:
+            self._samples[task.project_id].discard(task.id)
+        for index in self._field_indexes.get(task.project_id, {}).values():
+            index.remove(task.id)
+        snap = self._snapshots.get(task.id)
+        if snap is not None:
+            self._remove_snapshot(task.id, snap)
+            self._refreeze_velocity(snap.sprint_id)
+            self._record_transitions(task.id, snap, None, datetime.utcnow())
+        self._hierarchy.remove(task.id)
+
+    def blocked_task_ids(self, project_id: str, stale_before: datetime) -> list[str]:
+        """In-progress tasks of a project that were last updated before
+        ``stale_before`` (oldest first), followed by the remaining ones that
+        are well over their estimate."""
+        with self._lock:
+            stale = self._blocked_index.stale(project_id, stale_before)
+            over = self._blocked_index.over_estimate(project_id)
+        over.difference_update(stale)
+        return stale + sorted(over)
+
+    def subtree_tasks(self, task_id: str) -> list[Task]:
+        """A task and all of its descendants, parents before children."""
+        with self._lock:
+            if task_id not in self._tasks:
+                raise NotFoundError(f"Task {task_id} not found")
+            return [self._tasks[tid] for tid in self._hierarchy.subtree(task_id)]
+
+    def subtree_rollup(self, task_id: str) -> dict[str, Any]:
+        """Totals over a task and all of its descendants, summed over the
+        subtree when asked for."""
+        with self._lock:
+            if task_id not in self._tasks:
+                raise NotFoundError(f"Task {task_id} not found")
+            totals = self._hierarchy.totals(task_id, self._snapshots)
+            return {
+                "task_id": task_id,
+                "depth": self._hierarchy.depth(task_id),
+                "size": totals.tasks,
+                "done": totals.done,
+                "story_points": totals.story_points,
+                "completed_points": totals.completed_points,
+                "estimated_hours": round(totals.estimated_hours, 2),
+                "actual_hours": round(totals.actual_hours, 2),
+                "completion_rate": round(totals.done / totals.tasks * 100, 2)
+                if totals.tasks
+                else 0.0,
+            }
+
+    def _sample(self, project_id: str) -> ReservoirSample[str]:
+        sample = self._samples.get(project_id)
+        if sample is None:
+            sample = self._samples[project_id] = ReservoirSample()
+        return sample
+
+    def project_rows(self, project_id: str) -> list[TaskRow]:
+        """The report fields of every task in a project, in task order."""
+        with self._lock:
+            keys = self._project_task_keys.get(project_id, [])
+            return [self._snapshots[tid].row() for _, tid in keys]
+
+    def sample_project(
+        self, project_id: str, size: int | None = None
+    ) -> tuple[list[TaskSnapshot], int]:
+        """Snapshots of a uniform random sample of a project's tasks (at most
+        ``size`` of them), with the project's current task count."""
+        with self._lock:
+            sample = self._samples.get(project_id)
+            ids = sample.sample(size) if sample is not None else []
+            agg = self._project_aggregates.get(project_id)
+            return [self._snapshots[tid] for tid in ids], agg.total if agg else 0
+
+    def assignee_sketch(self, project_ids: list[str]) -> HyperLogLog:
+        """Distinct-assignee sketch over the given projects. Assignees are
+        never removed from a sketch, so it counts everyone ever assigned."""
+        merged = HyperLogLog()
+        with self._lock:
+            for pid in project_ids:
+                sketch = self._assignee_sketches.get(pid)
+                if sketch is not None:
+                    merged.merge(sketch)
+        return merged
+
+    def project_aggregate(self, project_id: str, now: datetime) -> dict[str, Any]:
+        """Copy of the maintained totals for a project. Nothing is rescanned;
+        the overdue count is a bisect over the open tasks' due dates."""
+        with self._lock:
+            return _aggregate_view(self._project_aggregates.get(project_id), now)
+
+    def overdue_count(self, project_id: str, now: datetime) -> int:
+        with self._lock:
+            agg = self._project_aggregates.get(project_id)
+            return agg.overdue_count(now) if agg is not None else 0
+
+    def sprint_aggregate(self, sprint_id: str, now: datetime) -> dict[str, Any]:
+        """Same as ``project_aggregate`` for the tasks currently in a sprint."""
+        with self._lock:
+            return _aggregate_view(self._sprint_aggregates.get(sprint_id), now)
+
+    def sprint_timeline_states(
+        self, sprint_id: str, moments: list[datetime]
+    ) -> list[tuple[int, dict[str, int]]]:
+        """Open story points and task count per status in a sprint just
+        before each of ``moments``, read from the transition timeline."""
+        with self._lock:
+            timeline = self._timelines.get(sprint_id) or SprintTimeline()
+            return [timeline.state_before(at) for at in moments]
+
+    def sprint_transitions(self, sprint_id: str) -> list[StatusTransition]:
+        with self._lock:
+            timeline = self._timelines.get(sprint_id)
+            return list(timeline.events) if timeline is not None else []
+
+    def tasks_in_order(
+        self, task_ids: set[str], after: TaskKey | None = None
+    ) -> list[Task]:
+        """Resolve ``task_ids`` to tasks sorted by ``task_sort_key``."""
+        with self._lock:
+            tasks = [self._tasks[tid] for tid in task_ids if tid in self._tasks]
+        tasks.sort(key=task_sort_key)
+        if after is not None:
+            tasks = tasks[bisect.bisect_right(tasks, after, key=task_sort_key) :]
+        return tasks
+
+    # ------------------------------------------------------------------
+    # Custom field indexes
+    # ------------------------------------------------------------------
+
+    def create_field_index(
+        self, project_id: str, field_name: str, kind: str = "hash"
+    ) -> None:
+        if kind not in FIELD_INDEX_KINDS:
+            raise StorageError(f"Unknown custom field index kind '{kind}'")
+        with self._lock:
+            if project_id not in self._projects:
+                raise NotFoundError(f"Project {project_id} not found")
+            index = self._build_field_index(project_id, field_name, kind)
+            self._field_indexes.setdefault(project_id, {})[field_name] = index
+
+    def drop_field_index(self, project_id: str, field_name: str) -> None:
+        with self._lock:
+            self._field_indexes.get(project_id, {}).pop(field_name, None)
+
+    def list_field_indexes(self, project_id: str) -> dict[str, str]:
+        with self._lock:
+            indexes = self._field_indexes.get(project_id, {})
+            return {name: index.kind for name, index in indexes.items()}
+
+    def field_index_candidates(
+        self, project_id: str, conditions: list[FieldCondition]
+    ) -> set[str] | None:
+        """Task ids that may satisfy every condition, or ``None`` when no
+        declared index can narrow the search."""
+        with self._lock:
+            indexes = self._field_indexes.get(project_id, {})
+            candidates: set[str] | None = None
+            for cond in conditions:
+                index = indexes.get(cond.field)
+                hits = index.lookup(cond) if index is not None else None
+                if hits is None:
+                    continue
+                candidates = hits if candidates is None else candidates & hits
+                if not candidates:
+                    break
+            return candidates
+
+    def _build_field_index(
+        self, project_id: str, field_name: str, kind: str
+    ) -> FieldIndex:
+        index = FIELD_INDEX_KINDS[kind](field_name)
+        for key in self._project_task_keys.get(project_id, []):
+            index.update(key[1], self._tasks[key[1]].custom_fields)
+        return index
+
+    # ------------------------------------------------------------------
+    # Comment index
+    # ------------------------------------------------------------------
+
+    def index_comment(self, task: Task, comment: Comment) -> None:
+        with self._lock:
+            if task.id in self._tasks:
+                self._comment_index.add(task.id, task.project_id, comment)
+
+    def unindex_comment(self, task_id: str, comment_id: str) -> None:
+        with self._lock:
+            self._comment_index.remove(task_id, comment_id)
+
+    def search_comments(
+        self,
+        query: str = "",
+        project_id: str | None = None,
+        author_id: str | None = None,
+        mention_id: str | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        limit: int | None = None,
+    ) -> list[CommentRef]:
+        with self._lock:
+            return self._comment_index.search(
+                query=query,
+                project_id=project_id,
+                author_id=author_id,
+                mention_id=mention_id,
+                since=since,
+                until=until,
+                limit=limit,
+            )
 
     # ------------------------------------------------------------------
     # Tags
@@ -184,6 +647,7 @@ class DataStore:
     def add_tag(self, tag: Tag) -> Tag:
         with self._lock:
             self._tags[tag.id] = tag
+            self._bump(None)
             return tag
 
     def get_tag(self, tag_id: str) -> Tag:
@@ -209,7 +673,9 @@ class DataStore:
 
     def add_sprint(self, sprint: Sprint) -> Sprint:
         with self._lock:
+            self._index_sprint(sprint)
             self._sprints[sprint.id] = sprint
+            self._bump(sprint.project_id)
             return sprint
 
     def get_sprint(self, sprint_id: str) -> Sprint:
@@ -229,9 +695,125 @@ class DataStore:
         with self._lock:
             if sprint.id not in self._sprints:
                 raise NotFoundError(f"Sprint {sprint.id} not found")
+            self._index_sprint(sprint)
             self._sprints[sprint.id] = sprint
+            self._bump(sprint.project_id)
             return sprint
 
+    def sprints_ending_before(
+        self, project_id: str, before: datetime, limit: int | None = None
+    ) -> list[Sprint]:
+        """Sprints of a project whose end date is before ``before``, oldest
+        first; with ``limit``, only the last ``limit`` of them."""
+        with self._lock:
+            keys = self._sprint_end_keys.get(project_id, [])
+            stop = bisect.bisect_left(keys, (naive_utc(before),))
+            start = 0 if limit is None else max(0, stop - limit)
+            return [self._sprints[sid] for _, sid in keys[start:stop]]
+
+    def _index_sprint(self, sprint: Sprint) -> None:
+        # Sprints are edited in place, so the previous key is remembered to
+        # find the stale entry when the end date or project changes.
+        key = (naive_utc(sprint.end_date), sprint.id)
+        current = self._sprint_end_of.get(sprint.id)
+        if current == (sprint.project_id, key):
+            return
+        if current is not None:
+            old_project, old_key = current
+            keys = self._sprint_end_keys[old_project]
+            del keys[bisect.bisect_left(keys, old_key)]
+        bisect.insort(self._sprint_end_keys.setdefault(sprint.project_id, []), key)
+        self._sprint_end_of[sprint.id] = (sprint.project_id, key)
+
+    # ------------------------------------------------------------------
+    # Versions
+    # ------------------------------------------------------------------
+
+    def cache_token(self, project_id: str | None = None) -> tuple[int, ...]:
+        """Opaque version token that changes whenever the data a query over
+        ``project_id`` (or the whole store, if ``None``) depends on changes."""
+        with self._lock:
+            if project_id is None:
+                return (self._epoch, self._global_version)
+            return (
+                self._epoch,
+                self._project_versions.get(project_id, 0),
+                self._users_version,
+            )
+
+    def _bump(self, project_id: str | None) -> None:
+        self._global_version += 1
+        if project_id is not None:
+            self._project_versions[project_id] = (
+                self._project_versions.get(project_id, 0) + 1
+            )
+            if project_id in self._projects:
+                self._record_rollup(project_id)
+
+    def _bump_users(self) -> None:
+        self._global_version += 1
+        self._users_version += 1
+
+    # ------------------------------------------------------------------
+    # Daily rollups
+    # ------------------------------------------------------------------
+
+    def _record_rollup(self, project_id: str) -> None:
+        # Every change rewrites today's row from the maintained aggregate, so
+        # the last row written on a day is that day's closing state.
+        now = datetime.utcnow()
+        agg = self._project_aggregates.get(project_id) or TaskAggregate()
+        row = DailyRollup.of(now.date(), agg, now)
+        series = self._rollups.setdefault(project_id, [])
+        if series and series[-1].day >= row.day:
+            series[-1] = row
+        else:
+            series.append(row)
+
+    def _seal_rollup(self, project_id: str) -> None:
+        # Called before a change touches the project's aggregate. If the last
+        # row is from an earlier day, the aggregate still holds that day's
+        # closing state, so its due-date distribution is captured now, once.
+        series = self._rollups.get(project_id)
+        if not series or series[-1].sealed:
+            return
+        if series[-1].day < datetime.utcnow().date():
+            agg = self._project_aggregates.get(project_id) or TaskAggregate()
+            series[-1] = series[-1].seal(agg)
+
+    def project_rollups(
+        self, project_id: str, start: date, end: date
+    ) -> list[tuple[date, DailyRollup, int]]:
+        """``(day, row, overdue)`` for each day from ``start`` to ``end``. A day
+        without changes gets the previous row; days before the first row are
+        omitted. ``overdue`` is worked out for each day as it is read: from
+        the live due-date index for today and for days after an unsealed last
+        row (nothing has changed since it), and from the sealed row otherwise.
+        """
+        now = datetime.utcnow()
+        today = now.date()
+        with self._lock:
+            series = self._rollups.get(project_id, [])
+            agg = self._project_aggregates.get(project_id)
+            i = bisect.bisect_right(series, start, key=rollup_day) - 1
+            rows: list[tuple[date, DailyRollup, int]] = []
+            day = start
+            while day <= end:
+                while i + 1 < len(series) and series[i + 1].day <= day:
+                    i += 1
+                if i >= 0:
+                    row = series[i]
+                    if agg is not None and day == today:
+                        overdue = agg.overdue_count(now)
+                    elif agg is not None and i == len(series) - 1 and not row.sealed:
+                        end_of_day = datetime.combine(day + timedelta(days=1), time())
+                        overdue = agg.overdue_count(end_of_day)
+                    else:
+                        overdue = row.overdue_on(day)
+                    rows.append((day, row, overdue))
+                day += timedelta(days=1)
+            return rows
+
     # ------------------------------------------------------------------
     # Persistence
     # ------------------------------------------------------------------
@@ -240,21 +822,42 @@ class DataStore:
         target = path or self._persist_path
         if not target:
             return
+        data = self.snapshot()
+        with open(target, "w") as f:
+            json.dump(data, f, indent=2)
+
+    def snapshot(self) -> dict[str, Any]:
+        """JSON-serialisable copy of the store, as written by ``save`` and
+        accepted by ``load_dict``."""
         with self._lock:
-            data: dict[str, Any] = {
+            return {
                 "users": {uid: u.to_dict() for uid, u in self._users.items()},
                 "projects": {pid: p.to_dict() for pid, p in self._projects.items()},
                 "tasks": {tid: t.to_dict() for tid, t in self._tasks.items()},
                 "tags": {gid: g.to_dict() for gid, g in self._tags.items()},
                 "sprints": {sid: s.to_dict() for sid, s in self._sprints.items()},
+                "field_indexes": {
+                    pid: {name: index.kind for name, index in indexes.items()}
+                    for pid, indexes in self._field_indexes.items()
+                },
+                "sprint_timelines": {
+                    sid: [event.to_dict() for event in timeline.events]
+                    for sid, timeline in self._timelines.items()
+                },
+                "rollups": {
+                    pid: [row.to_dict() for row in series]
+                    for pid, series in self._rollups.items()
+                    if pid in self._projects
+                },
                 "saved_at": datetime.utcnow().isoformat(),
             }
-        with open(target, "w") as f:
-            json.dump(data, f, indent=2)
 
     def load(self, path: str) -> None:
         with open(path) as f:
             data: dict[str, Any] = json.load(f)
+        self.load_dict(data)
+
+    def load_dict(self, data: dict[str, Any]) -> None:
         with self._lock:
             for uid, udata in data.get("users", {}).items():
                 self._users[uid] = User.from_dict(udata)
@@ -262,6 +865,11 @@ class DataStore:
                 self._projects[pid] = Project.from_dict(pdata)
             for tid, tdata in data.get("tasks", {}).items():
                 self._tasks[tid] = Task.from_dict(tdata)
+            for pid, declared in data.get("field_indexes", {}).items():
+                for name, kind in declared.items():
+                    index = FIELD_INDEX_KINDS[str(kind)](str(name))
+                    self._field_indexes.setdefault(pid, {})[name] = index
+            self._reindex_tasks()
             for gid, gdata in data.get("tags", {}).items():
                 self._tags[gid] = Tag(
                     name=str(gdata["name"]),
@@ -284,11 +892,62 @@ class DataStore:
                     else None
                 )
                 self._sprints[sid] = sprint
+                self._index_sprint(sprint)
+            if "sprint_timelines" in data:
+                self._timelines = {}
+                for sid, events in data["sprint_timelines"].items():
+                    timeline = self._timeline(sid)
+                    for edata in events:
+                        timeline.append(StatusTransition.from_dict(edata))
+            else:
+                self._synthesize_timelines()
+            for pid, rows in data.get("rollups", {}).items():
+                self._rollups[pid] = [DailyRollup.from_dict(row) for row in rows]
+            self._epoch += 1
 
     def clear(self) -> None:
         with self._lock:
             self._users.clear()
             self._projects.clear()
             self._tasks.clear()
+            self._task_keys.clear()
+            self._project_task_keys.clear()
+            self._comment_index.clear()
+            self._blocked_index.clear()
+            self._samples.clear()
+            self._assignee_sketches.clear()
+            self._hierarchy.clear()
+            self._field_indexes.clear()
+            self._snapshots.clear()
+            self._project_aggregates.clear()
+            self._sprint_aggregates.clear()
+            self._sprint_members.clear()
             self._tags.clear()
             self._sprints.clear()
+            self._sprint_end_keys.clear()
+            self._sprint_end_of.clear()
+            self._timelines.clear()
+            self._rollups.clear()
+            self._epoch += 1
+
+
+def _group(groups: dict[str, TaskAggregate], key: str) -> TaskAggregate:
+    aggregate = groups.get(key)
+    if aggregate is None:
+        aggregate = groups[key] = TaskAggregate()
+    return aggregate
+
+
+def _aggregate_view(agg: TaskAggregate | None, now: datetime) -> dict[str, Any]:
+    agg = agg or TaskAggregate()
+    return {
+        "total": agg.total,
+        "status_counts": dict(agg.status_counts),
+        "priority_counts": dict(agg.priority_counts),
+        "estimated_hours": agg.estimated_hours,
+        "actual_hours": agg.actual_hours,
+        "story_points": agg.story_points,
+        "completed_points": agg.completed_points,
+        "assignee_load": dict(agg.assignee_load),
+        "overdue": agg.overdue_count(now),
+    }
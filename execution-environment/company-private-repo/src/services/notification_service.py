@@ -2,12 +2,17 @@
 
 from __future__ import annotations
 
+import bisect
+import json
+import os
+import queue
 import threading
+import time
 import uuid
 from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import datetime, timedelta
 from enum import Enum
-from typing import Any, Callable
+from typing import Any, Callable, Hashable, Iterable, Iterator, TextIO, TypeVar
 
 from models.store import DataStore
 
@@ -54,16 +59,74 @@ class Event:
             "occurred_at": self.occurred_at.isoformat(),
         }
 
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Event:
+        event = cls(
+            event_type=EventType(data["event_type"]),
+            payload=dict(data.get("payload", {})),
+            actor_id=data.get("actor_id"),
+        )
+        event.id = str(data.get("id", event.id))
+        if "occurred_at" in data:
+            event.occurred_at = datetime.fromisoformat(str(data["occurred_at"]))
+        return event
+
+
+@dataclass(slots=True)
+class NotificationBody:
+    """The part of a notification shared by every recipient of one fan-out."""
 
-@dataclass
-class Notification:
-    recipient_id: str
     event: Event
     message: str
     id: str = field(default_factory=_new_id)
     created_at: datetime = field(default_factory=_now)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "event": self.event.to_dict(),
+            "message": self.message,
+            "created_at": self.created_at.isoformat(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> NotificationBody:
+        return cls(
+            event=Event.from_dict(data["event"]),
+            message=str(data["message"]),
+            id=str(data["id"]),
+            created_at=datetime.fromisoformat(str(data["created_at"])),
+        )
+
+
+@dataclass(slots=True)
+class Notification:
+    """One recipient's copy of a ``NotificationBody`` and its read state.
+
+    The id is ``"<body id>:<recipient id>"``, so it stays unique across
+    recipients without storing a string per copy.
+    """
+
+    recipient_id: str
+    body: NotificationBody
     is_read: bool = False
 
+    @property
+    def id(self) -> str:
+        return f"{self.body.id}:{self.recipient_id}"
+
+    @property
+    def event(self) -> Event:
+        return self.body.event
+
+    @property
+    def message(self) -> str:
+        return self.body.message
+
+    @property
+    def created_at(self) -> datetime:
+        return self.body.created_at
+
     def to_dict(self) -> dict[str, Any]:
         return {
             "id": self.id,
@@ -75,25 +138,778 @@ class Notification:
         }
 
 
+@dataclass(slots=True)
+class DigestNotification(Notification):
+    """Notifications of one event type for one recipient merged within a
+    coalescing window. ``body`` is the first one's; ``refs`` lists what each
+    merged notification was about."""
+
+    count: int = 1
+    refs: list[str] = field(default_factory=list)
+    last_at: datetime | None = None
+
+    @property
+    def message(self) -> str:
+        if self.count == 1:
+            return self.body.message
+        kind = self.event.event_type.value.replace("_", " ")
+        return f"{self.count} {kind} notifications"
+
+    def merge(self, ref: str, at: datetime) -> None:
+        self.count += 1
+        self.refs.append(ref)
+        self.last_at = at
+
+    def to_dict(self) -> dict[str, Any]:
+        data = Notification.to_dict(self)
+        data["count"] = self.count
+        data["refs"] = list(self.refs)
+        data["last_at"] = (self.last_at or self.created_at).isoformat()
+        return data
+
+
+def _event_ref(event: Event) -> str:
+    return str(event.payload.get("task_id", event.id))
+
+
 EventCallback = Callable[[Event], None]
 
 
-class NotificationService:
+# ---------------------------------------------------------------------------
+# Event log
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class LogSegment:
+    """An append-only file of spilled events, one JSON object per line, with
+    the range of ``occurred_at`` and the event types it holds."""
+
+    path: str
+    count: int = 0
+    first_at: datetime | None = None
+    last_at: datetime | None = None
+    types: dict[str, int] = field(default_factory=dict)
+
+    def add(self, event: Event) -> None:
+        at = event.occurred_at
+        self.count += 1
+        if self.first_at is None or at < self.first_at:
+            self.first_at = at
+        if self.last_at is None or at > self.last_at:
+            self.last_at = at
+        kind = event.event_type.value
+        self.types[kind] = self.types.get(kind, 0) + 1
+
+    def may_contain(
+        self, event_type: EventType | None, since: datetime | None
+    ) -> bool:
+        if self.last_at is None:
+            return False
+        if since is not None and self.last_at < since:
+            return False
+        return event_type is None or event_type.value in self.types
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "path": os.path.basename(self.path),
+            "count": self.count,
+            "first_at": self.first_at.isoformat() if self.first_at else None,
+            "last_at": self.last_at.isoformat() if self.last_at else None,
+            "types": self.types,
+        }
+
+    @classmethod
+    def from_dict(cls, directory: str, data: dict[str, Any]) -> LogSegment:
+        first_at, last_at = data.get("first_at"), data.get("last_at")
+        return cls(
+            path=os.path.join(directory, str(data["path"])),
+            count=int(data.get("count", 0)),
+            first_at=datetime.fromisoformat(first_at) if first_at else None,
+            last_at=datetime.fromisoformat(last_at) if last_at else None,
+            types={str(k): int(v) for k, v in data["types"].items()},
+        )
+
+
+_K = TypeVar("_K", bound=Hashable)
+
+
+def _trim_index(index: dict[_K, list[int]], offset: int) -> None:
+    # Drop sequence numbers below ``offset``, and keys left with none.
+    for key in list(index):
+        seqs = index[key]
+        cut = bisect.bisect_left(seqs, offset)
+        if cut == len(seqs):
+            del index[key]
+        elif cut:
+            del seqs[:cut]
+
+
+class EventLog:
+    """The most recent ``capacity`` events in memory, older ones on disk.
+
+    Events are numbered in publish order and queries return them newest
+    first in that order. In memory, each event type and actor keeps the
+    ascending numbers of its events, and ``since`` is answered by bisecting
+    the running maximum of ``occurred_at``, so a query touches only the
+    events it can return.
+
+    When the buffer is full, the oldest event is appended to the current
+    segment file in ``spill_dir``, and a new segment is started every
+    ``segment_events`` events. Each segment's time range and event types are
+    kept in memory (and in ``index.json``), so a query only reads segments
+    that can still contribute. Without ``spill_dir``, evicted events are
+    dropped. Not thread-safe; ``NotificationService`` serialises access.
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(
+        self,
+        capacity: int = 10_000,
+        spill_dir: str | None = None,
+        segment_events: int = 10_000,
+    ) -> None:
+        if capacity < 1 or segment_events < 1:
+            raise ValueError("capacity and segment_events must be positive")
+        self.capacity = capacity
+        self.segment_events = segment_events
+        # Live events are _events[_head:]; the evicted prefix is dropped in
+        # bulk once it reaches ``capacity``. _offset is the number of
+        # _events[0], and _high[i] the latest occurred_at up to _events[i].
+        self._events: list[Event] = []
+        self._high: list[datetime] = []
+        self._offset = 0
+        self._head = 0
+        self._by_type: dict[EventType, list[int]] = {}
+        self._by_actor: dict[str, list[int]] = {}
+        self._dir = spill_dir
+        self._segments: list[LogSegment] = []
+        self._handle: TextIO | None = None
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+            self._segments = self._read_index(spill_dir)
+
+    def __len__(self) -> int:
+        return self._live() + sum(s.count for s in self._segments)
+
+    def _live(self) -> int:
+        return len(self._events) - self._head
+
+    def append(self, event: Event, spill: bool = True) -> None:
+        """Add ``event``; with ``spill=False`` an evicted event is dropped
+        even if there is a spill directory, as when replaying events that
+        were already spilled."""
+        if self._live() == self.capacity:
+            self._evict(spill)
+        seq = self._offset + len(self._events)
+        high = event.occurred_at
+        if self._high and self._high[-1] > high:
+            high = self._high[-1]
+        self._events.append(event)
+        self._high.append(high)
+        self._by_type.setdefault(event.event_type, []).append(seq)
+        if event.actor_id is not None:
+            self._by_actor.setdefault(event.actor_id, []).append(seq)
+
+    def query(
+        self,
+        event_type: EventType | None = None,
+        actor_id: str | None = None,
+        since: datetime | None = None,
+        limit: int = 100,
+    ) -> list[Event]:
+        """Up to ``limit`` matching events at or after ``since``, most
+        recently published first."""
+        found: list[Event] = []
+        if limit <= 0:
+            return found
+        start = self._head
+        if since is not None:
+            start = bisect.bisect_left(self._high, since, lo=self._head)
+        for event in self._recent(event_type, actor_id, self._offset + start):
+            if since is None or event.occurred_at >= since:
+                found.append(event)
+                if len(found) == limit:
+                    return found
+
+        if self._handle is not None:
+            self._handle.flush()
+        for segment in reversed(self._segments):
+            if not segment.may_contain(event_type, since):
+                continue
+            for event in reversed(self._read_segment(segment)):
+                if (
+                    (event_type is None or event.event_type == event_type)
+                    and (actor_id is None or event.actor_id == actor_id)
+                    and (since is None or event.occurred_at >= since)
+                ):
+                    found.append(event)
+                    if len(found) == limit:
+                        return found
+        return found
+
+    def _recent(
+        self, event_type: EventType | None, actor_id: str | None, first: int
+    ) -> Iterator[Event]:
+        # Walk the shortest applicable index backwards from the newest event
+        # down to number ``first``, checking the other filter directly.
+        indexes: list[list[int]] = []
+        if event_type is not None:
+            indexes.append(self._by_type.get(event_type, []))
+        if actor_id is not None:
+            indexes.append(self._by_actor.get(actor_id, []))
+        if not indexes:
+            for i in range(len(self._events) - 1, first - self._offset - 1, -1):
+                yield self._events[i]
+            return
+        seqs = min(indexes, key=len)
+        stop = bisect.bisect_left(seqs, first)
+        for i in range(len(seqs) - 1, stop - 1, -1):
+            event = self._events[seqs[i] - self._offset]
+            if (event_type is None or event.event_type == event_type) and (
+                actor_id is None or event.actor_id == actor_id
+            ):
+                yield event
+
+    def recent(self) -> list[Event]:
+        """The events held in memory, oldest first."""
+        return self._events[self._head :]
+
+    def clear(self) -> None:
+        """Drop the events held in memory; spilled segments are kept."""
+        self.close()
+        self._events, self._high = [], []
+        self._offset = self._head = 0
+        self._by_type, self._by_actor = {}, {}
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+            self._write_index()
+
+    def _evict(self, spill: bool) -> None:
+        oldest = self._events[self._head]
+        self._head += 1
+        if spill and self._dir is not None:
+            self._spill(oldest)
+        if self._head >= self.capacity:
+            self._compact()
+
+    def _compact(self) -> None:
+        drop = self._head
+        del self._events[:drop]
+        del self._high[:drop]
+        self._offset += drop
+        self._head = 0
+        _trim_index(self._by_type, self._offset)
+        _trim_index(self._by_actor, self._offset)
+
+    def _spill(self, event: Event) -> None:
+        assert self._dir is not None
+        handle = self._handle
+        segment = self._segments[-1] if handle is not None else None
+        if handle is None or segment is None or segment.count >= self.segment_events:
+            self.close()
+            name = f"events-{len(self._segments):06d}.jsonl"
+            segment = LogSegment(path=os.path.join(self._dir, name))
+            self._segments.append(segment)
+            handle = open(segment.path, "a")
+            self._handle = handle
+        handle.write(json.dumps(event.to_dict()) + "\n")
+        segment.add(event)
+
+    def _read_segment(self, segment: LogSegment) -> list[Event]:
+        with open(segment.path) as f:
+            return [Event.from_dict(json.loads(line)) for line in f if line.strip()]
+
+    def _read_index(self, directory: str) -> list[LogSegment]:
+        path = os.path.join(directory, self.INDEX_FILE)
+        segments: list[LogSegment] = []
+        if os.path.exists(path):
+            with open(path) as f:
+                segments = [
+                    LogSegment.from_dict(directory, s)
+                    for s in json.load(f)
+                    if "types" in s
+                ]
+        # A segment missing from the index was still open when the process
+        # stopped, or was indexed without its event types; rebuild its entry
+        # from the file.
+        known = {s.path for s in segments}
+        for name in sorted(os.listdir(directory)):
+            full = os.path.join(directory, name)
+            if name.startswith("events-") and full not in known:
+                segment = LogSegment(path=full)
+                for event in self._read_segment(segment):
+                    segment.add(event)
+                segments.append(segment)
+        segments.sort(key=lambda s: s.path)
+        return segments
+
+    def _write_index(self) -> None:
+        assert self._dir is not None
+        path = os.path.join(self._dir, self.INDEX_FILE)
+        with open(path, "w") as f:
+            json.dump([s.to_dict() for s in self._segments], f)
+
+
+# ---------------------------------------------------------------------------
+# Inboxes
+# ---------------------------------------------------------------------------
+
+
+class _Inbox:
+    """One user's notifications in arrival order, with a body id -> position
+    map, a running unread count and a cursor before which everything is
+    read."""
+
     def __init__(self) -> None:
+        self.items: list[Notification] = []
+        self.positions: dict[str, int] = {}
+        self.unread = 0
+        self.cursor = 0
+        self.digests: dict[EventType, DigestNotification] = {}
+
+    def open_digest(
+        self, event_type: EventType, now: datetime, window: timedelta
+    ) -> DigestNotification | None:
+        """The unread digest of ``event_type`` whose window is still open."""
+        digest = self.digests.get(event_type)
+        if digest is None or digest.is_read or now - digest.created_at >= window:
+            return None
+        return digest
+
+    def add(self, notif: Notification) -> None:
+        self.positions[notif.body.id] = len(self.items)
+        self.items.append(notif)
+        if notif.is_read:
+            self._advance()
+        else:
+            self.unread += 1
+
+    def latest(self, limit: int, unread_only: bool = False) -> list[Notification]:
+        found: list[Notification] = []
+        stop = self.cursor if unread_only else 0
+        for i in range(len(self.items) - 1, stop - 1, -1):
+            if len(found) == limit or (unread_only and len(found) == self.unread):
+                break
+            notif = self.items[i]
+            if not (unread_only and notif.is_read):
+                found.append(notif)
+        return found
+
+    def mark_read(self, notification_id: str) -> bool:
+        body_id, _, recipient_id = notification_id.partition(":")
+        i = self.positions.get(body_id)
+        if i is None:
+            return False
+        notif = self.items[i]
+        if notif.recipient_id != recipient_id:
+            return False
+        if not notif.is_read:
+            notif.is_read = True
+            self.unread -= 1
+            self._advance()
+        return True
+
+    def mark_all_read(self) -> int:
+        count = self.unread
+        for i in range(self.cursor, len(self.items)):
+            self.items[i].is_read = True
+        self.cursor = len(self.items)
+        self.unread = 0
+        return count
+
+    def _advance(self) -> None:
+        while self.cursor < len(self.items) and self.items[self.cursor].is_read:
+            self.cursor += 1
+
+
+# ---------------------------------------------------------------------------
+# Journal
+# ---------------------------------------------------------------------------
+
+
+class NotificationJournal:
+    """Append-only JSON-lines record of event log and inbox changes.
+
+    ``rewrite`` replaces the file with a compact description of the current
+    state; ``due`` says when enough has been appended since then that a
+    rewrite pays for itself. Writes are buffered until ``flush``, which the
+    service calls after every operation, so a crash loses at most the
+    operation being written.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._handle: Any = None
+        self._appended = 0
+        self._baseline = 0
+
+    @staticmethod
+    def read(path: str) -> Iterator[dict[str, Any]]:
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from an interrupted write.
+                    return
+
+    def write(self, record: dict[str, Any]) -> None:
+        if self._handle is None:
+            self._handle = open(self.path, "a")
+        self._handle.write(json.dumps(record) + "\n")
+        self._appended += 1
+
+    def due(self, compact_after: int) -> bool:
+        return self._appended >= max(compact_after, self._baseline)
+
+    def rewrite(self, records: Iterable[dict[str, Any]]) -> None:
+        self.close()
+        self._baseline = write_records(self.path, records)
+        self._appended = 0
+
+    def flush(self) -> None:
+        if self._handle is not None:
+            self._handle.flush()
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+def write_records(path: str, records: Iterable[dict[str, Any]]) -> int:
+    """Atomically replace ``path`` with ``records`` as JSON lines and return
+    how many were written."""
+    tmp = f"{path}.tmp"
+    count = 0
+    with open(tmp, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+            count += 1
+    os.replace(tmp, path)
+    return count
+
+
+OVERFLOW_POLICIES = ("block", "drop_newest", "drop_oldest")
+
+_STOP = object()
+
+
+@dataclass
+class CallbackStats:
+    delivered: int = 0
+    errors: int = 0
+    dropped: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+    last_error: str | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "delivered": self.delivered,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "avg_ms": round(self.total_seconds / self.delivered * 1000, 3)
+            if self.delivered
+            else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 3),
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+            "last_error": self.last_error,
+        }
+
+
+class NotificationService:
+    """Event log, subscriptions and per-user inboxes.
+
+    With ``async_workers`` > 0, subscriber callbacks run on a pool of worker
+    threads instead of the publisher's thread. Each callback is pinned to one
+    worker, so it sees events in publish order. When a worker's queue is
+    full, ``overflow`` decides whether ``publish`` blocks, drops the new
+    delivery or drops the oldest queued one.
+
+    The event log keeps the last ``event_log_capacity`` events in memory and,
+    with ``event_log_dir``, spills older ones to disk where ``get_event_log``
+    can still find them.
+
+    Event types in ``coalesce`` have their notifications merged per recipient:
+    while a digest is unread and younger than the type's window, further
+    notifications of that type increase its count instead of adding entries.
+
+    With ``journal_path``, every change to the event log and the inboxes is
+    appended to a journal that is replayed on startup, and the journal is
+    compacted once it has grown by ``compact_after`` records or by as many
+    as the last compaction wrote, whichever is larger.
+    """
+
+    def __init__(
+        self,
+        async_workers: int = 0,
+        queue_size: int = 1024,
+        overflow: str = "block",
+        event_log_capacity: int = 10_000,
+        event_log_dir: str | None = None,
+        coalesce: dict[EventType, timedelta] | None = None,
+        journal_path: str | None = None,
+        compact_after: int = 50_000,
+    ) -> None:
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {', '.join(OVERFLOW_POLICIES)}")
         self._lock = threading.RLock()
-        self._event_log: list[Event] = []
-        self._inbox: dict[str, list[Notification]] = {}
+        self._event_log = EventLog(event_log_capacity, spill_dir=event_log_dir)
+        self._inbox: dict[str, _Inbox] = {}
+        self._coalesce: dict[EventType, timedelta] = dict(coalesce or {})
         self._subscribers: dict[EventType, list[EventCallback]] = {}
+        self._stats: dict[EventCallback, CallbackStats] = {}
+        self._stats_lock = threading.Lock()
+        self._overflow = overflow
+        self._queues: list[queue.Queue[Any]] = []
+        self._workers: list[threading.Thread] = []
+        # Publishes between taking their queue snapshot and finishing their
+        # puts; close() waits for them so nothing lands behind a _STOP.
+        self._enqueuing = 0
+        self._enqueued = threading.Condition(self._lock)
+        for i in range(async_workers):
+            q: queue.Queue[Any] = queue.Queue(maxsize=queue_size)
+            worker = threading.Thread(
+                target=self._drain, args=(q,), name=f"notify-{i}", daemon=True
+            )
+            self._queues.append(q)
+            self._workers.append(worker)
+            worker.start()
+        self._compact_after = compact_after
+        self._journal: NotificationJournal | None = None
+        if journal_path is not None:
+            if os.path.exists(journal_path):
+                self._replay(NotificationJournal.read(journal_path))
+            self._journal = NotificationJournal(journal_path)
 
     def publish(self, event: Event) -> None:
         with self._lock:
             self._event_log.append(event)
+            self._record({"op": "event", "event": event.to_dict()})
             callbacks = list(self._subscribers.get(event.event_type, []))
-        for cb in callbacks:
+            queues = self._queues if callbacks else []
+            if queues:
+                self._enqueuing += 1
+        if not queues:
+            for cb in callbacks:
+                self._deliver(cb, event, time.perf_counter())
+            return
+        try:
+            for cb in callbacks:
+                self._enqueue(queues, cb, event)
+        finally:
+            with self._lock:
+                self._enqueuing -= 1
+                if not self._enqueuing:
+                    self._enqueued.notify_all()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until every queued delivery has run. Returns False if
+        ``timeout`` seconds pass first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for q in self._queues:
+            with q.all_tasks_done:
+                while q.unfinished_tasks:
+                    if deadline is None:
+                        q.all_tasks_done.wait()
+                        continue
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    q.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self) -> None:
+        """Deliver what is queued, stop the workers and dispatch inline from
+        then on."""
+        with self._lock:
+            queues, workers = self._queues, self._workers
+            self._queues, self._workers = [], []
+            while self._enqueuing:
+                self._enqueued.wait()
+        for q in queues:
+            q.put(_STOP)
+        for worker in workers:
+            worker.join()
+        with self._lock:
+            self._event_log.close()
+            if self._journal is not None:
+                self._journal.close()
+
+    def save(self, path: str | None = None) -> None:
+        """Write the event log and inboxes in compact form to ``path``, or
+        compact the journal in place."""
+        with self._lock:
+            if self._journal is not None and path in (None, self._journal.path):
+                self._journal.rewrite(self._state_records())
+            elif path is not None:
+                write_records(path, self._state_records())
+
+    def load(self, path: str) -> None:
+        """Replace the event log and inboxes with those saved at ``path``."""
+        with self._lock:
+            self._event_log.clear()
+            self._inbox = {}
+            self._replay(NotificationJournal.read(path))
+            if self._journal is not None and path != self._journal.path:
+                self._journal.rewrite(self._state_records())
+
+    def _record(self, *records: dict[str, Any]) -> None:
+        # Called with the lock held, once per operation: compacting between
+        # the records of one operation would apply part of it twice.
+        if self._journal is None:
+            return
+        for record in records:
+            self._journal.write(record)
+        self._journal.flush()
+        if self._journal.due(self._compact_after):
+            self._journal.rewrite(self._state_records())
+
+    def _state_records(self) -> Iterator[dict[str, Any]]:
+        for event in self._event_log.recent():
+            yield {"op": "event", "event": event.to_dict()}
+        written: set[str] = set()
+        for rid, inbox in self._inbox.items():
+            for notif in inbox.items:
+                body = notif.body
+                if body.id not in written:
+                    written.add(body.id)
+                    yield {"op": "body", "body": body.to_dict()}
+                entry: dict[str, Any] = {
+                    "op": "entry",
+                    "recipient": rid,
+                    "body_id": body.id,
+                    "is_read": notif.is_read,
+                }
+                if isinstance(notif, DigestNotification):
+                    last_at = notif.last_at or body.created_at
+                    entry["count"] = notif.count
+                    entry["refs"] = notif.refs
+                    entry["last_at"] = last_at.isoformat()
+                yield entry
+
+    def _replay(self, records: Iterable[dict[str, Any]]) -> None:
+        bodies: dict[str, NotificationBody] = {}
+        for record in records:
+            op = record["op"]
+            if op == "event":
+                # Events evicted here were spilled when first published.
+                event = Event.from_dict(record["event"])
+                self._event_log.append(event, spill=False)
+            elif op == "body":
+                body = NotificationBody.from_dict(record["body"])
+                bodies[body.id] = body
+            elif op == "deliver":
+                body = bodies[record["body_id"]]
+                for rid in record["recipients"]:
+                    inbox = self._inbox_for(rid)
+                    self._add_entry(inbox, rid, body, record["digest"])
+            elif op == "entry":
+                rid = record["recipient"]
+                notif = self._add_entry(
+                    self._inbox_for(rid),
+                    rid,
+                    bodies[record["body_id"]],
+                    "count" in record,
+                    bool(record["is_read"]),
+                )
+                if isinstance(notif, DigestNotification):
+                    notif.count = int(record["count"])
+                    notif.refs = [str(r) for r in record["refs"]]
+                    notif.last_at = datetime.fromisoformat(record["last_at"])
+            elif op == "merge":
+                inbox = self._inbox_for(record["recipient"])
+                digest = inbox.items[inbox.positions[record["body_id"]]]
+                assert isinstance(digest, DigestNotification)
+                digest.merge(record["ref"], datetime.fromisoformat(record["at"]))
+            elif op == "read":
+                self._inbox_for(record["recipient"]).mark_read(record["id"])
+            elif op == "read_all":
+                self._inbox_for(record["recipient"]).mark_all_read()
+            elif op == "clear":
+                self._inbox[record["recipient"]] = _Inbox()
+
+    def dispatch_stats(self) -> dict[str, dict[str, Any]]:
+        """Delivery, error, drop and latency counters per callback, keyed by
+        the callback's qualified name."""
+        stats: dict[str, dict[str, Any]] = {}
+        with self._stats_lock:
+            for cb, st in self._stats.items():
+                name = _callback_name(cb)
+                if name in stats:
+                    name = f"{name}#{id(cb):x}"
+                stats[name] = st.to_dict()
+        return stats
+
+    def _enqueue(
+        self, queues: list[queue.Queue[Any]], cb: EventCallback, event: Event
+    ) -> None:
+        q = queues[hash(cb) % len(queues)]
+        item = (cb, event, time.perf_counter())
+        if self._overflow == "block":
+            q.put(item)
+            return
+        while True:
             try:
-                cb(event)
-            except Exception:
-                pass
+                q.put_nowait(item)
+                return
+            except queue.Full:
+                if self._overflow == "drop_newest":
+                    self._record_drop(cb)
+                    return
+            try:
+                oldest = q.get_nowait()
+            except queue.Empty:
+                continue
+            q.task_done()
+            self._record_drop(oldest[0])
+
+    def _drain(self, q: queue.Queue[Any]) -> None:
+        while True:
+            item = q.get()
+            try:
+                if item is _STOP:
+                    return
+                cb, event, enqueued_at = item
+                self._deliver(cb, event, enqueued_at)
+            finally:
+                q.task_done()
+
+    def _deliver(self, cb: EventCallback, event: Event, enqueued_at: float) -> None:
+        started = time.perf_counter()
+        error: str | None = None
+        try:
+            cb(event)
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            st = self._stats.get(cb)
+            if st is None:
+                st = self._stats[cb] = CallbackStats()
+            st.delivered += 1
+            st.total_seconds += elapsed
+            st.max_seconds = max(st.max_seconds, elapsed)
+            st.max_wait_seconds = max(st.max_wait_seconds, started - enqueued_at)
+            if error is not None:
+                st.errors += 1
+                st.last_error = error
+
+    def _record_drop(self, cb: EventCallback) -> None:
+        with self._stats_lock:
+            st = self._stats.get(cb)
+            if st is None:
+                st = self._stats[cb] = CallbackStats()
+            st.dropped += 1
 
     def subscribe(self, event_type: EventType, callback: EventCallback) -> None:
         with self._lock:
@@ -110,45 +926,111 @@ class NotificationService:
     def send_notification(
         self, recipient_id: str, event: Event, message: str
     ) -> Notification:
-        notif = Notification(recipient_id=recipient_id, event=event, message=message)
+        return self.send_notification_batch([recipient_id], event, message)[0]
+
+    def send_notification_batch(
+        self, recipient_ids: list[str], event: Event, message: str
+    ) -> list[Notification]:
+        """Deliver one message to many inboxes under a single lock, sharing
+        one ``NotificationBody`` between the recipients. Returns each
+        recipient's entry, which for a coalesced event type may be an
+        existing digest."""
+        body = NotificationBody(event=event, message=message)
+        window = self._coalesce.get(event.event_type)
+        digested = window is not None
+        notifs: list[Notification] = []
+        added: list[str] = []
+        merged: list[DigestNotification] = []
         with self._lock:
-            self._inbox.setdefault(recipient_id, []).append(notif)
+            for rid in dict.fromkeys(recipient_ids):
+                inbox = self._inbox_for(rid)
+                digest = None
+                if window is not None:
+                    digest = inbox.open_digest(
+                        event.event_type, body.created_at, window
+                    )
+                if digest is not None:
+                    digest.merge(_event_ref(event), body.created_at)
+                    merged.append(digest)
+                    notifs.append(digest)
+                else:
+                    notifs.append(self._add_entry(inbox, rid, body, digested))
+                    added.append(rid)
+            if self._journal is not None:
+                self._record(*_delivery_records(body, added, digested, merged))
+        return notifs
+
+    def _inbox_for(self, recipient_id: str) -> _Inbox:
+        inbox = self._inbox.get(recipient_id)
+        if inbox is None:
+            inbox = self._inbox[recipient_id] = _Inbox()
+        return inbox
+
+    def _add_entry(
+        self,
+        inbox: _Inbox,
+        recipient_id: str,
+        body: NotificationBody,
+        digest: bool,
+        is_read: bool = False,
+    ) -> Notification:
+        notif: Notification
+        if digest:
+            notif = DigestNotification(
+                recipient_id=recipient_id,
+                body=body,
+                is_read=is_read,
+                refs=[_event_ref(body.event)],
+            )
+            inbox.digests[body.event.event_type] = notif
+        else:
+            notif = Notification(recipient_id=recipient_id, body=body, is_read=is_read)
+        inbox.add(notif)
         return notif
 
+    def set_coalescing(
+        self, event_type: EventType, window: timedelta | None
+    ) -> None:
+        """Merge notifications of ``event_type`` within ``window``, or stop
+        merging them with ``None``."""
+        with self._lock:
+            if window is None:
+                self._coalesce.pop(event_type, None)
+            else:
+                self._coalesce[event_type] = window
+
     def get_notifications(
         self, user_id: str, unread_only: bool = False, limit: int = 50
     ) -> list[Notification]:
         with self._lock:
-            notifs = list(self._inbox.get(user_id, []))
-        if unread_only:
-            notifs = [n for n in notifs if not n.is_read]
-        notifs.sort(key=lambda n: n.created_at, reverse=True)
-        return notifs[:limit]
+            inbox = self._inbox.get(user_id)
+            return inbox.latest(limit, unread_only) if inbox else []
 
     def mark_read(self, user_id: str, notification_id: str) -> bool:
         with self._lock:
-            for notif in self._inbox.get(user_id, []):
-                if notif.id == notification_id:
-                    notif.is_read = True
-                    return True
-        return False
+            inbox = self._inbox.get(user_id)
+            if inbox is None or not inbox.mark_read(notification_id):
+                return False
+            self._record({"op": "read", "recipient": user_id, "id": notification_id})
+            return True
 
     def mark_all_read(self, user_id: str) -> int:
-        count = 0
         with self._lock:
-            for notif in self._inbox.get(user_id, []):
-                if not notif.is_read:
-                    notif.is_read = True
-                    count += 1
-        return count
+            inbox = self._inbox.get(user_id)
+            count = inbox.mark_all_read() if inbox else 0
+            if count:
+                self._record({"op": "read_all", "recipient": user_id})
+            return count
 
     def get_unread_count(self, user_id: str) -> int:
         with self._lock:
-            return sum(1 for n in self._inbox.get(user_id, []) if not n.is_read)
+            inbox = self._inbox.get(user_id)
+            return inbox.unread if inbox else 0
 
     def clear_inbox(self, user_id: str) -> None:
         with self._lock:
-            self._inbox[user_id] = []
+            self._inbox[user_id] = _Inbox()
+            self._record({"op": "clear", "recipient": user_id})
 
     def get_event_log(
         self,
@@ -158,15 +1040,41 @@ class NotificationService:
         limit: int = 100,
     ) -> list[Event]:
         with self._lock:
-            events = list(self._event_log)
-        if event_type is not None:
-            events = [e for e in events if e.event_type == event_type]
-        if actor_id is not None:
-            events = [e for e in events if e.actor_id == actor_id]
-        if since is not None:
-            events = [e for e in events if e.occurred_at >= since]
-        events.sort(key=lambda e: e.occurred_at, reverse=True)
-        return events[:limit]
+            return self._event_log.query(event_type, actor_id, since, limit)
+
+
+def _delivery_records(
+    body: NotificationBody,
+    added: list[str],
+    digested: bool,
+    merged: list[DigestNotification],
+) -> list[dict[str, Any]]:
+    records: list[dict[str, Any]] = []
+    if added:
+        records.append({"op": "body", "body": body.to_dict()})
+        records.append(
+            {
+                "op": "deliver",
+                "body_id": body.id,
+                "recipients": added,
+                "digest": digested,
+            }
+        )
+    for digest in merged:
+        records.append(
+            {
+                "op": "merge",
+                "recipient": digest.recipient_id,
+                "body_id": digest.body.id,
+                "ref": digest.refs[-1],
+                "at": body.created_at.isoformat(),
+            }
+        )
+    return records
+
+
+def _callback_name(cb: EventCallback) -> str:
+    return getattr(cb, "__qualname__", None) or repr(cb)
 
 
 class TaskEventEmitter:
@@ -185,13 +1093,11 @@ class TaskEventEmitter:
         self._notif.publish(event)
         try:
             project = self._store.get_project(project_id)
-            for member_id in project.member_ids:
-                if member_id != creator_id:
-                    _ = self._notif.send_notification(
-                        recipient_id=member_id,
-                        event=event,
-                        message=f"A new task was created in project {project.name}",
-                    )
+            _ = self._notif.send_notification_batch(
+                recipient_ids=[m for m in project.member_ids if m != creator_id],
+                event=event,
+                message=f"A new task was created in project {project.name}",
+            )
         except Exception:
             pass
 
@@ -224,6 +1130,16 @@ class TaskEventEmitter:
             message=f"You were mentioned in a comment on task {task_id}",
         )
 
+    def on_tasks_deleted(
+        self, task_ids: list[str], project_id: str, actor_id: str
+    ) -> None:
+        event = Event(
+            event_type=EventType.TASK_DELETED,
+            payload={"task_ids": list(task_ids), "project_id": project_id},
+            actor_id=actor_id,
+        )
+        self._notif.publish(event)
+
     def on_task_completed(
         self, task_id: str, project_id: str, actor_id: str, watchers: list[str]
     ) -> None:
@@ -233,10 +1149,8 @@ class TaskEventEmitter:
             actor_id=actor_id,
         )
         self._notif.publish(event)
-        for watcher_id in watchers:
-            if watcher_id != actor_id:
-                _ = self._notif.send_notification(
-                    recipient_id=watcher_id,
-                    event=event,
-                    message=f"Task {task_id} has been completed",
-                )
+        _ = self._notif.send_notification_batch(
+            recipient_ids=[w for w in watchers if w != actor_id],
+            event=event,
+            message=f"Task {task_id} has been completed",
+        )
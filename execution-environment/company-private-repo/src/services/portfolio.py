@@ -0,0 +1,126 @@
+"""Portfolio analytics — per-project reports for many projects at once."""
+
+from __future__ import annotations
+
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any
+
+from models.indexes import TaskRow
+from models.store import DataStore
+from services.task_service import TaskService, format_workload, workload_totals
+from utils.reporting import format_team_performance, performance_totals
+
+
+# Below this many tasks in total the pool costs more than it saves. About twice
+# the crossover benchmarks/bench_portfolio.py measures for 4-8 workers; with
+# two workers the pool barely breaks even at any size.
+PARALLEL_MIN_TASKS = 200_000
+
+_Totals = dict[str, tuple[dict[str, Any], dict[str, Any]]]
+
+
+def _tally(rows_by_project: dict[str, list[TaskRow]], now: datetime) -> _Totals:
+    # Also runs in worker processes; only plain task rows cross the boundary.
+    return {
+        pid: (workload_totals(rows), performance_totals(rows, now))
+        for pid, rows in rows_by_project.items()
+    }
+
+
+def _assemble(
+    store: DataStore, project_ids: list[str], totals: _Totals, now: datetime
+) -> dict[str, dict[str, Any]]:
+    tasks = TaskService(store)
+    users = store.list_users(active_only=True)
+    projects: dict[str, dict[str, Any]] = {}
+    for pid in project_ids:
+        workload, performance = totals[pid]
+        projects[pid] = {
+            "stats": tasks.compute_project_stats(pid),
+            "workload": format_workload(users, workload),
+            "team_performance": format_team_performance(
+                pid, users, performance, now
+            ),
+        }
+    return projects
+
+
+def analyze_projects(
+    store: DataStore, project_ids: list[str]
+) -> dict[str, dict[str, Any]]:
+    now = datetime.utcnow()
+    rows = {pid: store.project_rows(pid) for pid in project_ids}
+    return _assemble(store, project_ids, _tally(rows, now), now)
+
+
+def partition_projects(
+    store: DataStore, project_ids: list[str], parts: int
+) -> list[list[str]]:
+    """Split projects into ``parts`` groups of roughly equal task count,
+    largest projects first, each going to the currently lightest group."""
+    now = datetime.utcnow()
+    sizes = sorted(
+        ((store.project_aggregate(pid, now)["total"], pid) for pid in project_ids),
+        reverse=True,
+    )
+    bins: list[tuple[int, int]] = [(0, i) for i in range(parts)]
+    groups: list[list[str]] = [[] for _ in range(parts)]
+    for size, pid in sizes:
+        load, i = heapq.heappop(bins)
+        groups[i].append(pid)
+        heapq.heappush(bins, (load + size, i))
+    return [g for g in groups if g]
+
+
+def portfolio_analytics(
+    store: DataStore,
+    project_ids: list[str] | None = None,
+    workers: int = 1,
+    min_parallel_tasks: int = PARALLEL_MIN_TASKS,
+) -> dict[str, Any]:
+    """Project stats, workload and team performance for every project.
+
+    Runs in-process unless more than one worker is asked for and the
+    projects hold at least ``min_parallel_tasks`` tasks between them. Then
+    the projects are split into groups of similar task count, and each
+    worker receives just the task rows of its group and returns the
+    per-assignee totals; stats and formatting stay in the parent.
+    """
+    if project_ids is None:
+        project_ids = [p.id for p in store.list_projects()]
+    now = datetime.utcnow()
+    workers = min(workers, len(project_ids))
+    size = sum(store.project_aggregate(pid, now)["total"] for pid in project_ids)
+
+    if workers <= 1 or size < min_parallel_tasks:
+        projects = analyze_projects(store, project_ids)
+    else:
+        groups = partition_projects(store, project_ids, workers)
+        totals: _Totals = {}
+        with ProcessPoolExecutor(max_workers=len(groups)) as pool:
+            futures = [
+                pool.submit(
+                    _tally, {pid: store.project_rows(pid) for pid in group}, now
+                )
+                for group in groups
+            ]
+            for future in futures:
+                totals.update(future.result())
+        projects = _assemble(store, project_ids, totals, now)
+
+    stats = [r["stats"] for r in projects.values()]
+    return {
+        "projects": projects,
+        "totals": {
+            "projects": len(stats),
+            "total_tasks": sum(s["total_tasks"] for s in stats),
+            "overdue_count": sum(s["overdue_count"] for s in stats),
+            "total_story_points": sum(s["total_story_points"] for s in stats),
+            "completed_story_points": sum(
+                s["completed_story_points"] for s in stats
+            ),
+        },
+        "computed_at": datetime.utcnow().isoformat(),
+    }
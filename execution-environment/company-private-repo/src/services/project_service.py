@@ -232,12 +232,8 @@ class SprintService:
     def complete_sprint(self, sprint_id: str) -> Sprint:
         sprint = self._store.get_sprint(sprint_id)
         sprint.is_active = False
-        tasks = self._store.list_tasks_in_sprint(sprint_id)
-        from models.core import Status
-
-        sprint.velocity = float(
-            sum((t.story_points or 0) for t in tasks if t.status == Status.DONE)
-        )
+        agg = self._store.sprint_aggregate(sprint_id, datetime.utcnow())
+        sprint.velocity = float(agg["completed_points"])
         return self._store.update_sprint(sprint)
 
     def list_sprints(self, project_id: str) -> list[Sprint]:
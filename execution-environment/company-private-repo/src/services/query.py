@@ -0,0 +1,401 @@
+"""Filter expression language for tasks.
+
+Expressions combine comparisons with ``and``, ``or``, ``not`` and
+parentheses::
+
+    status in (todo, in_progress) and priority >= high
+    not assignee = "3f1c..." and text ~ "login"
+    cf.severity between 2 and 4 or due = null
+
+Comparison operators are ``= != < <= > >= ~`` (``~`` is a case-insensitive
+substring match), plus ``in (...)`` and ``between X and Y``. Strings that
+are not plain words (ids, ISO dates) must be quoted. ``compile_query``
+parses once, builds a predicate and an index plan, and caches the result
+by expression string.
+"""
+
+from __future__ import annotations
+
+import operator
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Callable
+
+from models.core import Priority, Status, Task
+from models.indexes import FieldCondition, naive_utc
+
+Predicate = Callable[[Task], bool]
+
+
+class QuerySyntaxError(ValueError):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Tokenizer
+# ---------------------------------------------------------------------------
+
+_TOKEN_RE = re.compile(
+    r"""\s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<number>-?\d+(?:\.\d+)?)
+      | (?P<op><=|>=|!=|=|<|>|~|\(|\)|,)
+      | (?P<word>[A-Za-z_][\w.]*)
+    )""",
+    re.VERBOSE,
+)
+_KEYWORDS = {"and", "or", "not", "in", "between", "null", "true", "false"}
+
+
+@dataclass(frozen=True)
+class _Token:
+    kind: str
+    text: str
+    value: Any = None
+
+
+def _tokenize(expression: str) -> list[_Token]:
+    tokens: list[_Token] = []
+    pos = 0
+    expression = expression.rstrip()
+    while pos < len(expression):
+        m = _TOKEN_RE.match(expression, pos)
+        if m is None or m.end() == pos:
+            rest = expression[pos:]
+            raise QuerySyntaxError(f"Unexpected input at {pos}: {rest!r}")
+        pos = m.end()
+        if m.group("string") is not None:
+            raw = m.group("string")
+            tokens.append(_Token("value", raw, re.sub(r"\\(.)", r"\1", raw[1:-1])))
+        elif m.group("number") is not None:
+            text = m.group("number")
+            number = float(text) if "." in text else int(text)
+            tokens.append(_Token("value", text, number))
+        elif m.group("op") is not None:
+            tokens.append(_Token("op", m.group("op")))
+        else:
+            word = m.group("word")
+            lowered = word.lower()
+            if lowered in ("null", "true", "false"):
+                value = {"null": None, "true": True, "false": False}[lowered]
+                tokens.append(_Token("value", word, value))
+            elif lowered in _KEYWORDS:
+                tokens.append(_Token("keyword", lowered))
+            else:
+                tokens.append(_Token("word", word, word))
+    return tokens
+
+
+# ---------------------------------------------------------------------------
+# AST and parser
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class Compare:
+    field: str
+    op: str
+    values: tuple[Any, ...]
+
+
+@dataclass(frozen=True)
+class And:
+    items: tuple[Node, ...]
+
+
+@dataclass(frozen=True)
+class Or:
+    items: tuple[Node, ...]
+
+
+@dataclass(frozen=True)
+class Not:
+    item: Node
+
+
+Node = Compare | And | Or | Not
+
+_COMPARE_OPS = {"=", "!=", "<", "<=", ">", ">=", "~"}
+
+
+class _Parser:
+    def __init__(self, tokens: list[_Token]) -> None:
+        self._tokens = tokens
+        self._pos = 0
+
+    def parse(self) -> Node:
+        if not self._tokens:
+            raise QuerySyntaxError("Empty query")
+        node = self._or()
+        if self._pos != len(self._tokens):
+            raise QuerySyntaxError(f"Unexpected token {self._peek().text!r}")
+        return node
+
+    def _peek(self) -> _Token:
+        if self._pos >= len(self._tokens):
+            raise QuerySyntaxError("Unexpected end of query")
+        return self._tokens[self._pos]
+
+    def _accept(self, kind: str, text: str | None = None) -> bool:
+        if self._pos < len(self._tokens):
+            tok = self._tokens[self._pos]
+            if tok.kind == kind and (text is None or tok.text == text):
+                self._pos += 1
+                return True
+        return False
+
+    def _expect(self, kind: str, text: str) -> None:
+        if not self._accept(kind, text):
+            raise QuerySyntaxError(f"Expected {text!r}, got {self._peek().text!r}")
+
+    def _or(self) -> Node:
+        items = [self._and()]
+        while self._accept("keyword", "or"):
+            items.append(self._and())
+        return items[0] if len(items) == 1 else Or(tuple(items))
+
+    def _and(self) -> Node:
+        items = [self._not()]
+        while self._accept("keyword", "and"):
+            items.append(self._not())
+        return items[0] if len(items) == 1 else And(tuple(items))
+
+    def _not(self) -> Node:
+        if self._accept("keyword", "not"):
+            return Not(self._not())
+        if self._accept("op", "("):
+            node = self._or()
+            self._expect("op", ")")
+            return node
+        return self._comparison()
+
+    def _comparison(self) -> Node:
+        tok = self._peek()
+        if tok.kind != "word":
+            raise QuerySyntaxError(f"Expected a field name, got {tok.text!r}")
+        self._pos += 1
+        name = tok.text.lower() if not tok.text.startswith("cf.") else tok.text
+        if self._accept("keyword", "in"):
+            self._expect("op", "(")
+            values = [self._value()]
+            while self._accept("op", ","):
+                values.append(self._value())
+            self._expect("op", ")")
+            return Compare(name, "in", tuple(values))
+        if self._accept("keyword", "between"):
+            lo = self._value()
+            self._expect("keyword", "and")
+            return Compare(name, "between", (lo, self._value()))
+        op = self._peek()
+        if op.kind != "op" or op.text not in _COMPARE_OPS:
+            raise QuerySyntaxError(f"Expected an operator after {tok.text!r}")
+        self._pos += 1
+        return Compare(name, op.text, (self._value(),))
+
+    def _value(self) -> Any:
+        tok = self._peek()
+        if tok.kind not in ("value", "word"):
+            raise QuerySyntaxError(f"Expected a value, got {tok.text!r}")
+        self._pos += 1
+        return tok.value
+
+
+def parse_query(expression: str) -> Node:
+    return _Parser(_tokenize(expression)).parse()
+
+
+# ---------------------------------------------------------------------------
+# Compilation
+# ---------------------------------------------------------------------------
+
+
+def _to_status(value: Any) -> Status:
+    for status in Status:
+        if str(value).lower() in (status.value, status.name.lower()):
+            return status
+    raise QuerySyntaxError(f"Unknown status {value!r}")
+
+
+def _to_priority(value: Any) -> int:
+    try:
+        if isinstance(value, int):
+            return Priority(value).value
+        return Priority[str(value).upper()].value
+    except (KeyError, ValueError):
+        raise QuerySyntaxError(f"Unknown priority {value!r}") from None
+
+
+def _to_datetime(value: Any) -> datetime | None:
+    if value is None:
+        return None
+    try:
+        return naive_utc(datetime.fromisoformat(str(value)))
+    except ValueError:
+        raise QuerySyntaxError(f"Invalid date {value!r}") from None
+
+
+def _to_number(value: Any) -> float | None:
+    if value is None or isinstance(value, (int, float)):
+        return value
+    raise QuerySyntaxError(f"Expected a number, got {value!r}")
+
+
+def _to_text(value: Any) -> str | None:
+    return None if value is None else str(value)
+
+
+# field -> (getter, coercion, supports ordering operators)
+_FieldSpec = tuple[Callable[[Task], Any], Callable[[Any], Any], bool]
+_SCALAR_FIELDS: dict[str, _FieldSpec] = {
+    "status": (lambda t: t.status, _to_status, False),
+    "priority": (lambda t: t.priority.value, _to_priority, True),
+    "title": (lambda t: t.title, _to_text, True),
+    "description": (lambda t: t.description, _to_text, True),
+    "text": (lambda t: t.title + " " + t.description, _to_text, False),
+    "project": (lambda t: t.project_id, _to_text, False),
+    "sprint": (lambda t: t.sprint_id, _to_text, False),
+    "creator": (lambda t: t.creator_id, _to_text, False),
+    "parent": (lambda t: t.parent_task_id, _to_text, False),
+    "due": (lambda t: t.due_date and naive_utc(t.due_date), _to_datetime, True),
+    "created": (lambda t: naive_utc(t.created_at), _to_datetime, True),
+    "updated": (lambda t: naive_utc(t.updated_at), _to_datetime, True),
+    "points": (lambda t: t.story_points, _to_number, True),
+    "estimate": (lambda t: t.estimated_hours, _to_number, True),
+    "actual": (lambda t: t.actual_hours, _to_number, True),
+}
+_LIST_FIELDS: dict[str, Callable[[Task], list[str]]] = {
+    "assignee": lambda t: t.assignee_ids,
+    "tag": lambda t: t.tag_ids,
+    "watcher": lambda t: t.watchers,
+}
+_ORDER_OPS: dict[str, Callable[[Any, Any], bool]] = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+def _field_condition(node: Compare) -> FieldCondition:
+    name = node.field[3:]
+    if node.op == "=":
+        return FieldCondition(name, eq=node.values[0])
+    if node.op == "in":
+        return FieldCondition(name, one_of=node.values)
+    if node.op == "between":
+        return FieldCondition(name, gte=node.values[0], lte=node.values[1])
+    bound = {"<": "lt", "<=": "lte", ">": "gt", ">=": "gte"}[node.op]
+    return FieldCondition(name, **{bound: node.values[0]})
+
+
+def _compile_compare(node: Compare) -> Predicate:
+    if (node.op == "between" or node.op in _ORDER_OPS) and any(
+        v is None for v in node.values
+    ):
+        raise QuerySyntaxError(f"Operator {node.op!r} cannot compare with null")
+    if node.field.startswith("cf."):
+        name = node.field[3:]
+        if node.op == "!=":
+            cond = FieldCondition(name, eq=node.values[0])
+            return lambda t: name in t.custom_fields and not cond.matches(
+                t.custom_fields
+            )
+        if node.op == "~":
+            needle = str(node.values[0]).lower()
+            return lambda t: needle in str(t.custom_fields.get(name, "")).lower()
+        cond = _field_condition(node)
+        return lambda t: cond.matches(t.custom_fields)
+
+    if node.field in _LIST_FIELDS:
+        members = _LIST_FIELDS[node.field]
+        wanted = frozenset(str(v) for v in node.values)
+        if node.op in ("=", "in"):
+            return lambda t: not wanted.isdisjoint(members(t))
+        if node.op == "!=":
+            return lambda t: wanted.isdisjoint(members(t))
+        raise QuerySyntaxError(f"Operator {node.op!r} not supported on {node.field}")
+
+    if node.field not in _SCALAR_FIELDS:
+        raise QuerySyntaxError(f"Unknown field {node.field!r}")
+    getter, coerce, orderable = _SCALAR_FIELDS[node.field]
+
+    if node.op == "~":
+        needle = str(node.values[0]).lower()
+        return lambda t: needle in str(getter(t) or "").lower()
+    values = tuple(coerce(v) for v in node.values)
+    if node.op == "=":
+        target = values[0]
+        return lambda t: getter(t) == target
+    if node.op == "!=":
+        target = values[0]
+        return lambda t: getter(t) != target
+    if node.op == "in":
+        options = frozenset(values)
+        return lambda t: getter(t) in options
+    if not orderable:
+        raise QuerySyntaxError(f"Operator {node.op!r} not supported on {node.field}")
+    if node.op == "between":
+        lo, hi = values
+
+        def between(t: Task) -> bool:
+            v = getter(t)
+            return v is not None and lo <= v <= hi
+
+        return between
+    compare, bound = _ORDER_OPS[node.op], values[0]
+
+    def ordered(t: Task) -> bool:
+        v = getter(t)
+        return v is not None and compare(v, bound)
+
+    return ordered
+
+
+def _compile(node: Node) -> Predicate:
+    if isinstance(node, Compare):
+        return _compile_compare(node)
+    if isinstance(node, Not):
+        inner = _compile(node.item)
+        return lambda t: not inner(t)
+    parts = tuple(_compile(item) for item in node.items)
+    if isinstance(node, And):
+        return lambda t: all(p(t) for p in parts)
+    return lambda t: any(p(t) for p in parts)
+
+
+@dataclass(frozen=True)
+class CompiledQuery:
+    """A parsed expression with its predicate and index plan.
+
+    ``project_id`` and ``field_conditions`` come from top-level ``and``
+    terms and may be used to narrow the candidate set before ``predicate``
+    (which always re-checks everything) is applied.
+    """
+
+    expression: str
+    predicate: Predicate
+    project_id: str | None = None
+    field_conditions: tuple[FieldCondition, ...] = field(default=())
+
+
+@lru_cache(maxsize=256)
+def compile_query(expression: str) -> CompiledQuery:
+    node = parse_query(expression)
+    conjuncts = node.items if isinstance(node, And) else (node,)
+    project_id: str | None = None
+    conditions: list[FieldCondition] = []
+    for term in conjuncts:
+        if not isinstance(term, Compare):
+            continue
+        if term.field == "project" and term.op == "=":
+            project_id = _to_text(term.values[0])
+        elif term.field.startswith("cf.") and term.op not in ("!=", "~"):
+            conditions.append(_field_condition(term))
+    return CompiledQuery(
+        expression=expression,
+        predicate=_compile(node),
+        project_id=project_id,
+        field_conditions=tuple(conditions),
+    )
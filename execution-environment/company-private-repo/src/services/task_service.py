@@ -2,12 +2,95 @@
 
 from __future__ import annotations
 
+import heapq
+import math
 import re
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Any
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator
+
+from models.core import Comment, Priority, Sprint, Status, Task, User
+from models.indexes import (
+    CommentRef,
+    FieldCondition,
+    TaskRow,
+    TaskSnapshot,
+    naive_utc,
+    parse_field_conditions,
+)
+from models.store import DataStore, NotFoundError, StorageError, TaskKey
+from services.query import compile_query
+from utils.sketches import estimate_total
+
+TITLE_WEIGHT = 3.0
+DESCRIPTION_WEIGHT = 1.0
+RECENCY_HALF_LIFE_DAYS = 30.0
+BLOCKED_AFTER = timedelta(days=14)
+
+
+def _relevance(task: Task, terms: list[str], now: datetime) -> float:
+    title = task.title.lower()
+    description = task.description.lower()
+    score = 0.0
+    for term in terms:
+        score += TITLE_WEIGHT * math.log1p(title.count(term))
+        score += DESCRIPTION_WEIGHT * math.log1p(description.count(term))
+    if score == 0.0:
+        return 0.0
+    age_days = max(0.0, (now - task.updated_at).total_seconds() / 86400)
+    return score * (1.0 + 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS))
+
+
+@dataclass
+class _Workload:
+    total_assigned: int = 0
+    open_tasks: int = 0
+    story_points: int = 0
+    estimated_hours: float = 0.0
+
+
+_CLOSED = (Status.DONE.value, Status.CANCELLED.value)
+
+
+def workload_totals(rows: Iterable[TaskRow]) -> dict[str, _Workload]:
+    """One pass over a project's task rows fills every assignee's totals."""
+    totals: dict[str, _Workload] = {}
+    for status, assignee_ids, points, estimated, _, _ in rows:
+        is_open = status not in _CLOSED
+        for uid in dict.fromkeys(assignee_ids):
+            acc = totals.get(uid)
+            if acc is None:
+                acc = totals[uid] = _Workload()
+            acc.total_assigned += 1
+            if is_open:
+                acc.open_tasks += 1
+                acc.story_points += points or 0
+                acc.estimated_hours += estimated or 0.0
+    return totals
+
+
+def format_workload(
+    users: list[User], totals: dict[str, _Workload]
+) -> list[dict[str, Any]]:
+    report: list[dict[str, Any]] = []
+    empty = _Workload()
+    for user in users:
+        acc = totals.get(user.id, empty)
+        report.append(
+            {
+                "user_id": user.id,
+                "username": user.username,
+                "full_name": user.full_name,
+                "total_assigned": acc.total_assigned,
+                "open_tasks": acc.open_tasks,
+                "story_points": acc.story_points,
+                "estimated_hours": acc.estimated_hours,
+            }
+        )
 
-from models.core import Comment, Priority, Sprint, Status, Task
-from models.store import DataStore, NotFoundError, StorageError
+    report.sort(key=lambda x: int(x["open_tasks"]), reverse=True)
+    return report
 
 
 class TaskService:
@@ -97,25 +180,9 @@ class TaskService:
             setattr(task, key, val)
         return self._store.update_task(task)
 
-    def delete_task(self, task_id: str) -> None:
-        task = self._store.get_task(task_id)
-
-        if task.parent_task_id is not None:
-            try:
-                parent = self._store.get_task(task.parent_task_id)
-                if task_id in parent.subtask_ids:
-                    parent.subtask_ids.remove(task_id)
-                    self._store.update_task(parent)
-            except NotFoundError:
-                pass
-
-        for sub_id in list(task.subtask_ids):
-            try:
-                self.delete_task(sub_id)
-            except NotFoundError:
-                pass
-
-        self._store.delete_task(task_id)
+    def delete_task(self, task_id: str) -> list[str]:
+        """Delete a task with all of its subtasks; returns the deleted ids."""
+        return self._store.delete_task_tree(task_id)
 
     def get_task(self, task_id: str) -> Task:
         return self._store.get_task(task_id)
@@ -139,6 +206,7 @@ class TaskService:
         task = self._store.get_task(task_id)
         task.comments.append(comment)
         self._store.update_task(task)
+        self._store.index_comment(task, comment)
         return comment
 
     def edit_comment(self, task_id: str, comment_id: str, new_content: str) -> Comment:
@@ -148,6 +216,7 @@ class TaskService:
                 comment.content = new_content
                 comment.edited_at = datetime.utcnow()
                 self._store.update_task(task)
+                self._store.index_comment(task, comment)
                 return comment
         raise NotFoundError(f"Comment {comment_id} not found on task {task_id}")
 
@@ -158,6 +227,29 @@ class TaskService:
         if len(task.comments) == original_len:
             raise NotFoundError(f"Comment {comment_id} not found on task {task_id}")
         self._store.update_task(task)
+        self._store.unindex_comment(task_id, comment_id)
+
+    def search_comments(
+        self,
+        query: str = "",
+        project_id: str | None = None,
+        author_id: str | None = None,
+        mention_id: str | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        limit: int | None = 50,
+    ) -> list[CommentRef]:
+        """Newest-first ``(task_id, comment_id)`` hits whose text contains
+        every word of ``query``."""
+        return self._store.search_comments(
+            query=query,
+            project_id=project_id,
+            author_id=author_id,
+            mention_id=mention_id,
+            since=since,
+            until=until,
+            limit=limit,
+        )
 
     # ------------------------------------------------------------------
     # Search & filtering
@@ -175,42 +267,193 @@ class TaskService:
         due_before: datetime | None = None,
         due_after: datetime | None = None,
         overdue_only: bool = False,
+        custom_fields: dict[str, Any] | None = None,
     ) -> list[Task]:
-        tasks = self._store.list_tasks(project_id=project_id)
-        now = datetime.utcnow()
-        results: list[Task] = []
+        return list(
+            self.search_tasks_iter(
+                query=query,
+                project_id=project_id,
+                status=status,
+                priority=priority,
+                assignee_id=assignee_id,
+                tag_id=tag_id,
+                sprint_id=sprint_id,
+                due_before=due_before,
+                due_after=due_after,
+                overdue_only=overdue_only,
+                custom_fields=custom_fields,
+            )
+        )
 
+    def search_tasks_iter(
+        self,
+        project_id: str | None = None,
+        after: TaskKey | None = None,
+        **filters: Any,
+    ) -> Iterator[Task]:
+        """Lazily yield matching tasks in ``task_sort_key`` order.
+
+        Accepts the same filters as ``search_tasks``; nothing is evaluated
+        beyond what the consumer actually pulls.
+        """
+        conditions = parse_field_conditions(filters.pop("custom_fields", None) or {})
+        matches = self._build_filter(conditions=conditions, **filters)
+        tasks: Iterable[Task] | None = None
+        if conditions and project_id is not None:
+            candidates = self._store.field_index_candidates(project_id, conditions)
+            if candidates is not None:
+                tasks = self._store.tasks_in_order(candidates, after=after)
+        if tasks is None:
+            tasks = self._store.iter_tasks(project_id=project_id, after=after)
         for task in tasks:
-            if query:
+            if matches(task):
+                yield task
+
+    def query_tasks(
+        self, expression: str, project_id: str | None = None
+    ) -> list[Task]:
+        return list(self.query_tasks_iter(expression, project_id=project_id))
+
+    def query_tasks_iter(
+        self,
+        expression: str,
+        project_id: str | None = None,
+        after: TaskKey | None = None,
+    ) -> Iterator[Task]:
+        """Lazily yield tasks matching a filter expression (see
+        ``services.query``), using the compiled index plan when it applies."""
+        compiled = compile_query(expression)
+        if compiled.project_id is not None:
+            if project_id is not None and project_id != compiled.project_id:
+                return
+            project_id = compiled.project_id
+        tasks: Iterable[Task] | None = None
+        if compiled.field_conditions and project_id is not None:
+            candidates = self._store.field_index_candidates(
+                project_id, list(compiled.field_conditions)
+            )
+            if candidates is not None:
+                tasks = self._store.tasks_in_order(candidates, after=after)
+        if tasks is None:
+            tasks = self._store.iter_tasks(project_id=project_id, after=after)
+        predicate = compiled.predicate
+        for task in tasks:
+            if predicate(task):
+                yield task
+
+    def count_tasks(self, project_id: str | None = None, **filters: Any) -> int:
+        return sum(1 for _ in self.search_tasks_iter(project_id=project_id, **filters))
+
+    def exists_task(self, project_id: str | None = None, **filters: Any) -> bool:
+        return (
+            next(self.search_tasks_iter(project_id=project_id, **filters), None)
+            is not None
+        )
+
+    def search_tasks_ranked(
+        self,
+        query: str,
+        limit: int = 20,
+        project_id: str | None = None,
+        **filters: Any,
+    ) -> list[tuple[float, Task]]:
+        """Top ``limit`` tasks matching any query term, best first.
+
+        Title hits outweigh description hits, repeated hits are damped
+        logarithmically and recently updated tasks get up to a 2x boost.
+        Selection uses a bounded heap, so only ``limit`` candidates are
+        ever held.
+        """
+        terms = re.findall(r"\w+", query.lower())
+        if not terms:
+            return []
+        now = datetime.utcnow()
+
+        def scored() -> Iterator[tuple[float, Task]]:
+            for task in self.search_tasks_iter(project_id=project_id, **filters):
+                score = _relevance(task, terms, now)
+                if score > 0.0:
+                    yield score, task
+
+        return heapq.nlargest(limit, scored(), key=lambda pair: pair[0])
+
+    def search_tasks_page(
+        self,
+        limit: int,
+        after: TaskKey | None = None,
+        project_id: str | None = None,
+        **filters: Any,
+    ) -> tuple[list[Task], bool]:
+        """Keyset page of matching tasks in ``task_sort_key`` order.
+
+        Evaluation stops as soon as ``limit + 1`` matches have been seen;
+        the extra match only tells the caller whether another page exists.
+        """
+        stream = self.search_tasks_iter(project_id=project_id, after=after, **filters)
+        page = list(islice(stream, limit + 1))
+        return page[:limit], len(page) > limit
+
+    def _build_filter(
+        self,
+        query: str = "",
+        status: Status | None = None,
+        priority: Priority | None = None,
+        assignee_id: str | None = None,
+        tag_id: str | None = None,
+        sprint_id: str | None = None,
+        due_before: datetime | None = None,
+        due_after: datetime | None = None,
+        overdue_only: bool = False,
+        conditions: list[FieldCondition] | None = None,
+    ) -> Callable[[Task], bool]:
+        now = datetime.utcnow()
+        needle = query.lower()
+
+        def matches(task: Task) -> bool:
+            if needle:
                 haystack = (task.title + " " + task.description).lower()
-                if query.lower() not in haystack:
-                    continue
+                if needle not in haystack:
+                    return False
             if status is not None and task.status != status:
-                continue
+                return False
             if priority is not None and task.priority != priority:
-                continue
+                return False
             if assignee_id is not None and assignee_id not in task.assignee_ids:
-                continue
+                return False
             if tag_id is not None and tag_id not in task.tag_ids:
-                continue
+                return False
             if sprint_id is not None and task.sprint_id != sprint_id:
-                continue
+                return False
             if due_before is not None and (
                 task.due_date is None or task.due_date > due_before
             ):
-                continue
+                return False
             if due_after is not None and (
                 task.due_date is None or task.due_date < due_after
             ):
-                continue
+                return False
             if overdue_only:
                 if task.due_date is None or task.due_date >= now:
-                    continue
+                    return False
                 if task.status in (Status.DONE, Status.CANCELLED):
-                    continue
-            results.append(task)
+                    return False
+            if conditions and not all(
+                c.matches(task.custom_fields) for c in conditions
+            ):
+                return False
+            return True
 
-        return results
+        return matches
+
+    def create_custom_field_index(
+        self, project_id: str, field_name: str, kind: str = "hash"
+    ) -> None:
+        """Declare a ``hash`` (equality / ``in``) or ``sorted`` (also ranges)
+        index so ``custom_fields`` filters on this project skip the scan."""
+        self._store.create_field_index(project_id, field_name, kind)
+
+    def drop_custom_field_index(self, project_id: str, field_name: str) -> None:
+        self._store.drop_field_index(project_id, field_name)
 
     def get_tasks_by_priority(self, project_id: str) -> dict[str, list[Task]]:
         tasks = self._store.list_tasks(project_id=project_id)
@@ -220,26 +463,94 @@ class TaskService:
         return grouped
 
     def get_task_hierarchy(self, task_id: str) -> dict[str, Any]:
-        task = self._store.get_task(task_id)
-        result: dict[str, Any] = task.to_dict()
-        subtasks: list[dict[str, Any]] = []
-        for sub_id in task.subtask_ids:
-            try:
-                subtasks.append(self.get_task_hierarchy(sub_id))
-            except NotFoundError:
-                pass
-        result["subtasks"] = subtasks
+        # The whole subtree is fetched in one call and the nesting is built
+        # with an explicit stack, so depth is not bound by the recursion limit.
+        tasks = {t.id: t for t in self._store.subtree_tasks(task_id)}
+        result: dict[str, Any] = tasks[task_id].to_dict()
+        stack = [(tasks[task_id], result)]
+        while stack:
+            task, node = stack.pop()
+            subtasks: list[dict[str, Any]] = []
+            for sub_id in task.subtask_ids:
+                sub = tasks.get(sub_id)
+                if sub is None:
+                    continue
+                child = sub.to_dict()
+                subtasks.append(child)
+                stack.append((sub, child))
+            node["subtasks"] = subtasks
         return result
 
+    def get_subtree_rollup(self, task_id: str) -> dict[str, Any]:
+        return self._store.subtree_rollup(task_id)
+
     # ------------------------------------------------------------------
     # Analytics
     # ------------------------------------------------------------------
 
     def compute_project_stats(self, project_id: str) -> dict[str, Any]:
-        tasks = self._store.list_tasks(project_id=project_id)
         now = datetime.utcnow()
+        raw = self._store.project_aggregate(project_id, now)
+        return self._format_project_stats(project_id, raw, now)
+
+    def compute_project_stats_approx(
+        self, project_id: str, sample_size: int | None = None
+    ) -> dict[str, Any]:
+        """Project totals estimated from the store's random sample of the
+        project's tasks, each with a 95% confidence interval. A larger
+        ``sample_size`` narrows the intervals."""
+        now = datetime.utcnow()
+        snaps, population = self._store.sample_project(project_id, sample_size)
+
+        def total(value: Callable[[TaskSnapshot], float]) -> dict[str, Any]:
+            return estimate_total([value(s) for s in snaps], population)
+
+        def overdue(s: TaskSnapshot) -> bool:
+            return (
+                s.due_date is not None
+                and s.due_date < now
+                and s.status not in (Status.DONE, Status.CANCELLED)
+            )
+
+        return {
+            "project_id": project_id,
+            "approximate": True,
+            "confidence": 0.95,
+            "total_tasks": population,
+            "sample_size": len(snaps),
+            "completed_tasks": total(lambda s: s.status == Status.DONE),
+            "overdue_count": total(overdue),
+            "total_story_points": total(lambda s: s.story_points or 0),
+            "completed_story_points": total(
+                lambda s: (s.story_points or 0) if s.status == Status.DONE else 0
+            ),
+            "total_estimated_hours": total(lambda s: s.estimated_hours or 0.0),
+            "total_actual_hours": total(lambda s: s.actual_hours),
+            "unique_assignees": self._store.assignee_sketch([project_id]).estimate(),
+            "computed_at": now.isoformat(),
+        }
+
+    def verify_project_stats(self, project_id: str) -> list[str]:
+        """Compare the maintained aggregates against a full rescan.
+
+        Returns one message per mismatching field; an empty list means the
+        incremental statistics are consistent.
+        """
+        now = datetime.utcnow()
+        incremental = self._format_project_stats(
+            project_id, self._store.project_aggregate(project_id, now), now
+        )
+        scanned = self._format_project_stats(
+            project_id, self._scan_project_aggregate(project_id, now), now
+        )
+        return [
+            f"{key}: incremental={incremental[key]!r} scanned={scanned[key]!r}"
+            for key in scanned
+            if incremental[key] != scanned[key]
+        ]
 
-        total = len(tasks)
+    def _scan_project_aggregate(self, project_id: str, now: datetime) -> dict[str, Any]:
+        tasks = self._store.list_tasks(project_id=project_id)
         status_counts: dict[str, int] = {}
         priority_counts: dict[str, int] = {}
         total_estimated = 0.0
@@ -262,7 +573,7 @@ class TaskService:
 
             if (
                 task.due_date is not None
-                and task.due_date < now
+                and naive_utc(task.due_date) < now
                 and task.status not in (Status.DONE, Status.CANCELLED)
             ):
                 overdue += 1
@@ -275,7 +586,25 @@ class TaskService:
             for uid in task.assignee_ids:
                 assignee_load[uid] = assignee_load.get(uid, 0) + 1
 
-        done_count = status_counts.get("done", 0)
+        return {
+            "total": len(tasks),
+            "status_counts": status_counts,
+            "priority_counts": priority_counts,
+            "estimated_hours": total_estimated,
+            "actual_hours": total_actual,
+            "story_points": total_story_points,
+            "completed_points": completed_story_points,
+            "assignee_load": assignee_load,
+            "overdue": overdue,
+        }
+
+    def _format_project_stats(
+        self, project_id: str, raw: dict[str, Any], now: datetime
+    ) -> dict[str, Any]:
+        total = int(raw["total"])
+        total_estimated = float(raw["estimated_hours"])
+        total_actual = float(raw["actual_hours"])
+        done_count = raw["status_counts"].get("done", 0)
         completion_rate = (done_count / total * 100) if total > 0 else 0.0
         hours_variance: float | None = (
             (total_actual - total_estimated) if total_estimated > 0 else None
@@ -284,36 +613,35 @@ class TaskService:
         return {
             "project_id": project_id,
             "total_tasks": total,
-            "status_breakdown": status_counts,
-            "priority_breakdown": priority_counts,
+            "status_breakdown": raw["status_counts"],
+            "priority_breakdown": raw["priority_counts"],
             "completion_rate": round(completion_rate, 2),
             "total_estimated_hours": round(total_estimated, 2),
             "total_actual_hours": round(total_actual, 2),
             "hours_variance": round(hours_variance, 2)
             if hours_variance is not None
             else None,
-            "overdue_count": overdue,
-            "total_story_points": total_story_points,
-            "completed_story_points": completed_story_points,
-            "assignee_load": assignee_load,
+            "overdue_count": raw["overdue"],
+            "total_story_points": raw["story_points"],
+            "completed_story_points": raw["completed_points"],
+            "assignee_load": raw["assignee_load"],
             "computed_at": now.isoformat(),
         }
 
     def compute_sprint_stats(self, sprint_id: str) -> dict[str, Any]:
         sprint: Sprint = self._store.get_sprint(sprint_id)
-        tasks = self._store.list_tasks_in_sprint(sprint_id)
+        now = datetime.utcnow()
+        agg = self._store.sprint_aggregate(sprint_id, now)
 
-        total_points = sum(t.story_points or 0 for t in tasks)
-        completed_points = sum(
-            (t.story_points or 0) for t in tasks if t.status == Status.DONE
-        )
+        total_points = int(agg["story_points"])
+        completed_points = int(agg["completed_points"])
         remaining_points = total_points - completed_points
 
-        total_tasks = len(tasks)
-        completed_tasks = sum(1 for t in tasks if t.status == Status.DONE)
+        total_tasks = int(agg["total"])
+        completed_tasks = int(agg["status_counts"].get(Status.DONE.value, 0))
 
         sprint_duration = (sprint.end_date - sprint.start_date).days
-        days_elapsed = (datetime.utcnow() - sprint.start_date).days
+        days_elapsed = (now - sprint.start_date).days
         days_elapsed = max(0, min(days_elapsed, sprint_duration))
 
         ideal_remaining = (
@@ -337,51 +665,25 @@ class TaskService:
         }
 
     def get_workload_report(self, project_id: str) -> list[dict[str, Any]]:
-        tasks = self._store.list_tasks(project_id=project_id)
         users = self._store.list_users(active_only=True)
-
-        # Build a map for fast user lookup
-        user_map = {u.id: u for u in users}
-        report: list[dict[str, Any]] = []
-
-        for user in users:
-            user_tasks = [t for t in tasks if user.id in t.assignee_ids]
-            open_tasks = [
-                t for t in user_tasks if t.status not in (Status.DONE, Status.CANCELLED)
-            ]
-            report.append(
-                {
-                    "user_id": user.id,
-                    "username": user.username,
-                    "full_name": user.full_name,
-                    "total_assigned": len(user_tasks),
-                    "open_tasks": len(open_tasks),
-                    "story_points": sum(t.story_points or 0 for t in open_tasks),
-                    "estimated_hours": sum(
-                        t.estimated_hours or 0.0 for t in open_tasks
-                    ),
-                }
-            )
-
-        report.sort(key=lambda x: int(x["open_tasks"]), reverse=True)
-        return report
+        totals = workload_totals(self._store.project_rows(project_id))
+        return format_workload(users, totals)
 
     def get_velocity_trend(
         self, project_id: str, last_n_sprints: int = 5
     ) -> list[dict[str, Any]]:
-        sprints = self._store.list_sprints(project_id=project_id)
         now = datetime.utcnow()
-        completed = sorted(
-            [s for s in sprints if s.end_date < now],
-            key=lambda s: s.end_date,
-        )[-last_n_sprints:]
+        completed = self._store.sprints_ending_before(
+            project_id, now, limit=last_n_sprints
+        )
 
         trend: list[dict[str, Any]] = []
         for sprint in completed:
-            sprint_tasks = self._store.list_tasks_in_sprint(sprint.id)
-            points = sum(
-                (t.story_points or 0) for t in sprint_tasks if t.status == Status.DONE
-            )
+            if sprint.velocity is not None:
+                points = int(sprint.velocity)
+            else:
+                agg = self._store.sprint_aggregate(sprint.id, now)
+                points = agg["completed_points"]
             trend.append(
                 {
                     "sprint_id": sprint.id,
@@ -392,22 +694,31 @@ class TaskService:
             )
         return trend
 
-    def find_blocked_tasks(self, project_id: str) -> list[Task]:
-        tasks = self._store.list_tasks(project_id=project_id)
-        blocked: list[Task] = []
-        now = datetime.utcnow()
-        threshold = timedelta(days=14)
-
-        for task in tasks:
-            if task.status != Status.IN_PROGRESS:
-                continue
-            if now - task.updated_at > threshold:
-                blocked.append(task)
-                continue
-            if (
-                task.estimated_hours is not None
-                and task.actual_hours > task.estimated_hours * 3
-            ):
-                blocked.append(task)
+    def get_completion_trend(
+        self, project_id: str, days: int = 90
+    ) -> list[dict[str, Any]]:
+        """Daily completion rate and related totals over the last ``days``
+        days, read from the project's stored rollup rows."""
+        today = datetime.utcnow().date()
+        start = today - timedelta(days=days - 1)
+        trend: list[dict[str, Any]] = []
+        for day, row, overdue in self._store.project_rollups(project_id, start, today):
+            done = row.status_counts.get(Status.DONE.value, 0)
+            trend.append(
+                {
+                    "date": day.isoformat(),
+                    "total_tasks": row.total,
+                    "completed_tasks": done,
+                    "completion_rate": round(done / row.total * 100, 2)
+                    if row.total
+                    else 0.0,
+                    "completed_story_points": row.completed_points,
+                    "overdue_count": overdue,
+                }
+            )
+        return trend
 
-        return blocked
+    def find_blocked_tasks(self, project_id: str) -> list[Task]:
+        stale_before = datetime.utcnow() - BLOCKED_AFTER
+        ids = self._store.blocked_task_ids(project_id, stale_before)
+        return self._store.tasks_in_order(set(ids))
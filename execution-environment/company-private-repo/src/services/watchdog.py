@@ -0,0 +1,85 @@
+"""Background watchdog that reports newly blocked tasks."""
+
+from __future__ import annotations
+
+import logging
+import threading
+from datetime import datetime
+from typing import Callable
+
+from models.store import DataStore
+from services.task_service import BLOCKED_AFTER
+
+BlockedCallback = Callable[[str, list[str]], None]
+
+logger = logging.getLogger(__name__)
+
+
+class BlockedTaskWatchdog:
+    """Periodically checks every project for blocked tasks and calls
+    ``on_blocked(project_id, task_ids)`` with the ones not reported before.
+
+    Each check reads the store's in-progress index, so its cost grows with
+    the number of blocked tasks rather than the number of tasks. Tasks only
+    count as reported once ``on_blocked`` returns; if it raises, the error
+    is logged and the same tasks are offered again on the next check.
+    """
+
+    def __init__(
+        self,
+        store: DataStore,
+        on_blocked: BlockedCallback,
+        interval: float = 300.0,
+    ) -> None:
+        self._store = store
+        self._on_blocked = on_blocked
+        self._interval = interval
+        self._reported: dict[str, set[str]] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def check_once(self) -> dict[str, list[str]]:
+        stale_before = datetime.utcnow() - BLOCKED_AFTER
+        found: dict[str, list[str]] = {}
+        for project in self._store.list_projects():
+            ids = self._store.blocked_task_ids(project.id, stale_before)
+            current = set(ids)
+            # Forget tasks that recovered so they are reported again if they
+            # become blocked later.
+            seen = self._reported.get(project.id, set()) & current
+            new = [tid for tid in ids if tid not in seen]
+            if new:
+                try:
+                    self._on_blocked(project.id, new)
+                except Exception:
+                    logger.exception(
+                        "on_blocked failed for project %s; will retry", project.id
+                    )
+                    self._reported[project.id] = seen
+                    continue
+                found[project.id] = new
+            self._reported[project.id] = current
+        return found
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="blocked-task-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.check_once()
+            except Exception:
+                logger.exception("blocked-task check failed")
+            self._stop.wait(self._interval)
@@ -0,0 +1,157 @@
+"""Versioned LRU cache for read-heavy query results."""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Callable, Hashable
+
+_MISSING = object()
+
+
+def make_cache_key(name: str, **kwargs: Any) -> Hashable:
+    """Build a hashable key from query arguments.
+
+    Arguments left at ``None`` are dropped, so ``f(x=None)`` and ``f()``
+    share an entry, and keyword order never matters.
+    """
+    return (
+        name,
+        tuple(
+            sorted((k, _normalize(v)) for k, v in kwargs.items() if v is not None)
+        ),
+    )
+
+
+def _normalize(value: Any) -> Hashable:
+    if isinstance(value, Enum):
+        return (type(value).__name__, value.value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _normalize(v)) for k, v in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted((_normalize(v) for v in value), key=repr))
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize(v) for v in value)
+    return value
+
+
+def approx_size(value: Any) -> int:
+    """Rough deep size in bytes of JSON-like data (dicts, lists, scalars)."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += approx_size(k) + approx_size(v)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for v in value:
+            size += approx_size(v)
+    return size
+
+
+@dataclass
+class _CacheEntry:
+    value: Any
+    token: Hashable
+    size: int
+    stored_at: float
+
+
+class ResultCache:
+    """LRU cache whose entries are only served while their version token
+    still matches the caller's current token.
+
+    Cached values are shared between callers and must be treated as
+    read-only.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 32 * 1024 * 1024,
+        ttl: float | None = None,
+    ) -> None:
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, _CacheEntry] = OrderedDict()
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, token: Hashable) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return _MISSING
+            age = time.monotonic() - entry.stored_at
+            expired = self._ttl is not None and age > self._ttl
+            if entry.token != token or expired:
+                self._drop(key)
+                self.invalidations += 1
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def put(self, key: Hashable, token: Hashable, value: Any) -> None:
+        size = approx_size(value)
+        if size > self._max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = _CacheEntry(value, token, size, time.monotonic())
+            self._bytes += size
+            while len(self._entries) > self._max_entries or (
+                self._entries and self._bytes > self._max_bytes
+            ):
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def get_or_compute(
+        self, key: Hashable, token: Hashable, compute: Callable[[], Any]
+    ) -> Any:
+        # The token must be taken before computing: if the store changes
+        # mid-computation the entry is stored under the older token and is
+        # rejected on the next lookup.
+        value = self.get(key, token)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, token, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self._max_entries,
+                "max_bytes": self._max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _drop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
@@ -2,11 +2,15 @@
 
 from __future__ import annotations
 
+import base64
 import hashlib
+import json
 import re
 import unicodedata
 from datetime import date, datetime, timedelta
-from typing import Any
+from typing import Any, Iterable
+
+from models.indexes import naive_utc
 
 
 def slugify(text: str) -> str:
@@ -108,16 +112,66 @@ def paginate(
     page = max(1, min(page, total_pages))
     start = (page - 1) * per_page
     end = start + per_page
-    return items[start:end], {
+    return items[start:end], _page_meta(page, per_page, total)
+
+
+def paginate_iter(
+    items: Iterable[Any], page: int = 1, per_page: int = 20
+) -> tuple[list[Any], dict[str, Any]]:
+    """Like ``paginate`` but consumes an iterable holding at most two pages.
+
+    The stream still has to be drained to report ``total``, but only the
+    requested page (and the trailing page, in case ``page`` is clamped) is
+    kept in memory.
+    """
+    start = (max(1, page) - 1) * per_page
+    total = 0
+    window: list[Any] = []
+    last_window: list[Any] = []
+    wanted: list[Any] | None = None
+    for item in items:
+        window.append(item)
+        total += 1
+        if len(window) == per_page:
+            if total == start + per_page:
+                wanted = window
+            last_window, window = window, []
+    total_pages = max(1, (total + per_page - 1) // per_page)
+    page = max(1, min(page, total_pages))
+    if wanted is None:
+        wanted = window or last_window
+    return wanted, _page_meta(page, per_page, total)
+
+
+def _page_meta(page: int, per_page: int, total: int) -> dict[str, Any]:
+    total_pages = max(1, (total + per_page - 1) // per_page)
+    return {
         "page": page,
         "per_page": per_page,
         "total": total,
         "total_pages": total_pages,
-        "has_next": page <= total_pages,
+        "has_next": page < total_pages,
         "has_prev": page > 1,
     }
 
 
+def encode_cursor(key: tuple[datetime, str]) -> str:
+    created_at, item_id = key
+    raw = json.dumps([created_at.isoformat(), item_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """Inverse of ``encode_cursor``. Timestamps come back naive UTC, like
+    the keys they are compared with."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(padded))
+        return naive_utc(datetime.fromisoformat(str(created_at))), str(item_id)
+    except (ValueError, TypeError) as exc:
+        raise ValueError(f"Invalid pagination cursor: {cursor!r}") from exc
+
+
 def short_id(full_id: str, length: int = 8) -> str:
     return hashlib.md5(full_id.encode()).hexdigest()[:length]
 
@@ -4,11 +4,14 @@ from __future__ import annotations
 
 import csv
 import io
-from datetime import date, datetime, timedelta
-from typing import Any
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Any, Iterable, Iterator
 
-from models.core import Sprint, Status, User
+from models.core import Sprint, Status, Task, User
+from models.indexes import TaskRow, utc_seconds
 from models.store import DataStore
+from utils.sketches import estimate_count
 
 
 def format_duration(hours: float | None) -> str:
@@ -27,6 +30,88 @@ def format_date(dt: datetime | None) -> str:
     return dt.strftime("%Y-%m-%d")
 
 
+@dataclass
+class _Performance:
+    assigned: int = 0
+    completed: int = 0
+    overdue: int = 0
+    estimated_hours: float = 0.0
+    actual_hours: float = 0.0
+
+
+_CLOSED = (Status.DONE.value, Status.CANCELLED.value)
+
+
+def performance_totals(
+    rows: Iterable[TaskRow], now: datetime
+) -> dict[str, _Performance]:
+    """One pass over a project's task rows fills every assignee's totals."""
+    cutoff = utc_seconds(now)
+    totals: dict[str, _Performance] = {}
+    for status, assignee_ids, _, estimated, actual, due in rows:
+        done = status == Status.DONE.value
+        overdue = due is not None and due < cutoff and status not in _CLOSED
+        for uid in dict.fromkeys(assignee_ids):
+            acc = totals.get(uid)
+            if acc is None:
+                acc = totals[uid] = _Performance()
+            acc.assigned += 1
+            if done:
+                acc.completed += 1
+                acc.estimated_hours += estimated or 0.0
+                acc.actual_hours += actual
+            if overdue:
+                acc.overdue += 1
+    return totals
+
+
+def format_team_performance(
+    project_id: str,
+    users: list[User],
+    totals: dict[str, _Performance],
+    now: datetime,
+) -> dict[str, Any]:
+    members: list[dict[str, Any]] = []
+    for user in users:
+        acc = totals.get(user.id)
+        if acc is None:
+            continue
+        efficiency: float | None = (
+            (acc.estimated_hours / acc.actual_hours) if acc.actual_hours > 0 else None
+        )
+
+        members.append(
+            {
+                "user_id": user.id,
+                "username": user.username,
+                "full_name": user.full_name,
+                "tasks_assigned": acc.assigned,
+                "tasks_completed": acc.completed,
+                "tasks_overdue": acc.overdue,
+                "completion_rate": round(acc.completed / acc.assigned * 100, 1),
+                "total_estimated_hours": round(acc.estimated_hours, 2),
+                "total_actual_hours": round(acc.actual_hours, 2),
+                "efficiency_ratio": round(efficiency, 3)
+                if efficiency is not None
+                else None,
+            }
+        )
+
+    members.sort(key=lambda m: float(m["completion_rate"]), reverse=True)
+    return {
+        "project_id": project_id,
+        "generated_at": now.isoformat(),
+        "members": members,
+    }
+
+
+def _drain(buffer: io.StringIO) -> str:
+    value = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return value
+
+
 class ReportGenerator:
     def __init__(self, store: DataStore) -> None:
         self._store = store
@@ -50,7 +135,10 @@ class ReportGenerator:
     # ------------------------------------------------------------------
 
     def export_tasks_csv(self, project_id: str) -> str:
-        tasks = self._store.list_tasks(project_id=project_id)
+        return "".join(self.iter_tasks_csv(project_id))
+
+    def iter_tasks_csv(self, project_id: str) -> Iterator[str]:
+        """Yield the task CSV export one line at a time."""
         output = io.StringIO()
         writer = csv.DictWriter(
             output,
@@ -69,7 +157,8 @@ class ReportGenerator:
             ],
         )
         writer.writeheader()
-        for task in tasks:
+        yield _drain(output)
+        for task in self._store.iter_tasks(project_id=project_id):
             assignees = ", ".join(
                 u.full_name for u in self._resolve_users(task.assignee_ids)
             )
@@ -92,7 +181,7 @@ class ReportGenerator:
                     "updated_at": format_date(task.updated_at),
                 }
             )
-        return output.getvalue()
+            yield _drain(output)
 
     def export_members_csv(self, project_id: str) -> str:
         project = self._store.get_project(project_id)
@@ -121,7 +210,6 @@ class ReportGenerator:
 
     def project_summary_text(self, project_id: str) -> str:
         project = self._store.get_project(project_id)
-        tasks = self._store.list_tasks(project_id=project_id)
         now = datetime.utcnow()
 
         owner = self._resolve_user(project.owner_id)
@@ -140,14 +228,24 @@ class ReportGenerator:
         ]
 
         status_counts: dict[str, int] = {}
-        for task in tasks:
+        overdue_count = 0
+        overdue: list[Task] = []
+        for task in self._store.iter_tasks(project_id=project_id):
             s = task.status.value
             status_counts[s] = status_counts.get(s, 0) + 1
+            if (
+                task.due_date is not None
+                and task.due_date < now
+                and task.status not in (Status.DONE, Status.CANCELLED)
+            ):
+                overdue_count += 1
+                if len(overdue) < 5:
+                    overdue.append(task)
 
         for status_val, count in sorted(status_counts.items()):
             lines.append(f"  {status_val:15s}: {count}")
 
-        total = len(tasks)
+        total = sum(status_counts.values())
         done = status_counts.get("done", 0)
         if total:
             lines.append(
@@ -156,20 +254,13 @@ class ReportGenerator:
         else:
             lines.append("\n  No tasks.")
 
-        overdue = [
-            t
-            for t in tasks
-            if t.due_date is not None
-            and t.due_date < now
-            and t.status not in (Status.DONE, Status.CANCELLED)
-        ]
-        lines.append(f"\nOverdue Tasks: {len(overdue)}")
-        for t in overdue[:5]:
+        lines.append(f"\nOverdue Tasks: {overdue_count}")
+        for t in overdue:
             lines.append(
                 f"  - [{t.priority.name}] {t.title} (due {format_date(t.due_date)})"
             )
-        if len(overdue) > 5:
-            lines.append(f"  ... and {len(overdue) - 5} more")
+        if overdue_count > 5:
+            lines.append(f"  ... and {overdue_count - 5} more")
 
         lines.append(f"\nGenerated: {now.strftime('%Y-%m-%d %H:%M UTC')}")
         return "\n".join(lines)
@@ -178,13 +269,21 @@ class ReportGenerator:
         sprint: Sprint = self._store.get_sprint(sprint_id)
         tasks = self._store.list_tasks_in_sprint(sprint_id)
         now = datetime.utcnow()
-
-        completed = [t for t in tasks if t.status == Status.DONE]
-        in_progress = [t for t in tasks if t.status == Status.IN_PROGRESS]
-        remaining = [t for t in tasks if t.status in (Status.TODO, Status.BACKLOG)]
-
-        total_pts = sum(t.story_points or 0 for t in tasks)
-        done_pts = sum(t.story_points or 0 for t in completed)
+        agg = self._store.sprint_aggregate(sprint_id, now)
+
+        completed: list[Task] = []
+        in_progress: list[Task] = []
+        remaining: list[Task] = []
+        for t in tasks:
+            if t.status == Status.DONE:
+                completed.append(t)
+            elif t.status == Status.IN_PROGRESS:
+                in_progress.append(t)
+            elif t.status in (Status.TODO, Status.BACKLOG):
+                remaining.append(t)
+
+        total_pts = agg["story_points"]
+        done_pts = agg["completed_points"]
 
         lines = [
             f"Sprint: {sprint.name}",
@@ -219,82 +318,98 @@ class ReportGenerator:
     # ------------------------------------------------------------------
 
     def get_burndown_data(self, sprint_id: str) -> list[dict[str, Any]]:
-        sprint: Sprint = self._store.get_sprint(sprint_id)
-        tasks = self._store.list_tasks_in_sprint(sprint_id)
-        total_points = sum(t.story_points or 0 for t in tasks)
+        return self.get_burndown_batch([sprint_id])[sprint_id]
 
-        completions: list[tuple[date, int]] = []
-        for task in tasks:
-            if task.status == Status.DONE and task.story_points is not None:
-                completions.append((task.updated_at.date(), task.story_points))
-        completions.sort(key=lambda x: x[0])
+    def get_burndown_batch(
+        self, sprint_ids: list[str]
+    ) -> dict[str, list[dict[str, Any]]]:
+        """Daily open story points for each sprint, as of the end of each day,
+        read from the store's status transition timelines."""
+        return {
+            sid: [
+                {"date": day.isoformat(), "remaining_points": max(0, remaining)}
+                for day, (remaining, _) in self._daily_states(sid)
+            ]
+            for sid in sprint_ids
+        }
+
+    def get_cumulative_flow(self, sprint_id: str) -> list[dict[str, Any]]:
+        """Number of the sprint's tasks in each status at the end of each day."""
+        return [
+            {"date": day.isoformat(), **counts}
+            for day, (_, counts) in self._daily_states(sprint_id)
+        ]
 
-        data_points: list[dict[str, Any]] = []
-        remaining = total_points
+    def _daily_states(
+        self, sprint_id: str
+    ) -> list[tuple[date, tuple[int, dict[str, int]]]]:
+        sprint: Sprint = self._store.get_sprint(sprint_id)
+        days: list[date] = []
         current: date = sprint.start_date.date()
         end: date = sprint.end_date.date()
-        comp_idx = 0
-
         while current <= end:
-            while comp_idx < len(completions) and completions[comp_idx][0] == current:
-                remaining -= completions[comp_idx][1]
-                comp_idx += 1
-            data_points.append(
-                {
-                    "date": current.isoformat(),
-                    "remaining_points": max(0, remaining),
-                }
-            )
+            days.append(current)
             current += timedelta(days=1)
-
-        return data_points
+        midnights = [datetime.combine(d + timedelta(days=1), time()) for d in days]
+        states = self._store.sprint_timeline_states(sprint_id, midnights)
+        return list(zip(days, states))
 
     def team_performance_report(self, project_id: str) -> dict[str, Any]:
-        tasks = self._store.list_tasks(project_id=project_id)
         users = self._store.list_users(active_only=True)
         now = datetime.utcnow()
+        totals = performance_totals(self._store.project_rows(project_id), now)
+        return format_team_performance(project_id, users, totals, now)
+
+    def team_performance_approx(
+        self, project_id: str, sample_size: int | None = None
+    ) -> dict[str, Any]:
+        """Per-member task counts estimated from the store's random sample of
+        the project's tasks, each with a 95% confidence interval."""
+        now = datetime.utcnow()
+        snaps, population = self._store.sample_project(project_id, sample_size)
+        n = len(snaps)
+
+        totals: dict[str, _Performance] = {}
+        for snap in snaps:
+            done = snap.status == Status.DONE
+            overdue = (
+                snap.due_date is not None
+                and snap.due_date < now
+                and snap.status not in (Status.DONE, Status.CANCELLED)
+            )
+            for uid in dict.fromkeys(snap.assignee_ids):
+                acc = totals.get(uid)
+                if acc is None:
+                    acc = totals[uid] = _Performance()
+                acc.assigned += 1
+                acc.completed += done
+                acc.overdue += overdue
 
         members: list[dict[str, Any]] = []
-        for user in users:
-            user_tasks = [t for t in tasks if user.id in t.assignee_ids]
-            if not user_tasks:
+        for user in self._store.list_users(active_only=True):
+            acc = totals.get(user.id)
+            if acc is None:
                 continue
-            done_tasks = [t for t in user_tasks if t.status == Status.DONE]
-            overdue_tasks = [
-                t
-                for t in user_tasks
-                if t.due_date is not None
-                and t.due_date < now
-                and t.status not in (Status.DONE, Status.CANCELLED)
-            ]
-            total_est = sum(t.estimated_hours or 0.0 for t in done_tasks)
-            total_actual = sum(t.actual_hours for t in done_tasks)
-            efficiency: float | None = (
-                (total_est / total_actual) if total_actual > 0 else None
-            )
-
             members.append(
                 {
                     "user_id": user.id,
                     "username": user.username,
                     "full_name": user.full_name,
-                    "tasks_assigned": len(user_tasks),
-                    "tasks_completed": len(done_tasks),
-                    "tasks_overdue": len(overdue_tasks),
-                    "completion_rate": round(
-                        len(done_tasks) / len(user_tasks) * 100, 1
-                    ),
-                    "total_estimated_hours": round(total_est, 2),
-                    "total_actual_hours": round(total_actual, 2),
-                    "efficiency_ratio": round(efficiency, 3)
-                    if efficiency is not None
-                    else None,
+                    "tasks_assigned": estimate_count(acc.assigned, n, population),
+                    "tasks_completed": estimate_count(acc.completed, n, population),
+                    "tasks_overdue": estimate_count(acc.overdue, n, population),
+                    "completion_rate": round(acc.completed / acc.assigned * 100, 1),
                 }
             )
 
         members.sort(key=lambda m: float(m["completion_rate"]), reverse=True)
         return {
             "project_id": project_id,
+            "approximate": True,
+            "confidence": 0.95,
+            "total_tasks": population,
+            "sample_size": n,
+            "unique_assignees": self._store.assignee_sketch([project_id]).estimate(),
             "generated_at": now.isoformat(),
             "members": members,
         }
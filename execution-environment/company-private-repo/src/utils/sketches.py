@@ -0,0 +1,160 @@
+"""Probabilistic summaries for approximate analytics."""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import random
+from typing import Any, Generic, Hashable, TypeVar
+
+T = TypeVar("T", bound=Hashable)
+
+Z_95 = 1.96
+
+
+class ReservoirSample(Generic[T]):
+    """Uniform random sample of at most ``capacity`` items from a stream
+    with deletions (random pairing). Each removal is remembered as either
+    a gap in the sample or a miss outside it, and later arrivals are
+    paired with those removals: an arrival fills a gap with probability
+    ``gaps / (gaps + misses)``, which keeps the sample uniform over the
+    live items. With no pending removals it behaves as Algorithm R."""
+
+    def __init__(self, capacity: int = 10_000, seed: int | None = None) -> None:
+        self.capacity = capacity
+        self._items: list[T] = []
+        self._positions: dict[T, int] = {}
+        self._population = 0
+        self._gaps = 0
+        self._misses = 0
+        self._rng = random.Random(seed)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, item: T) -> None:
+        self._population += 1
+        pending = self._gaps + self._misses
+        if pending:
+            if self._rng.randrange(pending) < self._gaps:
+                self._gaps -= 1
+                self._append(item)
+            else:
+                self._misses -= 1
+            return
+        if len(self._items) < self.capacity:
+            self._append(item)
+            return
+        j = self._rng.randrange(self._population)
+        if j < self.capacity:
+            del self._positions[self._items[j]]
+            self._items[j] = item
+            self._positions[item] = j
+
+    def discard(self, item: T) -> None:
+        self._population = max(0, self._population - 1)
+        i = self._positions.pop(item, None)
+        if i is None:
+            self._misses += 1
+            return
+        self._gaps += 1
+        last = self._items.pop()
+        if i < len(self._items):
+            self._items[i] = last
+            self._positions[last] = i
+
+    def _append(self, item: T) -> None:
+        self._positions[item] = len(self._items)
+        self._items.append(item)
+
+    def sample(self, size: int | None = None) -> list[T]:
+        """A uniform subset of the reservoir, or all of it."""
+        if size is None or size >= len(self._items):
+            return list(self._items)
+        return self._rng.sample(self._items, size)
+
+
+class HyperLogLog:
+    """Distinct-count sketch with a relative standard error of about
+    ``1.04 / sqrt(2 ** precision)``. Sketches of the same precision merge by
+    taking the register-wise maximum."""
+
+    def __init__(self, precision: int = 12) -> None:
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self._m = 1 << precision
+        self._registers = bytearray(self._m)
+
+    def add(self, value: str) -> None:
+        digest = hashlib.blake2b(value.encode(), digest_size=8).digest()
+        h = int.from_bytes(digest, "big")
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def merge(self, other: HyperLogLog) -> None:
+        if other.precision != self.precision:
+            raise ValueError("cannot merge sketches of different precision")
+        self._registers = bytearray(map(max, self._registers, other._registers))
+
+    def count(self) -> float:
+        m = self._m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self._registers)
+        zeros = self._registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)
+        return raw
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(self._m)
+
+    def estimate(self) -> dict[str, Any]:
+        value = self.count()
+        margin = Z_95 * self.relative_error * value
+        return {
+            "estimate": round(value),
+            "ci": [max(0, round(value - margin)), round(value + margin)],
+        }
+
+
+def estimate_total(
+    values: list[float], population: int, z: float = Z_95
+) -> dict[str, Any]:
+    """Estimate the population total of a quantity from a simple random
+    sample of ``values``, with a normal-approximation confidence interval
+    that includes the finite population correction."""
+    n = len(values)
+    mean = sum(values) / n if n else 0.0
+    variance = sum((v - mean) ** 2 for v in values) / (n - 1) if n > 1 else 0.0
+    return _interval(mean, variance, n, population, z)
+
+
+def estimate_count(
+    hits: int, sample_size: int, population: int, z: float = Z_95
+) -> dict[str, Any]:
+    """``estimate_total`` for a 0/1 indicator that is set in ``hits`` of the
+    sampled items."""
+    n = sample_size
+    p = hits / n if n else 0.0
+    variance = p * (1 - p) * n / (n - 1) if n > 1 else 0.0
+    return _interval(p, variance, n, population, z)
+
+
+def _interval(
+    mean: float, variance: float, n: int, population: int, z: float
+) -> dict[str, Any]:
+    if n == 0 or population == 0:
+        return {"estimate": 0.0, "ci": [0.0, 0.0], "sample_size": n}
+    fpc = (population - n) / (population - 1) if population > 1 else 0.0
+    margin = z * population * math.sqrt(max(0.0, variance / n * fpc))
+    estimate = population * mean
+    return {
+        "estimate": round(estimate, 2),
+        "ci": [round(estimate - margin, 2), round(estimate + margin, 2)],
+        "sample_size": n,
+    }
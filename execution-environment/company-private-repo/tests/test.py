@@ -5,6 +5,7 @@ from __future__ import annotations
 import os
 import sys
 import unittest
+from dataclasses import replace
 from datetime import datetime, timedelta
 from typing import Any
 
@@ -12,36 +13,65 @@ sys.path.insert(
     0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
 )
 
-from api.app import TaskFlowAPI  # pyright: ignore[reportMissingImports]
+from api.app import (  # pyright: ignore[reportMissingImports]
+    TaskFlowAPI,
+    notifications_path,
+)
 from models.core import (  # pyright: ignore[reportMissingImports]
     Priority,
+    Sprint,
     Status,
     UserRole,
 )
+from models.indexes import DailyRollup  # pyright: ignore[reportMissingImports]
 from models.store import (  # pyright: ignore[reportMissingImports]
     DataStore,
     NotFoundError,
     StorageError,
 )
+from services.notification_service import (  # pyright: ignore[reportMissingImports]
+    Event,
+    EventType,
+    NotificationService,
+)
+from services.portfolio import (  # pyright: ignore[reportMissingImports]
+    portfolio_analytics,
+)
 from services.project_service import (  # pyright: ignore[reportMissingImports]
     ProjectService,
     UserService,
 )
+from services.query import (  # pyright: ignore[reportMissingImports]
+    QuerySyntaxError,
+    compile_query,
+)
 from services.task_service import TaskService  # pyright: ignore[reportMissingImports]
+from services.watchdog import (  # pyright: ignore[reportMissingImports]
+    BlockedTaskWatchdog,
+)
 from utils.helpers import (  # pyright: ignore[reportMissingImports]
     business_days_until,
     days_until,
+    decode_cursor,
+    encode_cursor,
     extract_mentions,
     generate_task_key,
     is_overdue,
     mask_email,
     paginate,
+    paginate_iter,
     short_id,
     slugify,
     truncate,
     validate_hex_color,
     validate_story_points,
 )
+from utils.sketches import (  # pyright: ignore[reportMissingImports]
+    HyperLogLog,
+    ReservoirSample,
+    estimate_count,
+    estimate_total,
+)
 
 # ---------------------------------------------------------------------------
 # Bootstrap helpers
@@ -201,6 +231,15 @@ class TestHelpers(unittest.TestCase):
         self.assertEqual(len(page), 5)
         self.assertFalse(meta["has_next"])
 
+    def test_paginate_iter_matches_paginate(self) -> None:
+        items = list(range(25))
+        for page in (1, 2, 3, 7):
+            self.assertEqual(
+                paginate_iter(iter(items), page=page, per_page=10),
+                paginate(items, page=page, per_page=10),
+            )
+        self.assertEqual(paginate_iter(iter([]), page=1)[0], [])
+
     def test_short_id_deterministic(self) -> None:
         uid = "some-fixed-uuid"
         self.assertEqual(short_id(uid), short_id(uid))
@@ -211,6 +250,61 @@ class TestHelpers(unittest.TestCase):
         self.assertTrue(key.endswith("-42"))
 
 
+class TestSketches(unittest.TestCase):
+    def test_hyperloglog_within_error(self) -> None:
+        left, right = HyperLogLog(), HyperLogLog()
+        for i in range(20_000):
+            (left if i % 2 else right).add(f"user-{i}")
+            left.add(f"user-{i % 100}")
+        left.merge(right)
+        self.assertLess(abs(left.count() - 20_000) / 20_000, 0.05)
+        small = HyperLogLog()
+        for uid in ("a", "b", "c", "a"):
+            small.add(uid)
+        self.assertEqual(small.estimate()["estimate"], 3)
+
+    def test_reservoir_sample(self) -> None:
+        sample: ReservoirSample[int] = ReservoirSample(capacity=100, seed=7)
+        for i in range(10_000):
+            sample.add(i)
+        self.assertEqual(len(sample), 100)
+        items = sample.sample()
+        self.assertGreater(max(items), 5_000)
+        sample.discard(items[0])
+        self.assertNotIn(items[0], sample.sample())
+        self.assertEqual(len(sample.sample(10)), 10)
+
+    def test_reservoir_sample_stays_uniform_after_deletes(self) -> None:
+        # Half of the first 2000 items are deleted, then 1000 more arrive, so
+        # new items are half of the live population and should be half of
+        # the sample on average. Admitting arrivals into the gaps outright
+        # skews this to about 0.74.
+        trials, capacity = 300, 50
+        new_share = 0.0
+        for seed in range(trials):
+            sample: ReservoirSample[int] = ReservoirSample(capacity, seed=seed)
+            for i in range(2_000):
+                sample.add(i)
+            for i in range(1, 2_000, 2):
+                sample.discard(i)
+            for i in range(2_000, 3_000):
+                sample.add(i)
+            items = sample.sample()
+            self.assertEqual(len(items), capacity)
+            self.assertTrue(all(i >= 2_000 or i % 2 == 0 for i in items))
+            new_share += sum(i >= 2_000 for i in items) / capacity
+        self.assertAlmostEqual(new_share / trials, 0.5, delta=0.02)
+
+    def test_estimate_total_exact_for_full_sample(self) -> None:
+        result = estimate_total([1.0, 2.0, 3.0], population=3)
+        self.assertEqual(result["estimate"], 6.0)
+        self.assertEqual(result["ci"], [6.0, 6.0])
+        count = estimate_count(30, 100, population=1000)
+        self.assertEqual(count["estimate"], 300.0)
+        self.assertLess(count["ci"][0], 300.0)
+        self.assertGreater(count["ci"][1], 300.0)
+
+
 # ---------------------------------------------------------------------------
 # Store tests
 # ---------------------------------------------------------------------------
@@ -231,6 +325,28 @@ class TestDataStore(unittest.TestCase):
     def _make_project(self, owner_id: str) -> object:
         return self.svc_p.create_project("Test Project", owner_id)
 
+    def test_sprint_end_index_mixes_aware_and_naive(self) -> None:
+        from datetime import timezone
+
+        owner = self.svc_u.create_user("sprint_tz", "stz@test.com", "Sprint Tz")
+        proj = self.svc_p.create_project("Proj", owner.id)
+        naive = Sprint("Naive", proj.id, datetime(2024, 1, 1), datetime(2024, 1, 14))
+        aware = Sprint(
+            "Aware",
+            proj.id,
+            datetime(2024, 2, 1, tzinfo=timezone.utc),
+            datetime(2024, 2, 14, tzinfo=timezone.utc),
+        )
+        self.store.add_sprint(naive)
+        self.store.add_sprint(aware)
+        self.assertEqual(len(self.store.list_sprints(proj.id)), 2)
+        ended = self.store.sprints_ending_before(
+            proj.id, datetime(2024, 2, 10, tzinfo=timezone.utc)
+        )
+        self.assertEqual([s.id for s in ended], [naive.id])
+        ended = self.store.sprints_ending_before(proj.id, datetime(2024, 3, 1))
+        self.assertEqual([s.id for s in ended], [naive.id, aware.id])
+
     def test_add_and_get_user(self) -> None:
         u = self.svc_u.create_user("userX", "userx@test.com", "User X")
         fetched = self.store.get_user(u.id)
@@ -270,6 +386,89 @@ class TestDataStore(unittest.TestCase):
         self.assertIn(child.id, updated_parent.subtask_ids)
         self.assertEqual(child.parent_task_id, parent.id)
 
+    def test_subtree_rollup_and_deep_hierarchy(self) -> None:
+        owner = self.svc_u.create_user("tree_owner", "tree@test.com", "Tree Owner")
+        proj = self.svc_p.create_project("Proj", owner.id)
+        root = self.svc_t.create_task("Epic", proj.id, owner.id, story_points=8)
+        a = self.svc_t.create_task(
+            "A", proj.id, owner.id, parent_task_id=root.id, story_points=3
+        )
+        b = self.svc_t.create_task(
+            "B", proj.id, owner.id, parent_task_id=root.id, estimated_hours=4.0
+        )
+        self.svc_t.create_task(
+            "A1", proj.id, owner.id, parent_task_id=a.id, story_points=2
+        )
+        self.svc_t.update_task(a.id, status=Status.DONE)
+
+        rollup = self.svc_t.get_subtree_rollup(root.id)
+        self.assertEqual(rollup["size"], 4)
+        self.assertEqual(rollup["story_points"], 13)
+        self.assertEqual(rollup["completed_points"], 3)
+        self.assertEqual(rollup["estimated_hours"], 4.0)
+        self.assertEqual(self.svc_t.get_subtree_rollup(a.id)["depth"], 1)
+        self.assertEqual(self.svc_t.get_subtree_rollup(a.id)["size"], 2)
+        self.svc_t.delete_task(b.id)
+        self.assertEqual(self.svc_t.get_subtree_rollup(root.id)["size"], 3)
+
+        parent = root
+        for i in range(sys.getrecursionlimit() + 100):
+            parent = self.svc_t.create_task(
+                f"L{i}", proj.id, owner.id, parent_task_id=parent.id
+            )
+        tree = self.svc_t.get_task_hierarchy(root.id)
+        depth = 0
+        node = tree
+        while node["subtasks"]:
+            node = node["subtasks"][-1]
+            depth += 1
+        self.assertEqual(depth, sys.getrecursionlimit() + 100)
+        self.assertEqual(
+            self.svc_t.get_subtree_rollup(parent.id)["depth"], depth
+        )
+
+    def test_deep_chain_cost_is_linear(self) -> None:
+        import time
+
+        owner = self.svc_u.create_user("chain_owner", "chain@test.com", "Chain")
+        proj = self.svc_p.create_project("Proj", owner.id)
+
+        def build(depth: int) -> float:
+            start = time.perf_counter()
+            root = parent = self.svc_t.create_task("Root", proj.id, owner.id)
+            for i in range(depth):
+                parent = self.svc_t.create_task(
+                    f"L{i}", proj.id, owner.id, parent_task_id=parent.id, story_points=1
+                )
+            rollup = self.svc_t.get_subtree_rollup(root.id)
+            self.assertEqual(rollup["size"], depth + 1)
+            self.assertEqual(rollup["story_points"], depth)
+            self.assertEqual(self.svc_t.get_subtree_rollup(parent.id)["depth"], depth)
+            return time.perf_counter() - start
+
+        small = build(500)
+        large = build(2_000)
+        # Four times the depth: about 4x when linear, 16x when quadratic.
+        self.assertLess(large / small, 8)
+
+    def test_hierarchy_delete_single_task_reparents_children(self) -> None:
+        owner = self.svc_u.create_user("mid_owner", "mid@test.com", "Mid Owner")
+        proj = self.svc_p.create_project("Proj", owner.id)
+        root = self.svc_t.create_task("Root", proj.id, owner.id, story_points=1)
+        mid = self.svc_t.create_task(
+            "Mid", proj.id, owner.id, parent_task_id=root.id, story_points=2
+        )
+        leaf = self.svc_t.create_task(
+            "Leaf", proj.id, owner.id, parent_task_id=mid.id, story_points=5
+        )
+        self.store.delete_task(mid.id)
+        self.assertEqual(
+            [t.id for t in self.store.subtree_tasks(root.id)], [root.id, leaf.id]
+        )
+        self.assertEqual(self.svc_t.get_subtree_rollup(leaf.id)["depth"], 1)
+        rollup = self.svc_t.get_subtree_rollup(root.id)
+        self.assertEqual((rollup["size"], rollup["story_points"]), (2, 6))
+
     def test_delete_task_cleans_parent(self) -> None:
         owner = self.svc_u.create_user("del_owner", "del@test.com", "Del Owner")
         proj = self.svc_p.create_project("Proj", owner.id)
@@ -291,6 +490,222 @@ class TestDataStore(unittest.TestCase):
         self.assertEqual(len(results), 1)
         self.assertEqual(results[0].id, t1.id)
 
+    def test_search_iter_count_exists(self) -> None:
+        owner = self.svc_u.create_user("iter_owner", "iter@test.com", "Iter Owner")
+        proj = self.svc_p.create_project("Proj", owner.id)
+        for i in range(5):
+            self.svc_t.create_task(f"Iter {i}", proj.id, owner.id)
+        stream = self.svc_t.search_tasks_iter(project_id=proj.id, query="iter")
+        self.assertEqual(next(stream).title, "Iter 0")
+        self.assertEqual(self.svc_t.count_tasks(project_id=proj.id, query="iter"), 5)
+        self.assertTrue(self.svc_t.exists_task(project_id=proj.id, query="iter 3"))
+        self.assertFalse(self.svc_t.exists_task(project_id=proj.id, query="nope"))
+
+    def test_search_ranked_title_over_description(self) -> None:
+        owner = self.svc_u.create_user("rank_owner", "rank@test.com", "Rank Owner")
+        proj = self.svc_p.create_project("Proj", owner.id)
+        desc_hit = self.svc_t.create_task(
+            "Tidy config", proj.id, owner.id, description="cache warmup"
+        )
+        title_hit = self.svc_t.create_task("Cache eviction", proj.id, owner.id)
+        self.svc_t.create_task("Unrelated", proj.id, owner.id)
+        ranked = self.svc_t.search_tasks_ranked("cache", project_id=proj.id)
+        self.assertEqual([t.id for _, t in ranked], [title_hit.id, desc_hit.id])
+        top = self.svc_t.search_tasks_ranked("cache", limit=1, project_id=proj.id)
+        self.assertEqual(len(top), 1)
+        self.assertEqual(self.svc_t.search_tasks_ranked("   "), [])
+
+    def test_custom_field_indexes(self) -> None:
+        owner = self.svc_u.create_user("cf_owner", "cf@test.com", "Cf Owner")
+        proj = self.svc_p.create_project("Proj", owner.id)
+        tasks = []
+        for i, (customer, severity) in enumerate(
+            [("acme", 1), ("acme", 3), ("globex", 4), ("initech", "high")]
+        ):
+            t = self.svc_t.create_task(f"CF {i}", proj.id, owner.id)
+            self.svc_t.update_task(
+                t.id, custom_fields={"customer": customer, "severity": severity}
+            )
+            tasks.append(t)
+        self.svc_t.create_task("No fields", proj.id, owner.id)
+        queries: list[dict[str, Any]] = [
+            {"customer": "acme"},
+            {"customer": {"in": ["globex", "initech"]}},
+            {"severity": {"gte": 3}},
+            {"severity": {"gt": 1, "lt": 4}},
+            {"customer": "acme", "severity": {"lte": 2}},
+            {"severity": "high"},
+        ]
+        scanned = [
+            [t.id for t in self.svc_t.search_tasks(project_id=proj.id, custom_fields=q)]
+            for q in queries
+        ]
+        self.svc_t.create_custom_field_index(proj.id, "customer", "hash")
+        self.svc_t.create_custom_field_index(proj.id, "severity", "sorted")
+        indexed = [
+            [t.id for t in self.svc_t.search_tasks(project_id=proj.id, custom_fields=q)]
+            for q in queries
+        ]
+        self.assertEqual(indexed, scanned)
+        self.assertEqual(scanned[2], [tasks[1].id, tasks[2].id])
+
+        self.svc_t.update_task(tasks[0].id, custom_fields={"customer": "globex"})
+        hits = self.svc_t.search_tasks(
+            project_id=proj.id, custom_fields={"customer": "globex"}
+        )
+        self.assertEqual([t.id for t in hits], [tasks[0].id, tasks[2].id])
+        with self.assertRaises(StorageError):
+            self.svc_t.create_custom_field_index(proj.id, "customer", "bitmap")
+
+    def test_rollup_overdue_derived_per_day(self) -> None:
+        owner = self.svc_u.create_user("roll_owner", "roll@test.com", "Roll Owner")
+        proj = self.svc_p.create_project("Proj", owner.id)
+        today = datetime.utcnow().date()
+        past = today - timedelta(days=3)
+        noon = datetime.combine(past, datetime.min.time()) + timedelta(hours=12)
+        self.svc_t.create_task(
+            "Soon", proj.id, owner.id, due_date=noon + timedelta(days=1)
+        )
+        self.svc_t.create_task(
+            "Later", proj.id, owner.id, due_date=noon + timedelta(days=30)
+        )
+        closed = self.svc_t.create_task("Closed", proj.id, owner.id, due_date=noon)
+        self.svc_t.update_task(closed.id, status=Status.DONE)
+
+        # Pretend the project last changed three days ago. The unsealed row
+        # is read from the live index; the sealed one from its own counts.
+        agg = self.store._project_aggregates[proj.id]
+        row = DailyRollup.of(past, agg, noon)
+        sealed = row.seal(agg)
+        for stored in (row, sealed):
+            self.assertEqual(DailyRollup.from_dict(stored.to_dict()), stored)
+            self.store._rollups[proj.id] = [stored]
+            rows = self.store.project_rollups(proj.id, past, today)
+            self.assertEqual([overdue for _, _, overdue in rows], [0, 1, 1, 1])
+        self.assertEqual(sealed.overdue_on(past + timedelta(days=30)), 2)
+        trend = self.svc_t.get_completion_trend(proj.id, days=4)
+        self.assertEqual([t["overdue_count"] for t in trend], [0, 1, 1, 1])
+
+    def test_rollup_write_cost_independent_of_due_dates(self) -> None:
+        from unittest import mock
+
+        owner = self.svc_u.create_user("due_owner", "due@test.com", "Due Owner")
+        proj = self.svc_p.create_project("Proj", owner.id)
+        start = datetime.utcnow() - timedelta(days=750)
+        tasks = [
+            self.svc_t.create_task(
+                f"T{d}", proj.id, owner.id, due_date=start + timedelta(days=d)
+            )
+            for d in range(1_500)
+        ]
+        aggregate = type(self.store._project_aggregates[proj.id])
+        with mock.patch.object(
+            aggregate, "due_by_day", autospec=True, side_effect=aggregate.due_by_day
+        ) as due_by_day:
+            for task in tasks[:200]:
+                self.svc_t.update_task(task.id, actual_hours=1.0)
+            # Writes within a day never touch the due-date distribution.
+            self.assertEqual(due_by_day.call_count, 0)
+
+            series = self.store._rollups[proj.id]
+            series[-1] = replace(series[-1], day=series[-1].day - timedelta(days=1))
+            for task in tasks[200:300]:
+                self.svc_t.update_task(task.id, actual_hours=2.0)
+            # The first write of a new day seals the previous row, once.
+            self.assertEqual(due_by_day.call_count, 1)
+        self.assertTrue(series[-2].sealed)
+        self.assertFalse(series[-1].sealed)
+
+    def test_sorted_field_index_mixed_datetimes(self) -> None:
+        from datetime import timezone
+
+        owner = self.svc_u.create_user("tz_owner", "tz@test.com", "Tz Owner")
+        proj = self.svc_p.create_project("Proj", owner.id)
+        self.svc_t.create_custom_field_index(proj.id, "shipped", "sorted")
+        naive = datetime(2024, 5, 1, 12)
+        aware = datetime(2024, 5, 1, 12, tzinfo=timezone.utc)
+        a = self.svc_t.create_task("Naive", proj.id, owner.id)
+        b = self.svc_t.create_task("Aware", proj.id, owner.id)
+        self.svc_t.update_task(a.id, custom_fields={"shipped": naive})
+        self.svc_t.update_task(b.id, custom_fields={"shipped": aware})
+
+        queries = [
+            {"shipped": naive},
+            {"shipped": aware},
+            {"shipped": {"gte": aware - timedelta(hours=1)}},
+            {"shipped": {"lt": naive + timedelta(hours=1)}},
+            {"shipped": {"gt": naive, "lt": aware}},
+        ]
+        indexed = [
+            [t.id for t in self.svc_t.search_tasks(project_id=proj.id, custom_fields=q)]
+            for q in queries
+        ]
+        self.assertEqual(indexed, [[a.id], [b.id], [b.id], [a.id], []])
+        self.svc_t.drop_custom_field_index(proj.id, "shipped")
+        scanned = [
+            [t.id for t in self.svc_t.search_tasks(project_id=proj.id, custom_fields=q)]
+            for q in queries
+        ]
+        self.assertEqual(indexed, scanned)
+
+    def test_query_dsl(self) -> None:
+        owner = self.svc_u.create_user("dsl_owner", "dsl@test.com", "Dsl Owner")
+        proj = self.svc_p.create_project("Proj", owner.id)
+        a = self.svc_t.create_task(
+            "Login bug", proj.id, owner.id, priority=Priority.HIGH, story_points=5
+        )
+        b = self.svc_t.create_task(
+            "Docs", proj.id, owner.id, priority=Priority.LOW, assignee_ids=[owner.id]
+        )
+        c = self.svc_t.create_task("Login copy", proj.id, owner.id, story_points=2)
+        self.svc_t.update_task(b.id, status=Status.IN_PROGRESS)
+        self.svc_t.update_task(c.id, custom_fields={"severity": 3})
+
+        def ids(expr: str) -> list[str]:
+            return [t.id for t in self.svc_t.query_tasks(expr, project_id=proj.id)]
+
+        self.assertEqual(ids("text ~ login and priority >= high"), [a.id])
+        self.assertEqual(ids("status in (todo, in_progress)"), [a.id, b.id, c.id])
+        self.assertEqual(ids(f'not assignee = "{owner.id}"'), [a.id, c.id])
+        self.assertEqual(
+            ids("points between 1 and 3 or status = in_progress"), [b.id, c.id]
+        )
+        self.assertEqual(ids("cf.severity >= 3"), [c.id])
+        self.svc_t.create_custom_field_index(proj.id, "severity", "sorted")
+        self.assertEqual(ids("cf.severity >= 3 and text ~ copy"), [c.id])
+        self.assertEqual(
+            ids(f'project = "{proj.id}" and due = null'), [a.id, b.id, c.id]
+        )
+        self.assertIs(compile_query("status = done"), compile_query("status = done"))
+        for bad in ("status =", "priority >= urgent", "status < todo", "(points = 1"):
+            with self.assertRaises(QuerySyntaxError):
+                compile_query(bad)
+
+    def test_query_dsl_null_bounds_and_mixed_timezones(self) -> None:
+        from datetime import timezone
+
+        owner = self.svc_u.create_user("dslz_owner", "dslz@test.com", "Dslz Owner")
+        proj = self.svc_p.create_project("Proj", owner.id)
+        march = datetime(2024, 3, 1, tzinfo=timezone.utc)
+        aware = self.svc_t.create_task("Aware", proj.id, owner.id, due_date=march)
+        naive = self.svc_t.create_task(
+            "Naive", proj.id, owner.id, due_date=datetime(2024, 1, 1)
+        )
+
+        def ids(expr: str) -> list[str]:
+            return [t.id for t in self.svc_t.query_tasks(expr, project_id=proj.id)]
+
+        self.assertEqual(ids('due > "2024-02-01"'), [aware.id])
+        self.assertEqual(ids('due < "2024-02-01T00:00:00+00:00"'), [naive.id])
+        self.assertEqual(
+            ids('due between "2023-12-31" and "2024-03-01T01:00:00+01:00"'),
+            [aware.id, naive.id],
+        )
+        self.assertEqual(ids('due = "2024-03-01T00:00:00+00:00"'), [aware.id])
+        for bad in ("points < null", "due >= null", "points between null and 3"):
+            with self.assertRaises(QuerySyntaxError):
+                compile_query(bad)
+
     def test_comment_add_and_delete(self) -> None:
         owner = self.svc_u.create_user("comment_u", "cu@test.com", "Comment U")
         proj = self.svc_p.create_project("Proj", owner.id)
@@ -301,6 +716,31 @@ class TestDataStore(unittest.TestCase):
         updated = self.store.get_task(task.id)
         self.assertEqual(len(updated.comments), 0)
 
+    def test_comment_index_tracks_edits_and_deletes(self) -> None:
+        owner = self.svc_u.create_user("cidx_u", "cidx@test.com", "Cidx U")
+        other = self.svc_u.create_user("cidx_v", "cidxv@test.com", "Cidx V")
+        proj = self.svc_p.create_project("Proj", owner.id)
+        task = self.svc_t.create_task("Indexed", proj.id, owner.id)
+        c1 = self.svc_t.add_comment(task.id, owner.id, "Flaky deploy again")
+        c2 = self.svc_t.add_comment(task.id, other.id, f"@{owner.username} deploy ok")
+        self.assertEqual(
+            self.svc_t.search_comments("deploy"), [(task.id, c2.id), (task.id, c1.id)]
+        )
+        self.assertEqual(
+            self.svc_t.search_comments(mention_id=owner.id), [(task.id, c2.id)]
+        )
+        self.assertEqual(
+            self.svc_t.search_comments("deploy", author_id=owner.id),
+            [(task.id, c1.id)],
+        )
+        self.svc_t.edit_comment(task.id, c1.id, "Rollout fixed")
+        self.assertEqual(self.svc_t.search_comments("flaky"), [])
+        self.assertEqual(self.svc_t.search_comments("rollout"), [(task.id, c1.id)])
+        self.svc_t.delete_comment(task.id, c2.id)
+        self.assertEqual(self.svc_t.search_comments("deploy"), [])
+        self.svc_t.delete_task(task.id)
+        self.assertEqual(self.svc_t.search_comments(project_id=proj.id), [])
+
     def test_comment_mention_parsing(self) -> None:
         owner = self.svc_u.create_user("mention_u", "mu@test.com", "Mention U")
         other = self.svc_u.create_user("mentioned_u", "mtu@test.com", "Mentioned U")
@@ -368,6 +808,57 @@ class TestTaskFlowAPI(unittest.TestCase):
         stats = self.api.project_stats(self._project_id())
         self.assertGreaterEqual(int(stats["overdue_count"]), 1)
 
+    def test_incremental_project_stats_match_rescan(self) -> None:
+        pid = self._project_id()
+        tasks = self.api.tasks
+        tasks.update_task(self._task_id("t1"), status=Status.DONE, actual_hours=7.3)
+        tasks.update_task(
+            self._task_id("t3"),
+            assignee_ids=[self._user_id("carol")],
+            estimated_hours=0.1,
+            story_points=13,
+        )
+        tasks.update_task(self._task_id("t2"), status=Status.CANCELLED)
+        extra = tasks.create_task(
+            "Overdue chore",
+            pid,
+            self._user_id("alice"),
+            due_date=datetime.utcnow() - timedelta(hours=1),
+            estimated_hours=0.2,
+        )
+        self.assertEqual(tasks.verify_project_stats(pid), [])
+        stats = tasks.compute_project_stats(pid)
+        self.assertEqual(stats["total_tasks"], 4)
+        self.assertEqual(stats["overdue_count"], 1)
+        self.assertEqual(stats["completed_story_points"], 5)
+        tasks.delete_task(extra.id)
+        tasks.update_task(self._task_id("t1"), estimated_hours=None)
+        self.assertEqual(tasks.verify_project_stats(pid), [])
+        self.assertEqual(tasks.compute_project_stats(pid)["overdue_count"], 0)
+
+    def test_sprint_stats_follow_task_moves(self) -> None:
+        pid, sid = self._project_id(), self._sprint_id()
+        other = self.api.sprints.create_sprint(
+            pid, "Sprint 2", datetime.utcnow(), datetime.utcnow() + timedelta(days=14)
+        )
+        stats = self.api.tasks.compute_sprint_stats(sid)
+        self.assertEqual(stats["total_story_points"], 16)
+        self.assertEqual(stats["total_tasks"], 3)
+
+        self.api.complete_task(self._task_id("t1"), self._user_id("bob"))
+        self.api.tasks.update_task(self._task_id("t3"), sprint_id=other.id)
+        stats = self.api.tasks.compute_sprint_stats(sid)
+        self.assertEqual(stats["total_story_points"], 8)
+        self.assertEqual(stats["completed_story_points"], 5)
+        self.assertEqual(stats["completed_tasks"], 1)
+        self.assertEqual(
+            [t.id for t in self.api._store.list_tasks_in_sprint(other.id)],
+            [self._task_id("t3")],
+        )
+        self.api.tasks.update_task(self._task_id("t2"), sprint_id=None)
+        self.assertEqual(self.api.sprints.complete_sprint(sid).velocity, 5.0)
+        self.assertIn("5/5 story points", self.api.sprint_report(sid))
+
     def test_complete_task_emits_notification(self) -> None:
         alice_id = self._user_id("alice")
         t1_id = self._task_id("t1")
@@ -385,6 +876,103 @@ class TestTaskFlowAPI(unittest.TestCase):
         self.assertIn("pagination", result)
         self.assertLessEqual(len(result["items"]), 2)
 
+    def test_search_cursor_pagination(self) -> None:
+        seen: list[str] = []
+        cursor: str | None = None
+        while True:
+            result = self.api.search_tasks_cursor(
+                cursor=cursor, per_page=2, project_id=self._project_id()
+            )
+            self.assertLessEqual(len(result["items"]), 2)
+            seen.extend(str(t["id"]) for t in result["items"])
+            cursor = result["pagination"]["next_cursor"]
+            if not result["pagination"]["has_next"]:
+                self.assertIsNone(cursor)
+                break
+        self.assertEqual(len(seen), 3)
+        self.assertEqual(
+            set(seen), {self._task_id("t1"), self._task_id("t2"), self._task_id("t3")}
+        )
+
+    def test_search_cursor_stable_after_insert(self) -> None:
+        first = self.api.search_tasks_cursor(per_page=1, project_id=self._project_id())
+        self.api.create_task(
+            actor_id=self._user_id("alice"),
+            title="Late arrival",
+            project_id=self._project_id(),
+        )
+        rest = self.api.search_tasks_cursor(
+            cursor=first["pagination"]["next_cursor"],
+            per_page=10,
+            project_id=self._project_id(),
+        )
+        ids = [t["id"] for t in first["items"] + rest["items"]]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(len(ids), 4)
+
+    def test_search_cursor_invalid(self) -> None:
+        with self.assertRaises(ValueError):
+            self.api.search_tasks_cursor(cursor="not-a-cursor")
+
+    def test_search_cursor_with_aware_timestamp(self) -> None:
+        from datetime import timezone
+
+        pid = self._project_id()
+        first = self.api.search_tasks_cursor(per_page=1, project_id=pid)
+        created_at, task_id = decode_cursor(first["pagination"]["next_cursor"])
+        aware = created_at.replace(tzinfo=timezone.utc).astimezone(
+            timezone(timedelta(hours=5))
+        )
+        cursor = encode_cursor((aware, task_id))
+        self.assertEqual(decode_cursor(cursor), (created_at, task_id))
+        rest = self.api.search_tasks_cursor(cursor=cursor, per_page=10, project_id=pid)
+        self.assertEqual(len(rest["items"]), 2)
+
+    def test_result_cache_hits_until_write(self) -> None:
+        pid = self._project_id()
+        first = self.api.project_stats(pid)
+        first["status_breakdown"]["done"] = 99
+        second = self.api.project_stats(pid)
+        self.assertEqual(self.api.cache_stats()["hits"], 1)
+        self.assertIsNone(second["status_breakdown"].get("done"))
+        self.api.complete_task(self._task_id("t1"), self._user_id("alice"))
+        refreshed = self.api.project_stats(pid)
+        self.assertEqual(refreshed["status_breakdown"].get("done"), 1)
+        self.assertEqual(self.api.cache_stats()["invalidations"], 1)
+
+    def test_result_cache_reads_overdue_fresh(self) -> None:
+        import time
+
+        pid = self._project_id()
+        self.api.create_task(
+            actor_id=self._user_id("alice"),
+            title="Due any moment",
+            project_id=pid,
+            due_date=datetime.utcnow() + timedelta(milliseconds=50),
+        )
+        before = self.api.project_stats(pid)["overdue_count"]
+        self.assertEqual(len(self.api.search_tasks(overdue_only=True)["items"]), 1)
+        time.sleep(0.1)
+        # No store write happened, but one more task is now overdue.
+        self.assertEqual(self.api.project_stats(pid)["overdue_count"], before + 1)
+        self.assertEqual(self.api.cache_stats()["hits"], 1)
+        self.assertEqual(len(self.api.search_tasks(overdue_only=True)["items"]), 2)
+
+    def test_result_cache_normalizes_search_args(self) -> None:
+        pid = self._project_id()
+        a = self.api.search_tasks(project_id=pid, status=Status.TODO, assignee_id=None)
+        b = self.api.search_tasks(status=Status.TODO, project_id=pid)
+        self.assertEqual(a, b)
+        self.assertEqual(self.api.cache_stats()["hits"], 1)
+
+    def test_result_cache_evicts_lru(self) -> None:
+        api = TaskFlowAPI(cache_entries=1)
+        ctx = bootstrap(api)
+        api.project_stats(ctx["project"].id)
+        api.workload_report(ctx["project"].id)
+        self.assertEqual(api.cache_stats()["evictions"], 1)
+        self.assertEqual(api.cache_stats()["entries"], 1)
+
     def test_project_report_text(self) -> None:
         report = self.api.project_report(self._project_id())
         self.assertIn("TaskFlow Core", report)
@@ -400,15 +988,197 @@ class TestTaskFlowAPI(unittest.TestCase):
         self.assertGreater(len(wl), 0)
         self.assertIn("open_tasks", wl[0])
 
+    def test_grouped_reports_per_member_totals(self) -> None:
+        self.api.complete_task(self._task_id("t1"), self._user_id("bob"))
+        self.api.tasks.update_task(self._task_id("t1"), actual_hours=4.0)
+        rows = self.api.workload_report(self._project_id())
+        wl = {row["username"]: row for row in rows}
+        self.assertEqual(wl["bob"]["total_assigned"], 2)
+        self.assertEqual(wl["bob"]["open_tasks"], 1)
+        self.assertEqual(wl["bob"]["story_points"], 8)
+        self.assertEqual(wl["alice"]["estimated_hours"], 16.0)
+        team = self.api.team_performance(self._project_id())
+        perf = {m["username"]: m for m in team["members"]}
+        self.assertEqual(perf["bob"]["tasks_completed"], 1)
+        self.assertEqual(perf["bob"]["efficiency_ratio"], 2.0)
+        self.assertEqual(perf["carol"]["tasks_overdue"], 1)
+
     def test_velocity_trend_no_completed_sprints(self) -> None:
         trend = self.api.velocity_trend(self._project_id())
         self.assertEqual(trend, [])
 
+    def test_velocity_trend_uses_frozen_velocity(self) -> None:
+        pid, sid = self._project_id(), self._sprint_id()
+        start = datetime.utcnow() - timedelta(days=60)
+        older = self.api.sprints.create_sprint(
+            pid, "Sprint 0", start, start + timedelta(days=14)
+        )
+        sprint = self.api._store.get_sprint(sid)
+        sprint.start_date = start + timedelta(days=14)
+        sprint.end_date = start + timedelta(days=28)
+        self.api._store.update_sprint(sprint)
+        self.api.complete_task(self._task_id("t1"), self._user_id("bob"))
+        self.api.sprints.complete_sprint(sid)
+
+        trend = self.api.velocity_trend(pid)
+        self.assertEqual([t["sprint_id"] for t in trend], [older.id, sid])
+        self.assertEqual([t["velocity"] for t in trend], [0, 5])
+        self.assertEqual(self.api.velocity_trend(pid, last_n=1)[0]["sprint_id"], sid)
+
+        self.api.tasks.update_task(self._task_id("t1"), story_points=8)
+        self.assertEqual(self.api._store.get_sprint(sid).velocity, 8.0)
+        self.api.tasks.update_task(self._task_id("t1"), sprint_id=None)
+        self.assertEqual(self.api.velocity_trend(pid)[-1]["velocity"], 0)
+
     def test_burndown_data(self) -> None:
         data = self.api.burndown_data(self._sprint_id())
         self.assertIsInstance(data, list)
         self.assertGreater(len(data), 0)
 
+    def test_burndown_follows_status_transitions(self) -> None:
+        import json
+        import tempfile
+
+        sid = self._sprint_id()
+        today = datetime.utcnow().date().isoformat()
+        self.api.complete_task(self._task_id("t1"), self._user_id("bob"))
+        self.api.tasks.update_task(self._task_id("t1"), title="CI pipeline")
+        self.api.tasks.update_task(self._task_id("t3"), sprint_id=None)
+
+        points = self.api.burndown_data(sid)
+        burndown = {p["date"]: p["remaining_points"] for p in points}
+        self.assertEqual(burndown[today], 3)
+        flow = {row["date"]: row for row in self.api.cumulative_flow(sid)}
+        self.assertEqual(flow[today]["done"], 1)
+        self.assertEqual(flow[today]["todo"], 1)
+        self.assertEqual(self.api.burndown_batch([sid]), {sid: points})
+
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+            path = f.name
+        try:
+            self.api.save(path)
+            loaded = TaskFlowAPI(persist_path=path)
+            self.assertEqual(loaded.burndown_data(sid), self.api.burndown_data(sid))
+            with open(path) as f:
+                data = json.load(f)
+            del data["sprint_timelines"]
+            with open(path, "w") as f:
+                json.dump(data, f)
+            legacy = TaskFlowAPI(persist_path=path)
+            self.assertEqual(legacy.burndown_data(sid), self.api.burndown_data(sid))
+        finally:
+            os.unlink(path)
+            os.unlink(notifications_path(path))
+
+    def test_completion_trend_reads_daily_rollups(self) -> None:
+        import json
+        import tempfile
+
+        pid = self._project_id()
+        self.api.complete_task(self._task_id("t1"), self._user_id("bob"))
+        trend = self.api.completion_trend(pid, days=3)
+        self.assertEqual(len(trend), 1)
+        self.assertEqual(trend[0]["completion_rate"], 33.33)
+        self.assertEqual(trend[0]["completed_story_points"], 5)
+
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+            path = f.name
+        try:
+            self.api.save(path)
+            with open(path) as f:
+                data = json.load(f)
+            past = (datetime.utcnow() - timedelta(days=2)).date().isoformat()
+            data["rollups"][pid].insert(
+                0, {"day": past, "total": 2, "status_counts": {"todo": 2}}
+            )
+            with open(path, "w") as f:
+                json.dump(data, f)
+            loaded = TaskFlowAPI(persist_path=path)
+        finally:
+            os.unlink(path)
+            os.unlink(notifications_path(path))
+        trend = loaded.completion_trend(pid, days=3)
+        self.assertEqual([t["total_tasks"] for t in trend], [2, 2, 3])
+        self.assertEqual(trend[0]["date"], past)
+        self.assertEqual(trend[-1]["completed_tasks"], 1)
+
+    def test_approximate_stats_report_intervals(self) -> None:
+        pid = self._project_id()
+        self.api.complete_task(self._task_id("t1"), self._user_id("bob"))
+        stats = self.api.project_stats(pid, approximate=True)
+        self.assertEqual(stats["sample_size"], 3)
+        # The whole project fits in the sample, so the estimates are exact.
+        self.assertEqual(stats["total_story_points"]["estimate"], 16.0)
+        self.assertEqual(stats["total_story_points"]["ci"], [16.0, 16.0])
+        self.assertEqual(stats["overdue_count"]["estimate"], 1.0)
+        self.assertEqual(stats["unique_assignees"]["estimate"], 3)
+
+        team = self.api.team_performance(pid, approximate=True, sample_size=2)
+        self.assertEqual(team["sample_size"], 2)
+        for member in team["members"]:
+            low, high = member["tasks_assigned"]["ci"]
+            self.assertLessEqual(low, member["tasks_assigned"]["estimate"])
+            self.assertGreaterEqual(high, member["tasks_assigned"]["estimate"])
+
+    def test_delete_task_tree_emits_one_event(self) -> None:
+        pid, alice = self._project_id(), self._user_id("alice")
+        parent_id = self._task_id("t1")
+        created = []
+        for i in range(sys.getrecursionlimit() + 10):
+            task = self.api.create_task(
+                actor_id=alice,
+                title=f"Step {i}",
+                project_id=pid,
+                parent_task_id=parent_id,
+            )
+            created.append(task["id"])
+            parent_id = task["id"]
+
+        deleted = self.api.delete_task(self._task_id("t1"), alice)
+        self.assertEqual(deleted, [self._task_id("t1")] + created)
+        self.assertEqual(self.api.tasks.compute_project_stats(pid)["total_tasks"], 2)
+        with self.assertRaises(NotFoundError):
+            self.api.tasks.get_task(created[-1])
+        events = self.api.notifications.get_event_log(
+            event_type=EventType.TASK_DELETED
+        )
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0].payload["task_ids"], deleted)
+
+    def test_portfolio_analytics_matches_serial(self) -> None:
+        pid = self._project_id()
+        other = self.api.projects.create_project("Side", self._user_id("alice"))
+        self.api.create_task(
+            actor_id=self._user_id("alice"),
+            title="Side task",
+            project_id=other.id,
+            assignee_ids=[self._user_id("bob")],
+            story_points=2,
+        )
+        serial = self.api.portfolio_analytics()
+        pooled = portfolio_analytics(self.api._store, workers=2, min_parallel_tasks=0)
+        self.assertEqual(set(pooled["projects"]), {pid, other.id})
+        for result in (serial, pooled):
+            self.assertEqual(result["totals"]["total_tasks"], 4)
+            self.assertEqual(result["totals"]["total_story_points"], 18)
+        self.assertEqual(
+            pooled["projects"][pid]["workload"], serial["projects"][pid]["workload"]
+        )
+        self.assertEqual(
+            pooled["projects"][pid]["team_performance"]["members"],
+            serial["projects"][pid]["team_performance"]["members"],
+        )
+
+    def test_portfolio_analytics_small_stays_in_process(self) -> None:
+        from unittest import mock
+
+        with mock.patch(
+            "services.portfolio.ProcessPoolExecutor",
+            side_effect=AssertionError("pool started"),
+        ):
+            result = self.api.portfolio_analytics(workers=4)
+        self.assertEqual(result["totals"]["total_tasks"], 3)
+
     def test_export_csv(self) -> None:
         csv_data = self.api.export_tasks(self._project_id())
         self.assertIn("title", csv_data)
@@ -433,12 +1203,315 @@ class TestTaskFlowAPI(unittest.TestCase):
         blocked = self.api.tasks.find_blocked_tasks(self._project_id())
         self.assertIsInstance(blocked, list)
 
+    def test_blocked_tasks_index(self) -> None:
+        pid = self._project_id()
+        t1, t3 = self._task_id("t1"), self._task_id("t3")
+        self.api.tasks.update_task(t3, status=Status.IN_PROGRESS)
+        self.api.tasks.update_task(t1, status=Status.IN_PROGRESS)
+        self.assertEqual(self.api.tasks.find_blocked_tasks(pid), [])
+
+        later = datetime.utcnow() + timedelta(days=1)
+        self.assertEqual(self.api._store.blocked_task_ids(pid, later), [t3, t1])
+
+        reports: list[tuple[str, list[str]]] = []
+        watchdog = BlockedTaskWatchdog(
+            self.api._store, lambda p, ids: reports.append((p, ids))
+        )
+        self.api.tasks.update_task(t1, actual_hours=25.0)
+        self.assertEqual([t.id for t in self.api.tasks.find_blocked_tasks(pid)], [t1])
+        watchdog.check_once()
+        watchdog.check_once()
+        self.assertEqual(reports, [(pid, [t1])])
+
+        self.api.tasks.update_task(t1, status=Status.DONE)
+        self.assertEqual(self.api._store.blocked_task_ids(pid, later), [t3])
+
+    def test_watchdog_retries_after_callback_failure(self) -> None:
+        pid, t1 = self._project_id(), self._task_id("t1")
+        self.api.tasks.update_task(t1, status=Status.IN_PROGRESS, actual_hours=25.0)
+        reports: list[tuple[str, list[str]]] = []
+        failures = [RuntimeError("delivery failed")]
+
+        def on_blocked(project_id: str, ids: list[str]) -> None:
+            if failures:
+                raise failures.pop()
+            reports.append((project_id, ids))
+
+        watchdog = BlockedTaskWatchdog(self.api._store, on_blocked)
+        with self.assertLogs("services.watchdog", level="ERROR"):
+            self.assertEqual(watchdog.check_once(), {})
+        self.assertEqual(watchdog.check_once(), {pid: [t1]})
+        watchdog.check_once()
+        self.assertEqual(reports, [(pid, [t1])])
+
+    def test_watchdog_thread_survives_failed_check(self) -> None:
+        import threading
+
+        checked = threading.Semaphore(0)
+
+        class FlakyStore(DataStore):
+            attempts = 0
+
+            def list_projects(self, include_archived: bool = False) -> list[Any]:
+                self.attempts += 1
+                checked.release()
+                if self.attempts == 1:
+                    raise StorageError("store unavailable")
+                return super().list_projects(include_archived)
+
+        store = FlakyStore()
+        watchdog = BlockedTaskWatchdog(store, lambda p, ids: None, interval=0.01)
+        with self.assertLogs("services.watchdog", level="ERROR"):
+            watchdog.start()
+            self.assertTrue(checked.acquire(timeout=5))
+            self.assertTrue(checked.acquire(timeout=5))
+        watchdog.stop(timeout=5)
+        self.assertGreaterEqual(store.attempts, 2)
+
     def test_tag_creation_dedup(self) -> None:
         t1 = self.api.tags.create_tag("duplicate-tag")
         t2 = self.api.tags.create_tag("duplicate-tag")
         self.assertEqual(t1.id, t2.id)
 
 
+class TestNotificationService(unittest.TestCase):
+    def _event(self, n: int) -> Event:
+        return Event(EventType.TASK_UPDATED, {"n": n})
+
+    def test_async_dispatch_keeps_order_and_counts_errors(self) -> None:
+        service = NotificationService(async_workers=3)
+        seen: list[int] = []
+
+        def record(event: Event) -> None:
+            seen.append(event.payload["n"])
+
+        def broken(event: Event) -> None:
+            raise RuntimeError("boom")
+
+        service.subscribe(EventType.TASK_UPDATED, record)
+        service.subscribe(EventType.TASK_UPDATED, broken)
+        for n in range(200):
+            service.publish(self._event(n))
+        self.assertTrue(service.flush(timeout=5))
+        service.close()
+
+        self.assertEqual(seen, list(range(200)))
+        stats = service.dispatch_stats()
+        name = record.__qualname__
+        self.assertEqual(stats[name]["delivered"], 200)
+        self.assertEqual(stats[broken.__qualname__]["errors"], 200)
+        self.assertEqual(
+            stats[broken.__qualname__]["last_error"], "RuntimeError: boom"
+        )
+
+    def test_drop_policies(self) -> None:
+        import threading
+
+        for policy, expected in (("drop_newest", [0, 1]), ("drop_oldest", [0, 4])):
+            gate = threading.Event()
+            seen: list[int] = []
+
+            def slow(event: Event) -> None:
+                gate.wait(5)
+                seen.append(event.payload["n"])
+
+            service = NotificationService(
+                async_workers=1, queue_size=1, overflow=policy
+            )
+            service.subscribe(EventType.TASK_UPDATED, slow)
+            service.publish(self._event(0))
+            while service._queues[0].qsize():
+                pass
+            for n in range(1, 5):
+                service.publish(self._event(n))
+            gate.set()
+            service.close()
+            self.assertEqual(seen, expected, policy)
+            self.assertEqual(service.dispatch_stats()[slow.__qualname__]["dropped"], 3)
+
+        with self.assertRaises(ValueError):
+            NotificationService(overflow="spill")
+
+    def test_close_waits_for_publishes_in_flight(self) -> None:
+        import threading
+
+        service = NotificationService(async_workers=1)
+        seen: list[int] = []
+        service.subscribe(EventType.TASK_UPDATED, lambda e: seen.append(e.payload["n"]))
+        q = service._queues[0]
+        put, entered, release = q.put, threading.Event(), threading.Event()
+
+        def paused_put(
+            item: Any, block: bool = True, timeout: float | None = None
+        ) -> None:
+            q.put = put
+            entered.set()
+            release.wait(5)
+            put(item, block, timeout)
+
+        q.put = paused_put
+        publisher = threading.Thread(target=service.publish, args=(self._event(1),))
+        publisher.start()
+        self.assertTrue(entered.wait(5))
+        closing = threading.Thread(target=service.close)
+        closing.start()
+        closing.join(0.1)
+        self.assertTrue(closing.is_alive())
+        service.publish(self._event(2))
+        release.set()
+        publisher.join(5)
+        closing.join(5)
+
+        self.assertFalse(closing.is_alive())
+        self.assertEqual(sorted(seen), [1, 2])
+        self.assertEqual(service._queues, [])
+
+    def test_event_log_spills_to_disk_and_reopens(self) -> None:
+        import tempfile
+        from datetime import datetime, timedelta
+
+        start = datetime(2024, 1, 1)
+        with tempfile.TemporaryDirectory() as spill_dir:
+            service = NotificationService(event_log_capacity=5, event_log_dir=spill_dir)
+            service._event_log.segment_events = 4
+            for n in range(23):
+                event = self._event(n)
+                event.actor_id = "even" if n % 2 == 0 else "odd"
+                event.occurred_at = start + timedelta(minutes=n)
+                service.publish(event)
+
+            self.assertEqual(service._event_log._live(), 5)
+            self.assertEqual(len(service._event_log), 23)
+            newest = service.get_event_log(limit=3)
+            self.assertEqual([e.payload["n"] for e in newest], [22, 21, 20])
+            recent = service.get_event_log(since=start + timedelta(minutes=10))
+            self.assertEqual([e.payload["n"] for e in recent], list(range(22, 9, -1)))
+            odd = service.get_event_log(actor_id="odd", limit=100)
+            self.assertEqual(len(odd), 11)
+            service.close()
+
+            reopened = NotificationService(event_log_dir=spill_dir)
+            history = reopened.get_event_log(limit=100)
+            self.assertEqual([e.payload["n"] for e in history], list(range(17, -1, -1)))
+            self.assertEqual(history[0].occurred_at, start + timedelta(minutes=17))
+
+
+    def test_event_log_indexes_match_full_scan(self) -> None:
+        import random
+        from datetime import datetime, timedelta
+
+        rng = random.Random(7)
+        types = [EventType.TASK_CREATED, EventType.TASK_UPDATED, EventType.MENTION]
+        service = NotificationService(event_log_capacity=50)
+        published: list[Event] = []
+        start = datetime(2024, 1, 1)
+        for n in range(180):
+            event = Event(rng.choice(types), {"n": n}, actor_id=rng.choice("abc"))
+            # Mostly increasing, with some events published late.
+            event.occurred_at = start + timedelta(minutes=n - rng.choice([0, 0, 5]))
+            service.publish(event)
+            published.append(event)
+
+        live = published[-50:]
+        since = start + timedelta(minutes=150)
+        for event_type in (None, EventType.MENTION):
+            for actor_id in (None, "b"):
+                expected = [
+                    e
+                    for e in reversed(live)
+                    if (event_type is None or e.event_type == event_type)
+                    and (actor_id is None or e.actor_id == actor_id)
+                    and e.occurred_at >= since
+                ][:10]
+                got = service.get_event_log(event_type, actor_id, since, limit=10)
+                self.assertEqual([e.id for e in got], [e.id for e in expected])
+        self.assertEqual(len(service.get_event_log(limit=500)), 50)
+
+
+    def test_inbox_unread_tracking(self) -> None:
+        service = NotificationService()
+        sent = [
+            service.send_notification("u1", self._event(n), f"message {n}")
+            for n in range(6)
+        ]
+        self.assertEqual(service.get_unread_count("u1"), 6)
+        self.assertTrue(service.mark_read("u1", sent[0].id))
+        self.assertTrue(service.mark_read("u1", sent[0].id))
+        self.assertTrue(service.mark_read("u1", sent[3].id))
+        self.assertFalse(service.mark_read("u1", "missing"))
+        self.assertFalse(service.mark_read("nobody", sent[1].id))
+        self.assertEqual(service.get_unread_count("u1"), 4)
+
+        latest = service.get_notifications("u1", limit=2)
+        self.assertEqual([n.id for n in latest], [sent[5].id, sent[4].id])
+        unread = service.get_notifications("u1", unread_only=True)
+        self.assertEqual([n.id for n in unread], [sent[i].id for i in (5, 4, 2, 1)])
+
+        self.assertEqual(service.mark_all_read("u1"), 4)
+        self.assertEqual(service.get_unread_count("u1"), 0)
+        self.assertEqual(service.get_notifications("u1", unread_only=True), [])
+        newer = service.send_notification("u1", self._event(6), "message 6")
+        unread = service.get_notifications("u1", unread_only=True)
+        self.assertEqual([n.id for n in unread], [newer.id])
+        service.clear_inbox("u1")
+        self.assertEqual(service.get_notifications("u1"), [])
+
+
+    def test_batch_fan_out_shares_body(self) -> None:
+        service = NotificationService()
+        event = self._event(0)
+        sent = service.send_notification_batch(["u1", "u2", "u1", "u3"], event, "hi")
+        self.assertEqual([n.recipient_id for n in sent], ["u1", "u2", "u3"])
+        self.assertTrue(all(n.body is sent[0].body for n in sent))
+        self.assertEqual(len({n.id for n in sent}), 3)
+
+        self.assertTrue(service.mark_read("u2", sent[1].id))
+        self.assertFalse(service.mark_read("u2", sent[0].id))
+        self.assertEqual(service.get_unread_count("u1"), 1)
+        self.assertEqual(service.get_unread_count("u2"), 0)
+        payload = service.get_notifications("u3")[0].to_dict()
+        self.assertEqual(payload["id"], sent[2].id)
+        self.assertEqual(payload["message"], "hi")
+        self.assertEqual(payload["event"]["id"], event.id)
+
+
+    def test_coalescing_merges_into_digest(self) -> None:
+        from datetime import timedelta
+
+        service = NotificationService(
+            coalesce={EventType.TASK_ASSIGNED: timedelta(minutes=5)}
+        )
+
+        def assign(task_id: str) -> Event:
+            return Event(EventType.TASK_ASSIGNED, {"task_id": task_id})
+
+        first = service.send_notification("u1", assign("t0"), "assigned t0")
+        for n in range(1, 200):
+            service.send_notification("u1", assign(f"t{n}"), f"assigned t{n}")
+        service.send_notification("u1", self._event(0), "updated")
+
+        self.assertEqual(service.get_unread_count("u1"), 2)
+        digest = service.get_notifications("u1")[1].to_dict()
+        self.assertEqual(digest["id"], first.id)
+        self.assertEqual(digest["count"], 200)
+        self.assertEqual(digest["refs"][:2], ["t0", "t1"])
+        self.assertEqual(digest["message"], "200 task assigned notifications")
+
+        # A read digest, or one whose window has passed, starts a new one.
+        service.mark_read("u1", first.id)
+        second = service.send_notification("u1", assign("t200"), "assigned t200")
+        self.assertNotEqual(second.id, first.id)
+        second.body.created_at -= timedelta(minutes=6)
+        third = service.send_notification("u1", assign("t201"), "assigned t201")
+        self.assertNotEqual(third.id, second.id)
+        self.assertEqual(service.get_unread_count("u1"), 3)
+        self.assertEqual(third.to_dict()["message"], "assigned t201")
+
+        service.set_coalescing(EventType.TASK_ASSIGNED, None)
+        service.send_notification("u1", assign("t202"), "assigned t202")
+        self.assertEqual(service.get_unread_count("u1"), 4)
+
+
 class TestPersistence(unittest.TestCase):
     def test_save_and_load(self) -> None:
         import tempfile
@@ -460,6 +1533,122 @@ class TestPersistence(unittest.TestCase):
             self.assertEqual(loaded_proj.name, "Persist Proj")
         finally:
             os.unlink(path)
+            os.unlink(notifications_path(path))
+
+
+    def test_seed_script_runs(self) -> None:
+        # seed.py imports ``src.models.core``, whose Status is a different
+        # enum class from the one the services use.
+        import subprocess
+        import tempfile
+
+        seed = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "seed.py")
+        with tempfile.TemporaryDirectory() as tmp:
+            result = subprocess.run(
+                [sys.executable, seed], cwd=tmp, capture_output=True, text=True
+            )
+            self.assertEqual(result.returncode, 0, result.stderr)
+            api = TaskFlowAPI(persist_path=os.path.join(tmp, "demo_data.json"))
+            for sprint in api._store.list_sprints():
+                flow = api.cumulative_flow(sprint.id)
+                tasks = api.tasks.search_tasks(sprint_id=sprint.id)
+                self.assertEqual(sum(flow[-1][s.value] for s in Status), len(tasks))
+
+    def test_notification_journal_replays_after_compaction(self) -> None:
+        import json
+        import tempfile
+
+        def state(service: NotificationService) -> dict[str, Any]:
+            return {
+                "inboxes": {
+                    uid: [n.to_dict() for n in service.get_notifications(uid)]
+                    for uid in ("u1", "u2", "u3")
+                },
+                "unread": [service.get_unread_count(u) for u in ("u1", "u2", "u3")],
+                "events": [e.id for e in service.get_event_log(limit=1000)],
+            }
+
+        def assign(task_id: str) -> Event:
+            return Event(EventType.TASK_ASSIGNED, {"task_id": task_id})
+
+        coalesce = {EventType.TASK_ASSIGNED: timedelta(hours=1)}
+        with tempfile.TemporaryDirectory() as tmp:
+            journal = os.path.join(tmp, "notifications.jsonl")
+            service = NotificationService(
+                event_log_capacity=20,
+                coalesce=coalesce,
+                journal_path=journal,
+                compact_after=15,
+            )
+            for n in range(30):
+                event = Event(EventType.TASK_UPDATED, {"n": n})
+                service.publish(event)
+                service.send_notification_batch(["u1", "u2"], event, f"update {n}")
+            for n in range(10):
+                service.send_notification("u3", assign(f"t{n}"), f"assigned t{n}")
+            first = service.get_notifications("u1")[-1]
+            service.mark_read("u1", first.id)
+            service.mark_all_read("u2")
+            service.send_notification("u2", assign("t99"), "assigned t99")
+            expected = state(service)
+            service.close()
+
+            with open(journal) as f:
+                ops = [json.loads(line)["op"] for line in f]
+            self.assertIn("entry", ops)  # compacted at least once
+            self.assertEqual(ops[-1], "deliver")  # then appended to
+            reopened = NotificationService(
+                event_log_capacity=20, coalesce=coalesce, journal_path=journal
+            )
+            self.assertEqual(state(reopened), expected)
+            self.assertEqual(len(expected["events"]), 20)
+
+            # The open digest keeps coalescing after a restart.
+            reopened.send_notification("u3", assign("t10"), "assigned t10")
+            digest = reopened.get_notifications("u3")[0].to_dict()
+            self.assertEqual(digest["count"], 11)
+            self.assertEqual(reopened.get_unread_count("u3"), 1)
+
+            # A crash skips close(): every operation must already be on disk.
+            reopened.mark_all_read("u3")
+            reopened.send_notification("u1", assign("t11"), "assigned t11")
+            crashed = state(reopened)
+            recovered = NotificationService(
+                event_log_capacity=20, coalesce=coalesce, journal_path=journal
+            )
+            self.assertEqual(state(recovered), crashed)
+            reopened.close()
+
+    def test_save_and_load_include_notifications(self) -> None:
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "taskflow.json")
+            api = TaskFlowAPI(persist_path=path)
+            data = bootstrap(api)
+            bob = data["users"]["bob"].id
+            latest = api.notifications.get_notifications(bob)[0]
+            api.notifications.mark_read(bob, latest.id)
+            api.save()
+            expected = [n.to_dict() for n in api.notifications.get_notifications(bob)]
+            api.close()
+
+            restarted = TaskFlowAPI(persist_path=path)
+            got = [n.to_dict() for n in restarted.notifications.get_notifications(bob)]
+            self.assertEqual(got, expected)
+            self.assertEqual(
+                restarted.notifications.get_unread_count(bob),
+                api.notifications.get_unread_count(bob),
+            )
+
+            other = make_api()
+            other.load(path)
+            got = [n.to_dict() for n in other.notifications.get_notifications(bob)]
+            self.assertEqual(got, expected)
+            self.assertEqual(
+                len(other.notifications.get_event_log()),
+                len(api.notifications.get_event_log()),
+            )
 
 
 if __name__ == "__main__":